@@ -0,0 +1,347 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# Fallback order; each model gets its own total timeout (seconds)
+DEFAULT_MODELS = [
+    "google/gemini-2.0-flash-exp:free",
+    "google/gemma-3-27b-it:free",
+    "meta-llama/llama-3.3-70b-instruct:free",
+]
+MODEL_TIMEOUTS = {
+    "google/gemini-2.0-flash-exp:free": 20.0,
+    "google/gemma-3-27b-it:free": 30.0,
+    "meta-llama/llama-3.3-70b-instruct:free": 30.0,
+}
+DEFAULT_TIMEOUT_SECONDS = 30.0
+CONNECT_TIMEOUT_SECONDS = 5.0
+
+# Hedged mode (opt-in): start the next model when the current one has not answered after this delay
+_hedge_delay = os.getenv("AI_HEDGE_DELAY_SECONDS", "")
+AI_HEDGE_DELAY_SECONDS = float(_hedge_delay) if _hedge_delay else None
+# Weight of the newest observation in the per-model latency / error averages
+STATS_ALPHA = 0.2
+# The error rate halves per this many seconds without a new failure, so a demoted model
+# that is never tried (the ones ahead of it keep succeeding) moves up again after a while
+ERROR_HALF_LIFE_SECONDS = float(os.getenv("AI_ERROR_HALF_LIFE_SECONDS", "60"))
+
+class AIRequestError(Exception):
+    """The model rejected the request (4xx other than 429); trying other models will not help."""
+
+    def __init__(self, model: str, status_code: int, detail: str):
+        super().__init__(f"{model}: {status_code}")
+        self.model = model
+        self.status_code = status_code
+        self.detail = detail
+
+class AIUnavailable(Exception):
+    """Every model was rate limited, failed with 5xx, timed out or was unreachable."""
+
+class ModelStats:
+    """
+    Exponentially weighted latency (successes only) and error rate of one model.
+    The error rate also decays with wall-clock time since the last failure.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.latency: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+        self._clock = clock
+        self._error_rate = 0.0
+        self._error_at = clock()
+
+    @property
+    def error_rate(self) -> float:
+        elapsed = max(0.0, self._clock() - self._error_at)
+        return self._error_rate * 0.5 ** (elapsed / ERROR_HALF_LIFE_SECONDS)
+
+    def record_success(self, seconds: float):
+        self.successes += 1
+        self.latency = seconds if self.latency is None else (1 - STATS_ALPHA) * self.latency + STATS_ALPHA * seconds
+        self._set_error_rate(self.error_rate * (1 - STATS_ALPHA))
+
+    def record_failure(self):
+        self.failures += 1
+        self._set_error_rate((1 - STATS_ALPHA) * self.error_rate + STATS_ALPHA)
+
+    def _set_error_rate(self, value: float):
+        self._error_rate = value
+        self._error_at = self._clock()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+        }
+
+class OpenRouterClient:
+    """
+    Async OpenRouter chat client. One instance per app (see lifespan in main.py):
+    the underlying httpx.AsyncClient keeps connections alive between requests.
+    Models are tried in order; 429, 5xx, timeouts and transport errors fall through
+    to the next model without blocking the event loop.
+    With hedge_delay set, the next model is started in parallel once the running ones
+    have not answered within the delay; the first success wins and the rest is cancelled.
+    With adaptive=True the order follows the observed latency and error rate per model;
+    errors fade out over time (ERROR_HALF_LIFE_SECONDS), so a demoted model is tried again.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = OPENROUTER_BASE_URL,
+                 models: Sequence[str] = DEFAULT_MODELS, timeouts: Optional[Dict[str, float]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 hedge_delay: Optional[float] = AI_HEDGE_DELAY_SECONDS, adaptive: bool = True,
+                 clock: Callable[[], float] = time.monotonic):
+        self._api_key = api_key
+        self.models = list(models)
+        self.timeouts = dict(MODEL_TIMEOUTS if timeouts is None else timeouts)
+        self.hedge_delay = hedge_delay
+        self.adaptive = adaptive
+        self._clock = clock
+        self.stats: Dict[str, ModelStats] = {model_id: ModelStats(clock) for model_id in self.models}
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            transport=transport,
+        )
+
+    @property
+    def api_key(self) -> Optional[str]:
+        # Read lazily so a key from .env (load_dotenv) is picked up after construction
+        return self._api_key or os.getenv("OPENROUTER_API_KEY")
+
+    async def complete(self, messages: List[Dict[str, str]], models: Optional[Sequence[str]] = None,
+                       max_tokens: int = 1000) -> str:
+        candidates = self.ordered_models(models)
+        if self.hedge_delay is not None:
+            return await self._complete_hedged(candidates, messages, max_tokens)
+
+        for model_id in candidates:
+            try:
+                return await self._attempt(model_id, messages, max_tokens)
+            except AIUnavailable as e:
+                logger.info("Model %s unavailable (%s), trying next", model_id, e)
+        raise AIUnavailable("all models failed")
+
+    def ordered_models(self, models: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Models in the order they should be tried. Adaptive: expected cost = average latency
+        plus error rate times the model timeout; models without latency samples are assumed
+        as fast as the median observed model. Ties keep the configured order.
+        """
+        candidates = list(models or self.models)
+        if not self.adaptive:
+            return candidates
+        stats = [self._stats(model_id) for model_id in candidates]
+        latencies = sorted(s.latency for s in stats if s.latency is not None)
+        prior = latencies[len(latencies) // 2] if latencies else 0.0
+
+        def cost(index: int) -> float:
+            s = stats[index]
+            latency = prior if s.latency is None else s.latency
+            return latency + s.error_rate * self.timeouts.get(candidates[index], DEFAULT_TIMEOUT_SECONDS)
+
+        return [candidates[i] for i in sorted(range(len(candidates)), key=lambda i: (cost(i), i))]
+
+    def model_stats(self) -> Dict[str, Any]:
+        return {
+            "hedge_delay_seconds": self.hedge_delay,
+            "order": self.ordered_models(),
+            "models": {model_id: s.as_dict() for model_id, s in self.stats.items()},
+        }
+
+    async def _complete_hedged(self, candidates: List[str], messages: List[Dict[str, str]], max_tokens: int) -> str:
+        remaining = list(candidates)
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_next():
+            model_id = remaining.pop(0)
+            running[asyncio.ensure_future(self._attempt(model_id, messages, max_tokens))] = model_id
+
+        launch_next()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=self.hedge_delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Nobody answered within the delay: hedge with the next model
+                    launch_next()
+                    continue
+                for task in done:
+                    model_id = running.pop(task)
+                    try:
+                        return task.result()
+                    except AIUnavailable as e:
+                        logger.info("Model %s unavailable (%s)", model_id, e)
+                        if remaining:
+                            launch_next()
+            raise AIUnavailable("all models failed")
+        finally:
+            for task, model_id in running.items():
+                if not task.done():
+                    task.cancel()
+                    self._stats(model_id).cancelled += 1
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def _attempt(self, model_id: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        start = time.perf_counter()
+        try:
+            result = await self.complete_with(model_id, messages, max_tokens)
+        except AIUnavailable:
+            self._stats(model_id).record_failure()
+            raise
+        self._stats(model_id).record_success(time.perf_counter() - start)
+        return result
+
+    def _stats(self, model_id: str) -> ModelStats:
+        if model_id not in self.stats:
+            self.stats[model_id] = ModelStats(self._clock)
+        return self.stats[model_id]
+
+    async def stream(self, messages: List[Dict[str, str]], models: Optional[Sequence[str]] = None,
+                     max_tokens: int = 1000) -> AsyncIterator[str]:
+        """
+        Yields the answer token by token. Fallback to the next model happens only until the
+        first token has arrived (each model's timeout applies to that first token); errors
+        after that end the stream with AIUnavailable.
+        """
+        for model_id in self.ordered_models(models):
+            start = time.perf_counter()
+            try:
+                response, tokens, first = await asyncio.wait_for(
+                    self._open_stream(model_id, messages, max_tokens),
+                    timeout=self.timeouts.get(model_id, DEFAULT_TIMEOUT_SECONDS),
+                )
+            except (AIUnavailable, asyncio.TimeoutError) as e:
+                self._stats(model_id).record_failure()
+                logger.info("Model %s unavailable for streaming (%s), trying next", model_id, e)
+                continue
+            # Latency of a stream = time to first token
+            self._stats(model_id).record_success(time.perf_counter() - start)
+
+            try:
+                yield first
+                async for token in tokens:
+                    yield token
+            except httpx.HTTPError as e:
+                raise AIUnavailable(f"stream interrupted ({type(e).__name__})") from e
+            finally:
+                await tokens.aclose()
+                await response.aclose()
+            return
+        raise AIUnavailable("all models failed")
+
+    async def _open_stream(self, model_id: str, messages: List[Dict[str, str]], max_tokens: int):
+        """Sends a streaming request and waits for the first token: (response, remaining tokens, first token)."""
+        request = self._client.build_request(
+            "POST", "/chat/completions", headers=self._headers(),
+            json={**self._payload(model_id, messages, max_tokens), "stream": True},
+        )
+        try:
+            response = await self._client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            raise AIUnavailable(f"{type(e).__name__}") from e
+
+        tokens = None
+        try:
+            if response.status_code != 200:
+                detail = (await response.aread()).decode("utf-8", errors="replace")
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise AIUnavailable(f"HTTP {response.status_code}")
+                raise AIRequestError(model_id, response.status_code, detail)
+            tokens = _sse_tokens(response)
+            try:
+                first = await tokens.__anext__()
+            except StopAsyncIteration:
+                raise AIUnavailable("empty stream")
+            except httpx.HTTPError as e:
+                raise AIUnavailable(f"{type(e).__name__}") from e
+            return response, tokens, first
+        except BaseException:
+            # Includes the cancellation by wait_for when the first token is too late
+            if tokens is not None:
+                await tokens.aclose()
+            await response.aclose()
+            raise
+
+    def _payload(self, model_id: str, messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+        return {
+            "model": model_id,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "top_p": 1,
+            "temperature": 0.7
+        }
+
+    async def complete_with(self, model_id: str, messages: List[Dict[str, str]], max_tokens: int = 1000) -> str:
+        """One attempt against one model. Raises AIUnavailable (retryable) or AIRequestError."""
+        payload = self._payload(model_id, messages, max_tokens)
+        try:
+            # Total deadline for this model (httpx timeouts apply per read/write, not per request)
+            response = await asyncio.wait_for(
+                self._client.post("/chat/completions", headers=self._headers(), json=payload),
+                timeout=self.timeouts.get(model_id, DEFAULT_TIMEOUT_SECONDS),
+            )
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            raise AIUnavailable(f"{type(e).__name__}") from e
+
+        if response.status_code == 200:
+            try:
+                return response.json()['choices'][0]['message']['content']
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise AIUnavailable("malformed response") from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise AIUnavailable(f"HTTP {response.status_code}")
+        raise AIRequestError(model_id, response.status_code, response.text)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "OpenRouterClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "http://localhost:3000",
+            "Content-Type": "application/json"
+        }
+
+async def _sse_tokens(response: httpx.Response) -> AsyncIterator[str]:
+    """Content deltas from an OpenAI-style server-sent event stream."""
+    async for line in response.aiter_lines():
+        # Comments (": OPENROUTER PROCESSING") and other fields carry no content
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if "error" in chunk:
+            raise AIUnavailable(f"error in stream: {chunk['error']}")
+        choices = chunk.get("choices") or [{}]
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
@@ -0,0 +1,234 @@
+import hashlib
+import itertools
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from .memory_store import InMemoryStore, compact_frame, DEFAULT_KIND, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS
+except ImportError:
+    from memory_store import InMemoryStore, compact_frame, DEFAULT_KIND, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.getenv("SESSION_STORE_DIR", os.path.join(tempfile.gettempdir(), "finance-analyzer-sessions"))
+# Session files not read or written for this long are deleted (wall-clock, survives restarts)
+DEFAULT_DISK_TTL_SECONDS = float(os.getenv("SESSION_DISK_TTL_SECONDS", str(30 * 24 * 60 * 60)))
+
+FILE_SUFFIX = ".arrow"
+# Schema metadata key holding the save version of a session file
+VERSION_KEY = b"session_version"
+
+class DiskSpillStore:
+    """
+    Session store that persists every session as an uncompressed Arrow IPC file
+    and keeps recently used sessions in an InMemoryStore (hot tier).
+    Cold reads memory-map the file: numeric columns are backed by the page cache,
+    and with `columns` only the requested columns are touched at all.
+    """
+
+    def __init__(self, directory: Optional[str] = None, hot_max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 hot_ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 disk_ttl_seconds: Optional[float] = DEFAULT_DISK_TTL_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        # Resolved per instance, not when the class is defined
+        self.directory = directory or DEFAULT_STORE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.hot = InMemoryStore(max_bytes=hot_max_bytes, ttl_seconds=hot_ttl_seconds)
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._metrics = {"disk_reads": 0, "disk_misses": 0, "disk_expired": 0}
+        # Seeded from the wall clock like InMemoryStore: versions stay distinct across restarts
+        self._generations = itertools.count(time.time_ns())
+
+    def save(self, session_id: str, transactions: Union[pd.DataFrame, List[Dict[str, Any]]], kind: str = DEFAULT_KIND):
+        self.save_many(session_id, {kind: transactions})
+
+    def save_many(self, session_id: str, frames: Dict[str, Union[pd.DataFrame, List[Dict[str, Any]]]]):
+        """
+        Saves several frames of one session ({kind: frame}). Every file is written completely
+        before any of them is renamed into place, so the frames are replaced back to back.
+        """
+        compacted = {kind: compact_frame(data) for kind, data in frames.items()}
+        version = str(next(self._generations)).encode("ascii")
+        written = []
+        try:
+            for kind, df in compacted.items():
+                table = pa.Table.from_pandas(df, preserve_index=True)
+                table = table.replace_schema_metadata({**table.schema.metadata, VERSION_KEY: version})
+                # Write to a temp file and rename: readers never see a half-written session
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                written.append((tmp_path, self._path(session_id, kind)))
+                with os.fdopen(fd, "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            for tmp_path, path in written:
+                os.replace(tmp_path, path)
+        except BaseException:
+            for tmp_path, _ in written:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+
+        self._touch(session_id)
+        self.hot.save_many(session_id, compacted)
+        self._evict_expired_files()
+
+    def get(self, session_id: str, columns: Optional[Sequence[str]] = None, kind: str = DEFAULT_KIND) -> pd.DataFrame:
+        path = self._path(session_id, kind)
+        df = self.hot.lookup(session_id, columns, kind)
+        if df is not None:
+            self._touch(session_id)
+            return df
+
+        if self._expired(path):
+            self._remove_file(path, "disk_expired")
+        df = self._read(path, columns)
+        if df is None:
+            with self._lock:
+                self._metrics["disk_misses"] += 1
+            return pd.DataFrame()
+
+        with self._lock:
+            self._metrics["disk_reads"] += 1
+        self._touch(session_id)
+        if columns is None:
+            # Full reads are promoted into the hot tier; column subsets are not
+            self.hot.save(session_id, df, kind)
+        return df
+
+    def column_names(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[List[str]]:
+        """
+        Column names of a stored frame. A cold session only has its Arrow schema read:
+        no column data is mapped and nothing is promoted into the hot tier.
+        """
+        path = self._path(session_id, kind)
+        names = self.hot.column_names(session_id, kind)
+        if names is None:
+            if self._expired(path):
+                self._remove_file(path, "disk_expired")
+            try:
+                source = pa.memory_map(path, "r")
+            except FileNotFoundError:
+                return None
+            names = schema_columns(pa.ipc.open_file(source).schema)
+        self._touch(session_id)
+        return names
+
+    def version(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[int]:
+        """Save version from the file's schema metadata (the file is the source of truth); None if missing."""
+        path = self._path(session_id, kind)
+        if self._expired(path):
+            self._remove_file(path, "disk_expired")
+        try:
+            source = pa.memory_map(path, "r")
+        except FileNotFoundError:
+            return None
+        version = (pa.ipc.open_file(source).schema.metadata or {}).get(VERSION_KEY)
+        # Files written before versions existed count as version 0
+        return int(version) if version is not None else 0
+
+    def clear(self, session_id: str):
+        self.hot.clear(session_id)
+        for path in self._files_of(session_id):
+            self._remove_file(path)
+
+    def stats(self) -> Dict[str, Any]:
+        files = self._session_files()
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "backend": "disk",
+            "directory": self.directory,
+            "disk_sessions": len({os.path.basename(path)[:64] for path in files}),
+            "disk_files": len(files),
+            "disk_bytes": sum(_file_size(path) for path in files),
+            "disk_ttl_seconds": self.disk_ttl_seconds,
+            **metrics,
+            "hot": self.hot.stats(),
+        }
+
+    def _path(self, session_id: str, kind: str = DEFAULT_KIND) -> str:
+        name = self._digest(session_id)
+        if kind != DEFAULT_KIND:
+            name += "." + hashlib.sha256(kind.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, name + FILE_SUFFIX)
+
+    @staticmethod
+    def _digest(session_id: str) -> str:
+        # Session ids come from a request header: hash them instead of using them as file names
+        return hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+
+    def _read(self, path: str, columns: Optional[Sequence[str]]) -> Optional[pd.DataFrame]:
+        try:
+            source = pa.memory_map(path, "r")
+        except FileNotFoundError:
+            return None
+        return table_to_frame(pa.ipc.open_file(source).read_all(), columns)
+
+    def _session_files(self) -> List[str]:
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(FILE_SUFFIX)]
+
+    def _files_of(self, session_id: str) -> List[str]:
+        prefix = self._digest(session_id)
+        return [path for path in self._session_files() if os.path.basename(path).startswith(prefix)]
+
+    def _expired(self, path: str) -> bool:
+        if self.disk_ttl_seconds is None:
+            return False
+        try:
+            return self._clock() - os.path.getmtime(path) > self.disk_ttl_seconds
+        except FileNotFoundError:
+            return False
+
+    def _evict_expired_files(self):
+        for path in self._session_files():
+            if self._expired(path):
+                self._remove_file(path, "disk_expired")
+
+    def _touch(self, session_id: str):
+        # All files of a session share one mtime: they expire together, never only the transactions
+        now = self._clock()
+        for path in self._files_of(session_id):
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                pass
+
+    def _remove_file(self, path: str, reason: Optional[str] = None):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        if reason is not None:
+            with self._lock:
+                self._metrics[reason] += 1
+            logger.info("Session file %s removed (%s)", os.path.basename(path), reason)
+
+def table_to_frame(table: pa.Table, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Arrow table (as written from a session frame) back to pandas, optionally only some columns."""
+    if columns is not None:
+        # Keep the stored index columns so the frame is labelled as on save
+        index_columns = [name for name in (table.schema.pandas_metadata or {}).get("index_columns", [])
+                         if isinstance(name, str)]
+        table = table.select([name for name in list(columns) + index_columns if name in table.column_names])
+    # split_blocks avoids consolidating columns into 2D blocks, which would copy the mapped buffers
+    return table.to_pandas(split_blocks=True)
+
+def schema_columns(schema: pa.Schema) -> List[str]:
+    """Column names of a session frame from its Arrow schema, without the stored index columns."""
+    index_columns = {name for name in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(name, str)}
+    return [name for name in schema.names if name not in index_columns]
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
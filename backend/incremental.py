@@ -0,0 +1,230 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .logic.detector import RESULT_COLUMNS
+    from .services import (
+        CUBE_DIMENSIONS,
+        build_aggregate_cube,
+        calculate_balances,
+        classify_transactions,
+        detect_recurring_patterns,
+    )
+except ImportError:
+    from logic.detector import RESULT_COLUMNS
+    from services import (
+        CUBE_DIMENSIONS,
+        build_aggregate_cube,
+        calculate_balances,
+        classify_transactions,
+        detect_recurring_patterns,
+    )
+
+# Fields of the transaction fingerprint: identify a booking across overlapping exports
+FINGERPRINT_COLUMNS = ['Buchungsdatum', 'Betrag', 'IBAN', 'Zahlungsempfänger', 'Verwendungszweck']
+# Session frame kind holding the fingerprint index next to the transactions
+FINGERPRINT_KIND = "fingerprints"
+# Recurring detection groups transactions by these columns (see detect_recurring_patterns)
+RECURRING_GROUP_COLUMNS = ['Zahlungsempfänger', 'Betrag']
+# Columns written by the recurring/classification stages, dropped before a row is reprocessed
+DERIVED_COLUMNS = ['Wiederkehrend', 'Fixkosten'] + RESULT_COLUMNS
+
+def _key_frame(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Comparable key columns: text as plain strings (categoricals and str dtype alike), amounts as floats."""
+    keys = {}
+    for column in columns:
+        values = df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        keys[column] = values.astype(float) if column == 'Betrag' else values.astype(object).astype(str)
+    return pd.DataFrame(keys).reset_index(drop=True)
+
+def _text_hashes(values: pd.Series, compact: bool = False) -> np.ndarray:
+    """
+    Hash per row of the export-independent text: case-folded, whitespace collapsed (or removed,
+    for IBANs), missing -> ''. Normalizing and hashing run once per distinct value, not per row.
+    """
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(uniques, dtype=object).astype(str).str.casefold()
+    text = text.str.replace(r"\s+", "", regex=True) if compact else text.str.replace(r"\s+", " ", regex=True).str.strip()
+    hashes = pd.util.hash_array(np.append(text.to_numpy(dtype=object), ""))
+    return hashes[codes]
+
+def transaction_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row over the normalized FINGERPRINT_COLUMNS (amount in whole cents),
+    vectorized with hash_pandas_object. Equal bookings from a DKB and a Sparkasse export of
+    the same account get the same fingerprint.
+    """
+    missing = pd.Series("", index=df.index, dtype=object)
+    amount = df['Betrag'].astype(float) if 'Betrag' in df.columns else pd.Series(np.nan, index=df.index)
+    column_hashes = pd.DataFrame({
+        column: np.rint(amount.to_numpy() * 100) if column == 'Betrag'
+        else _text_hashes(df[column] if column in df.columns else missing, compact=column == 'IBAN')
+        for column in FINGERPRINT_COLUMNS
+    })
+    return pd.util.hash_pandas_object(column_hashes, index=False).to_numpy()
+
+def _occurrence_keys(fingerprints: np.ndarray, offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Fingerprint combined with its occurrence number (0 for the first equal booking, 1 for the
+    second, ...), so identical bookings on one day (two equal coffees) stay distinct rows.
+    """
+    occurrence = pd.Series(fingerprints).groupby(fingerprints, sort=False).cumcount().to_numpy()
+    if offsets is not None:
+        occurrence = occurrence + offsets
+    return pd.util.hash_pandas_object(pd.DataFrame({'f': fingerprints, 'o': occurrence}), index=False).to_numpy()
+
+def fingerprint_index(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-session index: fingerprint and occurrence key of every stored row, in row order."""
+    fingerprints = transaction_fingerprints(df)
+    return pd.DataFrame({'fingerprint': fingerprints, 'key': _occurrence_keys(fingerprints)})
+
+def extend_fingerprint_index(index: pd.DataFrame, added: pd.DataFrame) -> pd.DataFrame:
+    """The index after appending `added`: occurrences continue after the stored equal bookings."""
+    fingerprints = transaction_fingerprints(added)
+    stored = pd.Series(index['fingerprint'].to_numpy())
+    counts = stored[stored.isin(fingerprints)].value_counts()
+    offsets = pd.Series(fingerprints).map(counts).fillna(0).to_numpy(dtype=np.int64)
+    extension = pd.DataFrame({'fingerprint': fingerprints, 'key': _occurrence_keys(fingerprints, offsets)})
+    return pd.concat([index, extension], ignore_index=True)
+
+def duplicate_mask(index: pd.DataFrame, incoming: pd.DataFrame) -> np.ndarray:
+    """
+    Rows of `incoming` already in the session: one hash lookup per row against the stored
+    occurrence keys. The second equal booking of a day in the new export is only a duplicate
+    if the session has two as well; equal rows within one export are never dropped against
+    each other (see "repeated" in append_transactions).
+    """
+    keys = _occurrence_keys(transaction_fingerprints(incoming))
+    return pd.Series(keys).isin(index['key'].to_numpy()).to_numpy()
+
+def append_transactions(existing: pd.DataFrame, incoming: pd.DataFrame,
+                        index: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    Merges a newly parsed export into a processed session without reprocessing the whole history.
+    Only the recurring groups (Zahlungsempfänger, Betrag) touched by new rows are re-detected and
+    reclassified; all other stored rows keep their results. `index` is the session's
+    fingerprint index (rebuilt from `existing` if missing or out of date). Returns:
+      frame      - the merged session (stored rows keep their positions, new rows appended)
+      added      - the processed new rows
+      before     - the affected stored rows as they were
+      after      - the same rows reprocessed (plus `added`), for update_aggregate_cube
+      duplicates - number of incoming rows dropped as already known
+      repeated   - number of added rows equal to an earlier row of the same export; kept on purpose
+                   (two equal coffees on one day are two bookings), reported so they can be checked
+      index      - the fingerprint index of `frame`
+    """
+    existing = existing.reset_index(drop=True)
+    if index is None or len(index) != len(existing):
+        index = fingerprint_index(existing)
+    duplicates = duplicate_mask(index, incoming)
+    incoming = incoming[~duplicates].reset_index(drop=True)
+
+    if incoming.empty:
+        empty = existing.iloc[:0]
+        return {"frame": existing, "added": empty, "before": empty, "after": empty,
+                "duplicates": int(duplicates.sum()), "repeated": 0, "index": index}
+
+    # Stored rows whose recurring group gains members
+    group_keys = pd.MultiIndex.from_frame(_key_frame(existing, RECURRING_GROUP_COLUMNS))
+    affected = group_keys.isin(pd.MultiIndex.from_frame(_key_frame(incoming, RECURRING_GROUP_COLUMNS)))
+    positions = np.flatnonzero(affected)
+    before = existing.iloc[positions]
+
+    # Reprocess affected + new rows together; '_position' restores the order afterwards
+    stale = before.drop(columns=[column for column in DERIVED_COLUMNS if column in before.columns])
+    batch = pd.concat([
+        stale.assign(_position=positions),
+        incoming.assign(_position=np.arange(len(existing), len(existing) + len(incoming))),
+    ], ignore_index=True)
+    processed = classify_transactions(detect_recurring_patterns(batch))
+    processed = processed.sort_values('_position', kind='stable').reset_index(drop=True)
+
+    is_existing = (processed['_position'] < len(existing)).to_numpy()
+    refreshed = processed[is_existing].drop(columns='_position')
+    added = processed[~is_existing].drop(columns='_position').reset_index(drop=True)
+
+    # Appended rows go last, so stored positions (and the balance tie order) stay stable
+    existing, added = _align_categories(existing, added)
+    frame = pd.concat([existing, added], ignore_index=True)
+    if len(positions):
+        for column in refreshed.columns:
+            if column in DERIVED_COLUMNS or column == 'Kategorie':
+                frame[column] = _replace_at(frame[column], positions, refreshed[column])
+
+    extended = extend_fingerprint_index(index, incoming)
+    return {
+        "frame": frame,
+        "added": added,
+        "before": before,
+        "after": pd.concat([refreshed, added], ignore_index=True),
+        "duplicates": int(duplicates.sum()),
+        "repeated": int(extended['fingerprint'].iloc[len(index):].duplicated().sum()),
+        "index": extended,
+    }
+
+def _align_categories(existing: pd.DataFrame, added: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Gives the new rows the stored categorical dtypes (extended by their new values), so the
+    concat only appends codes instead of decoding the whole stored column to strings.
+    """
+    existing_columns, added_columns = {}, {}
+    for column in existing.columns:
+        dtype = existing[column].dtype
+        if not isinstance(dtype, pd.CategoricalDtype) or column not in added.columns:
+            continue
+        unseen = pd.Index(added[column].dropna().unique()).difference(dtype.categories)
+        categories = dtype.categories.append(unseen) if len(unseen) else dtype.categories
+        existing_columns[column] = existing[column].cat.set_categories(categories)
+        added_columns[column] = pd.Categorical(added[column], categories=categories)
+    return existing.assign(**existing_columns), added.assign(**added_columns)
+
+def _replace_at(column: pd.Series, positions: np.ndarray, values: pd.Series) -> pd.Series:
+    result = column.copy()
+    if isinstance(result.dtype, pd.CategoricalDtype):
+        unseen = pd.Index(values.dropna().unique()).difference(result.cat.categories)
+        if len(unseen):
+            result = result.cat.add_categories(unseen)
+    result.iloc[positions] = values.to_numpy()
+    return result
+
+def update_aggregate_cube(cube: pd.DataFrame, added: pd.DataFrame, removed: pd.DataFrame) -> pd.DataFrame:
+    """
+    The cube of (session - removed + added) from the stored cube: only the changed rows are
+    aggregated, cells are combined by their dimensions and empty cells dropped.
+    """
+    parts = [cube, build_aggregate_cube(added)]
+    if not removed.empty:
+        parts.append(build_aggregate_cube(removed).assign(
+            Betrag=lambda df: -df['Betrag'], count=lambda df: -df['count'],
+        ))
+    combined = pd.concat([part for part in parts if not part.empty], ignore_index=True)
+    if combined.empty:
+        return build_aggregate_cube(added)
+    for column in CUBE_DIMENSIONS:
+        combined[column] = combined[column].astype(bool) if column == 'Fixkosten' else combined[column].astype(object)
+    merged = combined.groupby(CUBE_DIMENSIONS, dropna=False, sort=True)[['Betrag', 'count']].sum().reset_index()
+    return merged[merged['count'] != 0].reset_index(drop=True)
+
+def rebalance(frame: pd.DataFrame, export: pd.DataFrame, current_balance: float) -> np.ndarray:
+    """
+    Recomputes Saldo_Danach backwards from the export's closing balance, for the rows between
+    the export's first and last booking date. `export` is the whole parsed export (duplicates
+    included): its closing balance belongs to its last date. Rows before the window end before
+    the export starts, rows after it (an older export appended to a newer session) were already
+    derived from a later balance; both keep their stored balances. Returns the mask of
+    recomputed rows.
+    """
+    dates = frame['Buchungsdatum'].astype(object)
+    known = export['Buchungsdatum'].dropna().astype(str) if 'Buchungsdatum' in export.columns else pd.Series(dtype=str)
+    if known.empty:
+        window = np.ones(len(frame), dtype=bool)
+    else:
+        text = dates.astype(str)
+        window = (dates.notna() & (text >= known.min()) & (text <= known.max())).to_numpy()
+
+    saldo = frame['Saldo_Danach'].astype(float) if 'Saldo_Danach' in frame.columns else pd.Series(np.nan, index=frame.index)
+    saldo[window] = calculate_balances(frame[window], current_balance)
+    frame['Saldo_Danach'] = saldo
+    return window
@@ -0,0 +1,110 @@
+import codecs
+import io
+from typing import BinaryIO, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from .parsers.base import BaseParser
+    from .parsers.factory import ParserFactory
+    from .tracing import current_trace
+except ImportError:
+    from parsers.base import BaseParser
+    from parsers.factory import ParserFactory
+    from tracing import current_trace
+
+# Fallback order if the detected encoding fails later in the file
+ENCODINGS = ['utf-8', 'cp1252', 'iso-8859-1']
+
+# Encoding and bank detection only need the metadata lines, the header and a few rows
+SAMPLE_BYTES = 64 * 1024
+
+# Bytes that are undefined in cp1252 - if present, the export can only be latin-1
+CP1252_UNDEFINED = frozenset(b"\x81\x8d\x8f\x90\x9d")
+
+def _decode_sample(sample: bytes, encoding: str) -> str:
+    # Incremental decoder: a multi-byte character cut at the sample boundary is not an error
+    return codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Picks the encoding from a bounded sample instead of trial-decoding the whole payload:
+    BOM first, then a UTF-8 validity probe, then cp1252 unless bytes undefined in cp1252 occur.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    # Umlauts of a Windows export (e.g. 0xE4 for ä) are invalid UTF-8 and fail this probe
+    try:
+        _decode_sample(sample, 'utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    if CP1252_UNDEFINED.intersection(sample):
+        return 'iso-8859-1'
+    return 'cp1252'
+
+def _candidate_encodings(detected: str) -> list:
+    """Detected encoding first, then the remaining fallbacks in their usual order."""
+    if detected in ENCODINGS:
+        return ENCODINGS[ENCODINGS.index(detected):]
+    return [detected] + ENCODINGS
+
+def _detect_parser(sample_text: str, stream: io.TextIOBase) -> BaseParser:
+    """
+    Bank detection from the sample; an export whose metadata preamble is longer than the
+    sample is searched further line by line. Leaves the stream at the start.
+    """
+    try:
+        return ParserFactory.get_parser(sample_text)
+    except ValueError:
+        for line in iter(stream.readline, ""):
+            try:
+                return ParserFactory.get_parser(line)
+            except ValueError:
+                continue
+        raise
+    finally:
+        stream.seek(0)
+
+def parse_upload(raw: BinaryIO, strict: bool = False) -> Tuple[BaseParser, pd.DataFrame, Optional[dict]]:
+    """
+    Parses an uploaded bank export from a seekable binary file (e.g. UploadFile.file,
+    which Starlette spools to disk for large uploads). The bank is detected from the
+    first SAMPLE_BYTES (or further, see _detect_parser) and the rows are decoded and
+    parsed chunk by chunk; peak memory for the raw text stays at a few chunks instead
+    of the whole file.
+    """
+    sample = raw.read(SAMPLE_BYTES)
+
+    for encoding in _candidate_encodings(detect_encoding(sample)):
+        try:
+            sample_text = _decode_sample(sample, encoding)
+        except UnicodeDecodeError:
+            continue
+
+        raw.seek(0)
+        stream = io.TextIOWrapper(raw, encoding=encoding, newline="")
+        # Counters of a failed attempt are rolled back, the next encoding counts every row again
+        trace = current_trace()
+        counters = trace.snapshot() if trace is not None else None
+        try:
+            parser = _detect_parser(sample_text, stream)
+            if strict:
+                df, metadata = parser.parse_dataframe(stream.read(), strict=True)
+            else:
+                df, metadata = parser.parse_stream(stream)
+            return parser, df, metadata
+        except UnicodeDecodeError:
+            # Invalid bytes after the sample: start over with the next encoding
+            if trace is not None:
+                trace.restore(counters)
+            continue
+        finally:
+            # Keep the upload file open for the caller
+            stream.detach()
+
+    raise ValueError("Could not decode file.")
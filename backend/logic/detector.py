@@ -1,7 +1,15 @@
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
+try:
+    from .matcher import KeywordMatcher
+    from ..tracing import current_trace
+except ImportError:
+    from logic.matcher import KeywordMatcher
+    from tracing import current_trace
+
 class FixedCostCategory(Enum):
     WOHNEN = "Wohnen"
     VERSICHERUNGEN = "Versicherungen"
@@ -12,7 +20,11 @@ class FixedCostCategory(Enum):
     NONE = "Keine"
 
 class FixedCostDetector:
-    def __init__(self):
+    # Table names inside the (possibly shared) KeywordMatcher
+    KEYWORD_TABLE = "fixed_costs"
+    EXCLUSION_TABLE = "exclusions"
+
+    def __init__(self, matcher: Optional[KeywordMatcher] = None):
         # Configuration for plausibility thresholds (Avoid "Magic Numbers")
         self.max_plausible_amounts = {
             FixedCostCategory.WOHNEN: 3000.0,
@@ -36,6 +48,11 @@ class FixedCostDetector:
         # Exclusion list (e.g. Income should NEVER be a fixed cost expense)
         self.exclusions = ["gehalt", "lohn", "bezüge", "rente", "gutschrift", "bonus"]
 
+        # One automaton for all keyword tables; services.py registers CATEGORIES on the same instance
+        self.matcher = matcher or KeywordMatcher()
+        self.matcher.add_table(self.KEYWORD_TABLE, self.keywords)
+        self.matcher.add_table(self.EXCLUSION_TABLE, {FixedCostCategory.NONE: self.exclusions})
+
     def detect(self, recipient: str, purpose: str, amount: float, is_recurring: bool = False) -> Tuple[FixedCostCategory, float, str]:
         """
         Detects if a transaction is a fixed cost and assigns a category and confidence.
@@ -45,26 +62,25 @@ class FixedCostDetector:
         text = f"{str(recipient).lower()} {str(purpose).lower()}"
         amount_abs = abs(amount)
 
+        # Single pass over the text for exclusions and keywords
+        hits = self.matcher.scan(text)
+
         # Rule 0: Exclusions (Income)
-        if any(ex in text for ex in self.exclusions) or amount > 0:
+        if self.EXCLUSION_TABLE in hits or amount > 0:
             return FixedCostCategory.NONE, 0.0, "Einkommen/Gutschrift ausgeschlossen"
 
         detected_category = FixedCostCategory.NONE
         confidence = 0.0
         reasons = []
 
-        # Rule 1: Keyword Matching
-        print(f"DEBUG: Analyzing '{text}' for keywords...")
-        for category, kws in self.keywords.items():
-            for kw in kws:
-                if kw in text:
-                    print(f"  -> MATCH: Found '{kw}' -> Category: {category.value}")
-                    detected_category = category
-                    confidence += 0.5
-                    reasons.append(f"Keyword-Treffer ({category.value}: '{kw}')")
-                    break
-            if detected_category != FixedCostCategory.NONE:
-                break
+        # Rule 1: Keyword Matching (first category in priority order wins)
+        if self.KEYWORD_TABLE in hits:
+            detected_category, kw = hits[self.KEYWORD_TABLE]
+            trace = current_trace()
+            if trace is not None:
+                trace.count("keyword_matches", f"{detected_category.value}: {kw}")
+            confidence += 0.5
+            reasons.append(f"Keyword-Treffer ({detected_category.value}: '{kw}')")
 
         if detected_category == FixedCostCategory.NONE:
             # Fallback for recurring but no specific keyword
@@ -95,11 +111,17 @@ class FixedCostDetector:
         reason_str = ", ".join(reasons) if reasons else "Keine Hinweise auf Fixkosten"
         return detected_category, confidence, reason_str
 
-    def process_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    def process_dataframe(self, df: pd.DataFrame, vectorized: bool = True) -> pd.DataFrame:
         """
         Bulk processing for DataFrames.
         Assumes columns: 'Zahlungsempfänger', 'Verwendungszweck', 'Betrag', 'Wiederkehrend'
+        vectorized=True evaluates all rules as column operations (default),
+        vectorized=False runs detect() row by row (reference implementation).
         """
+        results_df = self.detect_frame(df) if vectorized else self._detect_rows(df)
+        return pd.concat([df.reset_index(drop=True), results_df], axis=1)
+
+    def _detect_rows(self, df: pd.DataFrame) -> pd.DataFrame:
         results = []
         for _, row in df.iterrows():
             cat, conf, reason = self.detect(
@@ -114,6 +136,106 @@ class FixedCostDetector:
                 'Fixkosten_Grund': reason,
                 'Fixkosten_Status': conf >= 0.5  # Threshold for 'True'
             })
-        
-        results_df = pd.DataFrame(results)
-        return pd.concat([df.reset_index(drop=True), results_df], axis=1)
+
+        return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+    def detect_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Columnar variant of detect() for a whole DataFrame.
+        Applies the same rules in the same order as array operations and returns
+        the result columns with a fresh RangeIndex.
+        """
+        n = len(df)
+        text = self.transaction_text(df)
+        amount = df['Betrag'].astype(float).to_numpy() if 'Betrag' in df.columns else np.zeros(n)
+        if 'Wiederkehrend' in df.columns:
+            recurring = df['Wiederkehrend'].astype(bool).to_numpy()
+        else:
+            recurring = np.zeros(n, dtype=bool)
+
+        # Rule 0: Exclusions (Income)
+        excluded = (amount > 0) | (self.matcher.match_series(text, self.EXCLUSION_TABLE) >= 0)
+
+        # Rule 1: Keyword Matching - first category wins, inside it the first keyword.
+        # keyword_ids index into keyword_table, -1 means no match.
+        keyword_table: List[Tuple[FixedCostCategory, str]] = self.matcher.entries(self.KEYWORD_TABLE)
+        keyword_ids = self.matcher.match_series(text, self.KEYWORD_TABLE, mask=~excluded)
+
+        matched = keyword_ids >= 0
+
+        trace = current_trace()
+        if trace is not None:
+            ids, counts = np.unique(keyword_ids[matched], return_counts=True)
+            trace.update("keyword_matches", {
+                f"{keyword_table[i][0].value}: {keyword_table[i][1]}": c for i, c in zip(ids, counts)
+            })
+        categories = np.array([cat for cat, _ in keyword_table] + [FixedCostCategory.NONE], dtype=object)
+        detected = categories[keyword_ids]  # -1 picks NONE
+        detected[~matched & recurring & ~excluded] = FixedCostCategory.SONSTIGES
+
+        # Rule 2: Reliability Boost (is_recurring) - same additions as in detect()
+        confidence = np.where(matched, 0.5, 0.0)
+        confidence = confidence + np.where(recurring & ~excluded, 0.3, 0.0)
+
+        # Rule 3: Plausibility Check (Thresholds)
+        limits = np.array([self.max_plausible_amounts.get(cat, 1000.0) for cat, _ in keyword_table] + [np.inf])
+        row_limits = limits[keyword_ids]
+        plausible = np.abs(amount) <= row_limits
+        confidence = confidence + np.where(matched, np.where(plausible, 0.2, -0.3), 0.0)
+
+        confidence = np.clip(confidence, 0.0, 1.0)
+        confidence[excluded] = 0.0
+
+        return pd.DataFrame({
+            'Fixkosten_Kategorie': [cat.value for cat in detected],
+            'Fixkosten_Confidence': confidence,
+            'Fixkosten_Grund': self._reasons(keyword_table, keyword_ids, excluded, recurring, plausible),
+            'Fixkosten_Status': confidence >= 0.5
+        }, columns=RESULT_COLUMNS)
+
+    @staticmethod
+    def transaction_text(df: pd.DataFrame) -> pd.Series:
+        """Normalized 'recipient purpose' text per row, as used by detect() and the CATEGORIES fallback."""
+        return _text_column(df, 'Zahlungsempfänger') + " " + _text_column(df, 'Verwendungszweck')
+
+    def _reasons(self, keyword_table, keyword_ids, excluded, recurring, plausible) -> np.ndarray:
+        """Builds the reason texts once per distinct rule combination instead of once per row."""
+        # Combination code: excluded rows collapse to -1, the rest encode (keyword, recurring, plausible)
+        codes = np.where(excluded, -1, (keyword_ids + 1) * 4 + recurring * 2 + (plausible & (keyword_ids >= 0)))
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+
+        texts = []
+        for code in unique_codes:
+            if code == -1:
+                texts.append("Einkommen/Gutschrift ausgeschlossen")
+                continue
+            kw_id, flags = divmod(int(code), 4)
+            kw_id -= 1
+            is_recurring, is_plausible = bool(flags & 2), bool(flags & 1)
+            reasons = []
+            if kw_id < 0:
+                if is_recurring:
+                    reasons.append("Wiederkehrendes Muster ohne Kategorie-Zuordnung")
+            else:
+                category, kw = keyword_table[kw_id]
+                reasons.append(f"Keyword-Treffer ({category.value}: '{kw}')")
+                if is_recurring:
+                    reasons.append("Frequenzanalyse bestätigt Regelmäßigkeit (+0.3)")
+                limit = self.max_plausible_amounts.get(category, 1000.0)
+                if is_plausible:
+                    reasons.append(f"Betrag plausibel (<= {limit}€)")
+                else:
+                    reasons.append(f"Betrag unplausibel hoch (> {limit}€) - Punktabzug")
+            texts.append(", ".join(reasons) if reasons else "Keine Hinweise auf Fixkosten")
+
+        return np.array(texts, dtype=object)[inverse.reshape(-1)]
+
+
+RESULT_COLUMNS = ['Fixkosten_Kategorie', 'Fixkosten_Confidence', 'Fixkosten_Grund', 'Fixkosten_Status']
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Lowercased text column, mirroring str(value).lower() of the per-row path."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].astype(str).fillna("nan").str.lower()
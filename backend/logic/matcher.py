@@ -0,0 +1,126 @@
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# (table, rank, category, keyword) - rank encodes the priority inside a table:
+# categories in insertion order first, then keywords in list order.
+_Entry = Tuple[str, int, Any, str]
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over several named keyword tables.
+
+    Every table maps a category to its keywords and keeps the dict order as
+    priority order. One scan over a lowercased text finds all keyword hits of
+    all tables at once and resolves the best hit per table, so the result is
+    the same as looping over the categories and keywords with `kw in text`.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, List[Tuple[Any, str]]] = {}
+        self._built = False
+        self._goto: List[Dict[str, int]] = []
+        self._output: List[List[_Entry]] = []
+
+    def add_table(self, name: str, table: Dict[Any, List[str]]) -> None:
+        """Registers (or replaces) a keyword table. Keywords are matched lowercased."""
+        self._tables[name] = [
+            (category, kw.lower()) for category, kws in table.items() for kw in kws
+        ]
+        self._built = False
+
+    def entries(self, name: str) -> List[Tuple[Any, str]]:
+        """(category, keyword) pairs of a table in priority order."""
+        return self._tables[name]
+
+    def build(self) -> None:
+        """Compiles the automaton. Called once at startup, or lazily on the first scan."""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[List[_Entry]] = [[]]
+
+        for name, entries in self._tables.items():
+            for rank, (category, kw) in enumerate(entries):
+                if not kw:
+                    continue
+                node = 0
+                for ch in kw:
+                    nxt = goto[node].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[node][ch] = nxt
+                        goto.append({})
+                        output.append([])
+                    node = nxt
+                output[node].append((name, rank, category, kw))
+
+        # Breadth-first: failure links point to the longest proper suffix that is also a prefix
+        fail = [0] * len(goto)
+        order: List[int] = []
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                output[child] = output[child] + output[fail[child]]
+
+        # Complete the goto function to a transition table, so scan() never follows failure links
+        for node in order:
+            for ch, target in goto[fail[node]].items():
+                goto[node].setdefault(ch, target)
+
+        self._goto = goto
+        self._output = output
+        self._built = True
+
+    def scan(self, text: str) -> Dict[str, Tuple[Any, str]]:
+        """
+        Single pass over an already lowercased text.
+        Returns the highest-priority (category, keyword) hit per table; tables without hits are absent.
+        """
+        if not self._built:
+            self.build()
+
+        goto, output = self._goto, self._output
+        best: Dict[str, Tuple[int, Any, str]] = {}
+        node = 0
+        for ch in text:
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                for name, rank, category, kw in output[node]:
+                    current = best.get(name)
+                    if current is None or rank < current[0]:
+                        best[name] = (rank, category, kw)
+
+        return {name: (category, kw) for name, (_, category, kw) in best.items()}
+
+    def first_match(self, text: str, table: str) -> Optional[Tuple[Any, str]]:
+        """Highest-priority (category, keyword) hit of one table, or None."""
+        return self.scan(text).get(table)
+
+    def match_series(self, texts: pd.Series, table: str, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Columnar counterpart of first_match() for a whole Series of lowercased texts.
+        Returns the rank (index into entries(table)) of the best hit per row, -1 without a hit.
+        Each keyword is one vectorized substring pass restricted to rows that are still open,
+        which beats a per-row automaton walk in Python on large frames.
+        """
+        values = texts.reset_index(drop=True)
+        ranks = np.full(len(values), -1, dtype=np.int64)
+        pending = np.ones(len(values), dtype=bool) if mask is None else mask.copy()
+
+        for rank, (_, kw) in enumerate(self._tables[table]):
+            if not pending.any():
+                break
+            candidates = np.flatnonzero(pending)
+            hit = values.iloc[candidates].str.contains(kw, regex=False).to_numpy(dtype=bool)
+            hit_rows = candidates[hit]
+            ranks[hit_rows] = rank
+            pending[hit_rows] = False
+
+        return ranks
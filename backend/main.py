@@ -2,8 +2,12 @@ import sys
 import os
 import logging
 import io
+import json
+import re
+from contextlib import asynccontextmanager
 import pandas as pd
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -19,35 +23,76 @@ logger.info(f"Current Working Directory: {os.getcwd()}")
 logger.info(f"Python Path: {sys.path}")
 
 try:
-    from .memory_store import store
-    from .parsers.factory import ParserFactory
+    from .memory_store import store, DEFAULT_KIND
+    from .ingest import parse_upload
+    from .tracing import trace_scope
+    from .ai_client import OpenRouterClient, AIUnavailable
+    from .response_cache import ai_response_cache
+    from .serialization import negotiated_response
+    from .pagination import transaction_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+    from .incremental import append_transactions, update_aggregate_cube, rebalance, fingerprint_index, FINGERPRINT_KIND
+    from .runtime import upload_pool, loop_monitor, PoolSaturated, UPLOAD_RETRY_AFTER_SECONDS
     from .services import (
-        categorize_transaction, 
+        classify_transactions,
         detect_recurring_patterns, 
         is_fixed_cost, 
         analyze_with_ai,
+        stream_analysis,
         calculate_balance_history,
+        calculate_balances,
+        BALANCE_RESOLUTIONS,
         calculate_50_30_20_metrics,
-        detector
+        build_aggregate_cube,
+        fixed_cost_breakdown,
+        calculate_monthly_metrics,
+        METRIC_WINDOWS
     )
 except ImportError:
     # Fallback for local execution if not run as a package
-    from memory_store import store
-    from parsers.factory import ParserFactory
+    from memory_store import store, DEFAULT_KIND
+    from ingest import parse_upload
+    from tracing import trace_scope
+    from ai_client import OpenRouterClient, AIUnavailable
+    from response_cache import ai_response_cache
+    from serialization import negotiated_response
+    from pagination import transaction_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+    from incremental import append_transactions, update_aggregate_cube, rebalance, fingerprint_index, FINGERPRINT_KIND
+    from runtime import upload_pool, loop_monitor, PoolSaturated, UPLOAD_RETRY_AFTER_SECONDS
     from services import (
-        categorize_transaction, 
+        classify_transactions,
         detect_recurring_patterns, 
         is_fixed_cost, 
         analyze_with_ai,
+        stream_analysis,
         calculate_balance_history,
+        calculate_balances,
+        BALANCE_RESOLUTIONS,
         calculate_50_30_20_metrics,
-        detector
+        build_aggregate_cube,
+        fixed_cost_breakdown,
+        calculate_monthly_metrics,
+        METRIC_WINDOWS
     )
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Finance Analyzer API")
+# replace: the upload becomes the session; append: merged into the stored session
+UPLOAD_MODES = ("replace", "append")
+
+# Month filter format of the time-series endpoints
+MONTH_PATTERN = re.compile(r"\d{4}-(0[1-9]|1[0-2])")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    # One pooled HTTP client for all AI requests (keep-alive connections to OpenRouter)
+    app.state.ai_client = OpenRouterClient()
+    yield
+    await app.state.ai_client.aclose()
+    await loop_monitor.stop()
+
+app = FastAPI(title="Finance Analyzer API", lifespan=lifespan)
 
 # Enable CORS for frontend interaction
 app.add_middleware(
@@ -57,101 +102,250 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/upload")
-async def upload_csv(file: UploadFile = File(...), x_session_id: str = None):
-    session_id = x_session_id or "default"
-    contents = await file.read()
-    
-    # ... (Encoding logic)
-    encodings = ['utf-8', 'cp1252', 'iso-8859-1', 'latin1']
-    content_str = None
-    for enc in encodings:
-        try:
-            content_str = contents.decode(enc)
-            break
-        except UnicodeDecodeError:
-            continue
-            
-    if content_str is None:
-        raise HTTPException(status_code=400, detail="Could not decode file.")
-
-    try:
-        parser = ParserFactory.get_parser(content_str)
-        transactions, metadata = parser.parse(content_str)
-        
-        df = pd.DataFrame([t.model_dump(by_alias=True) for t in transactions])
+def process_upload(raw, session_id: str, strict_validation: bool = False, trace_enabled: bool = False,
+                   balance_resolution: str = "transaction", summary_only: bool = False,
+                   mode: str = "replace") -> Dict[str, Any]:
+    """
+    The synchronous upload pipeline (parse, detect, classify, store).
+    CPU-bound: runs in upload_pool, never directly on the event loop.
+    mode="append" merges the export into the stored session (see process_append).
+    """
+    # Optional per-request tracing: aggregated counters instead of per-row debug output
+    with trace_scope("upload", enabled=trace_enabled) as trace:
+        # Chunked decode + columnar parse straight from the spooled upload file;
+        # strict_validation=True validates every row through the pydantic model instead
+        parser, df, metadata = parse_upload(raw, strict=strict_validation)
         if df.empty:
-            return {"count": 0, "transactions": [], "bank": parser.bank_name}
+            # Empty frame, not []: serialized in the negotiated layout like any other upload
+            return {"count": 0, "transactions": pd.DataFrame(), "bank": parser.bank_name, "session_id": session_id}
+
+        if mode == "append":
+            existing = store.get(session_id)
+            if existing.empty and any(store.column_names(session_id, kind) is not None
+                                      for kind in ("cube", FINGERPRINT_KIND)):
+                # Derived frames without their transactions: appending to them, or silently
+                # replacing the session, would both lose history the client believes is stored
+                raise HTTPException(status_code=410, detail="The session's transactions are gone. "
+                                                            "Upload the full history again with mode=replace.")
+            if not existing.empty:
+                response = process_append(session_id, existing, df, metadata, balance_resolution)
+                response["bank"] = parser.bank_name
+                if summary_only:
+                    del response["transactions"]
+                if trace is not None:
+                    response["trace"] = trace.summary()
+                return response
 
         # 1. Detect recurring patterns first
         df = detect_recurring_patterns(df)
-        
-        # 2. Use the new robust detector for fixed costs
-        df = detector.process_dataframe(df)
-        
-        # 3. Synchronize with legacy fields for backward compatibility
-        df['Fixkosten'] = df['Fixkosten_Status']
-        df['Kategorie'] = df.apply(categorize_transaction, axis=1)
 
-        # 4. Calculate 50-30-20 metrics
+        # 2. Classify once: fixed costs (robust detector) plus Kategorie,
+        #    including the legacy 'Fixkosten' field for backward compatibility
+        df = classify_transactions(df)
+
+        # 3. Calculate 50-30-20 metrics
         financial_metrics = calculate_50_30_20_metrics(df)
 
-        data = df.to_dict(orient='records')
-        
         balance_history = []
         if metadata and "balance" in metadata:
-            balance_history = calculate_balance_history(data, metadata["balance"])
+            df['Saldo_Danach'] = calculate_balances(df, metadata["balance"])
+            balance_history = calculate_balance_history(df, metadata["balance"], resolution=balance_resolution)
 
-        # In-Memory speichern
-        store.save(session_id, data)
+        # In-Memory speichern (spaltenweise, siehe compact_frame), together with the aggregate
+        # cube for the dashboard endpoints and the fingerprint index for later appends.
+        # One write: readers never see the new transactions next to the old cube
+        store.save_many(session_id, {
+            DEFAULT_KIND: df,
+            "cube": build_aggregate_cube(df),
+            FINGERPRINT_KIND: fingerprint_index(df),
+        })
 
-        return {
-            "count": len(data),
-            "transactions": data,
+        response = {
+            "count": len(df),
+            # Kept as DataFrame: render_upload serializes it column-wise (see serialization.dumps)
+            "transactions": df,
+            "session_id": session_id,
             "bank": parser.bank_name,
             "metadata": metadata,
             "balance_history": balance_history,
             "financial_metrics": financial_metrics
         }
+        if summary_only:
+            # Transactions are fetched page by page from GET /api/transactions instead
+            del response["transactions"]
+        if trace is not None:
+            response["trace"] = trace.summary()
+        return response
+
+def process_append(session_id: str, existing: pd.DataFrame, df: pd.DataFrame, metadata: Dict[str, Any],
+                   balance_resolution: str = "transaction") -> Dict[str, Any]:
+    """
+    Appends a parsed export to a stored session. The computation follows the new rows and the
+    recurring groups they touch: overlapping bookings are dropped, only those groups are reclassified,
+    the cube is updated by the changed rows and balances within the new export's date range.
+    Persisting does not: the stores keep one frame per kind, so the merged transactions and the
+    fingerprint index are written in full and an append costs O(history) in the save
+    (measured in tests/bench_append.py).
+    """
+    stored_index = store.get(session_id, kind=FINGERPRINT_KIND)
+    result = append_transactions(existing, df, index=stored_index)
+    frame, added = result["frame"], result["added"]
+
+    cube = store.get(session_id, kind="cube")
+    if cube.empty:
+        cube = build_aggregate_cube(existing)
+    cube = update_aggregate_cube(cube, result["after"], result["before"])
+
+    balance_history, history_from = [], None
+    if metadata and "balance" in metadata and not added.empty:
+        window = rebalance(frame, df, metadata["balance"])
+        history_from = df['Buchungsdatum'].dropna().astype(str).min()
+        balance_history = calculate_balance_history(frame[window], metadata["balance"], resolution=balance_resolution)
+
+    if not added.empty:
+        store.save_many(session_id, {DEFAULT_KIND: frame, "cube": cube, FINGERPRINT_KIND: result["index"]})
+    elif len(stored_index) != len(existing):
+        store.save(session_id, result["index"], kind=FINGERPRINT_KIND)
+
+    return {
+        "mode": "append",
+        "count": len(frame),
+        "appended": len(added),
+        "duplicates_dropped": result["duplicates"],
+        # Equal rows within the new export: kept (e.g. two equal bookings on one day), only counted
+        "repeated_in_export": result["repeated"],
+        "reclassified": len(result["before"]),
+        # Only the new rows; earlier pages are available from GET /api/transactions
+        "transactions": frame.iloc[len(existing):].reset_index(drop=True),
+        "session_id": session_id,
+        "metadata": metadata,
+        "balance_history": balance_history,
+        "balance_history_from": history_from,
+        "financial_metrics": calculate_50_30_20_metrics(cube),
+    }
+
+def render_upload(raw, session_id: str, accept: str = None, accept_encoding: str = None, **options) -> Response:
+    """
+    process_upload plus JSON encoding. The response for a large upload takes longer
+    to encode than to compute, so this also belongs in the worker thread.
+    The transactions go straight from the DataFrame to JSON bytes, without a list of dicts;
+    layout (records/columnar) and compression follow the request's Accept headers.
+    """
+    response = process_upload(raw, session_id, **options)
+    return negotiated_response(response, accept, accept_encoding)
+
+@app.post("/upload")
+async def upload_csv(request: Request, file: UploadFile = File(...), x_session_id: str = None, x_trace: bool = False,
+                     strict_validation: bool = False, balance_resolution: str = "transaction", summary_only: bool = False,
+                     mode: str = "replace"):
+    session_id = x_session_id or "default"
+    # "daily" returns one end-of-day balance point per date instead of one per transaction
+    if balance_resolution not in BALANCE_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"balance_resolution must be one of {list(BALANCE_RESOLUTIONS)}")
+    # "append" merges the export into the stored session instead of replacing it
+    if mode not in UPLOAD_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {list(UPLOAD_MODES)}")
+
+    try:
+        # Off the event loop: /health and other requests stay responsive during large uploads
+        return await upload_pool.run(
+            render_upload, file.file, session_id,
+            accept=request.headers.get("accept"), accept_encoding=request.headers.get("accept-encoding"),
+            strict_validation=strict_validation, trace_enabled=x_trace, balance_resolution=balance_resolution,
+            summary_only=summary_only, mode=mode,
+        )
+    except HTTPException:
+        raise
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other uploads. Please retry shortly.",
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)},
+        )
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def session_cube(session_id: str) -> pd.DataFrame:
+    """
+    The per-session aggregate cube: dashboard endpoints are answered from it in
+    O(categories x months), not O(transactions).
+    """
+    cube = store.get(session_id, kind="cube")
+    if cube.empty:
+        # Sessions stored before the cube existed: build it once from the transactions
+        df = store.get(session_id, columns=['Buchungsdatum', 'Kategorie', 'Betrag', 'Fixkosten', 'Fixkosten_Kategorie'])
+        if df.empty:
+            raise HTTPException(status_code=404, detail="No session data found. Please upload a CSV first.")
+        cube = build_aggregate_cube(df)
+        store.save(session_id, cube, kind="cube")
+    return cube
+
 @app.get("/api/financial-health")
 async def get_financial_health(x_session_id: str = None):
     session_id = x_session_id or "default"
-    data = store.get(session_id)
-    if not data:
-        raise HTTPException(status_code=404, detail="No session data found. Please upload a CSV first.")
-    
-    df = pd.DataFrame(data)
-    metrics = calculate_50_30_20_metrics(df)
-    
+    cube = session_cube(session_id)
+    metrics = calculate_50_30_20_metrics(cube)
+
     # Also provide fixed cost category breakdown for charts
-    fixed_costs = df[df['Fixkosten'] == True]
-    category_breakdown = []
-    if not fixed_costs.empty:
-        cat_groups = fixed_costs.groupby('Fixkosten_Kategorie')
-        for cat_name, group in cat_groups:
-            cat_sum = abs(group['Betrag'].sum())
-            category_breakdown.append({
-                "name": str(cat_name),
-                "amount": round(cat_sum, 2),
-                "count": len(group)
-            })
-            
     return {
         "metrics": metrics,
-        "breakdown": category_breakdown
+        "breakdown": fixed_cost_breakdown(cube)
     }
 
+@app.get("/api/financial-health/monthly")
+async def get_monthly_financial_health(x_session_id: str = None, start: str = None, end: str = None,
+                                       windows: List[int] = Query(default=list(METRIC_WINDOWS))):
+    """Monthly and rolling-window 50-30-20 series; start/end as 'YYYY-MM' (inclusive)."""
+    session_id = x_session_id or "default"
+    for value in (start, end):
+        if value and not MONTH_PATTERN.fullmatch(value):
+            raise HTTPException(status_code=400, detail=f"Invalid month '{value}', expected YYYY-MM")
+    if any(window < 1 for window in windows):
+        raise HTTPException(status_code=400, detail="Rolling windows must be at least one month")
+    return calculate_monthly_metrics(session_cube(session_id), windows=sorted(set(windows)), start=start, end=end)
+
+@app.get("/api/transactions")
+def get_transactions(request: Request, x_session_id: str = None, cursor: str = None,
+                     limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                     columns: str = None, sort: str = None):
+    """
+    Stored transactions of a session, page by page. columns: comma-separated projection;
+    sort: comma-separated columns, '-' prefix for descending; cursor: next_cursor of the previous page.
+    Plain def: sorting and compressing a large session runs in the threadpool, not on the event loop.
+    """
+    session_id = x_session_id or "default"
+    try:
+        page = transaction_page(store, session_id, columns=columns, sort=sort, cursor=cursor, limit=limit)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if page is None:
+        raise HTTPException(status_code=404, detail="No session data found. Please upload a CSV first.")
+    return negotiated_response(page, request.headers.get("accept"), request.headers.get("accept-encoding"))
+
 @app.post("/api/clear")
 async def clear_session_data(x_session_id: str = None):
     session_id = x_session_id or "default"
     store.clear(session_id)
     return {"status": "cleared", "session": session_id}
 
+@app.get("/api/session-store/stats")
+async def get_session_store_stats():
+    """Memory accounting and eviction counters of the session store."""
+    return store.stats()
+
+@app.get("/api/runtime")
+async def get_runtime_stats():
+    """Upload pool utilisation, event-loop lag (responsiveness under load), AI model and cache statistics."""
+    ai_client = getattr(app.state, "ai_client", None)
+    return {
+        "upload_pool": upload_pool.stats(),
+        "event_loop": loop_monitor.stats(),
+        "ai_models": ai_client.model_stats() if ai_client is not None else None,
+        "ai_cache": ai_response_cache.stats(),
+    }
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -279,7 +473,9 @@ async def chat_with_ai_endpoint(request: ChatRequest):
         ai_content = await analyze_with_ai(
             request.category_summaries,
             request.top_transactions,
-            request.user_prompt
+            request.user_prompt,
+            client=getattr(app.state, "ai_client", None),
+            cache=ai_response_cache
         )
         return {"response": ai_content, "text": ai_content}
     except HTTPException:
@@ -287,6 +483,46 @@ async def chat_with_ai_endpoint(request: ChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Systemfehler bei der KI-Analyse: {str(e)}")
 
+def _sse(data: Dict[str, Any], event: str = None) -> str:
+    """One server-sent event; JSON keeps newlines inside tokens from breaking the framing."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Like /api/chat, but relays the answer as server-sent events: `data: {"token": ...}` per
+    token, then `event: done`. Model fallback happens before the response starts, so
+    failures are still plain HTTP errors; a failure mid-stream ends with `event: error`.
+    """
+    try:
+        tokens = await stream_analysis(
+            request.category_summaries,
+            request.top_transactions,
+            request.user_prompt,
+            client=getattr(app.state, "ai_client", None),
+            cache=ai_response_cache
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Systemfehler bei der KI-Analyse: {str(e)}")
+
+    async def events():
+        try:
+            async for token in tokens:
+                yield _sse({"token": token})
+            yield _sse({}, event="done")
+        except AIUnavailable:
+            yield _sse({"detail": "KI-Antwort wurde unterbrochen, bitte erneut versuchen."}, event="error")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering, otherwise the first token is held back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Mount static frontend files
 # This must be at the end so it doesn't catch /api routes
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend", "out")
@@ -1,20 +1,245 @@
-from typing import List, Dict, Any
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Optional, Sequence, Union
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
 import uuid
 
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable via environment (e.g. on Railway)
+DEFAULT_MAX_BYTES = int(float(os.getenv("SESSION_STORE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(2 * 60 * 60)))
+
+# Frame kinds per session: the transactions themselves and derived frames (e.g. the aggregate cube)
+DEFAULT_KIND = "transactions"
+
+# Records sampled per session for the size estimate
+SIZE_SAMPLE_RECORDS = 100
+
+# Text columns stored as pandas categoricals (codes + one copy of each value) when they repeat enough
+CATEGORY_COLUMNS = [
+    'Buchungsdatum', 'Wertstellung', 'Zahlungsempfänger', 'Zahlungspflichtiger', 'Verwendungszweck',
+    'Währung', 'IBAN', 'Kategorie', 'Fixkosten_Kategorie', 'Fixkosten_Grund',
+]
+MAX_CATEGORY_RATIO = 0.5
+
+def compact_frame(data: Any) -> pd.DataFrame:
+    """
+    Columnar session layout: a DataFrame with categorical text columns.
+    Accepts a DataFrame or the legacy list of record dicts.
+    """
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    categorical = {
+        col: 'category' for col in CATEGORY_COLUMNS
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype)
+        # Mostly unique columns (e.g. Verwendungszweck with reference numbers) stay plain strings
+        and df[col].nunique(dropna=False) <= len(df) * MAX_CATEGORY_RATIO
+    }
+    return df.astype(categorical) if categorical else df.copy(deep=False)
+
+def estimate_size(data: Any) -> int:
+    """Approximate memory footprint of a session payload in bytes."""
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(index=True, deep=True).sum())
+    if isinstance(data, list):
+        if not data:
+            return sys.getsizeof(data)
+        sample = data[:SIZE_SAMPLE_RECORDS]
+        sample_bytes = sum(_record_size(record) for record in sample)
+        return sys.getsizeof(data) + int(sample_bytes / len(sample) * len(data))
+    return sys.getsizeof(data)
+
+def _record_size(record: Any) -> int:
+    if isinstance(record, dict):
+        # Keys are interned/shared between records, values are not
+        return sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record.values())
+    return sys.getsizeof(record)
+
+@dataclass
+class _Session:
+    # Frames of one session by kind, with their estimated sizes and the version of their last save
+    frames: Dict[str, pd.DataFrame]
+    sizes: Dict[str, int]
+    last_access: float
+    versions: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return sum(self.sizes.values())
+
 class InMemoryStore:
-    def __init__(self):
-        # Struktur: { session_id: [Transactions] }
-        self._storage: Dict[str, List[Dict[str, Any]]] = {}
+    """
+    Process-local session store with a byte budget.
+    Sessions are evicted least-recently-used first when the budget is exceeded and
+    after ttl_seconds without access. A single session larger than the budget is
+    still kept, but alone.
+    Each session can hold several frames (`kind`). Reading any of them counts as an
+    access to the session, and eviction and clear() always remove all of them, so
+    e.g. the transactions never disappear while the cube of the session is still read.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = DEFAULT_MAX_BYTES, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        # Struktur: { session_id: _Session({kind: DataFrame}) } in access order (oldest first)
+        self._storage: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._metrics = {"hits": 0, "misses": 0, "evictions_lru": 0, "evictions_ttl": 0, "evicted_bytes": 0}
+        # Save versions: never reused by this store, and seeded from the wall clock so versions
+        # handed out before a restart do not match a session saved after it
+        self._generations = itertools.count(time.time_ns())
 
-    def save(self, session_id: str, transactions: List[Dict[str, Any]]):
-        self._storage[session_id] = transactions
+    def save(self, session_id: str, transactions: Union[pd.DataFrame, List[Dict[str, Any]]], kind: str = DEFAULT_KIND):
+        self.save_many(session_id, {kind: transactions})
 
-    def get(self, session_id: str) -> List[Dict[str, Any]]:
-        return self._storage.get(session_id, [])
+    def save_many(self, session_id: str, frames: Dict[str, Union[pd.DataFrame, List[Dict[str, Any]]]]):
+        """Saves several frames of one session ({kind: frame}); readers see all of them or none."""
+        compacted = {kind: compact_frame(data) for kind, data in frames.items()}
+        sizes = {kind: estimate_size(df) for kind, df in compacted.items()}
+        with self._lock:
+            now = self._clock()
+            session = self._storage.get(session_id)
+            if session is None:
+                session = self._storage[session_id] = _Session({}, {}, now)
+            self._bytes += sum(sizes.values()) - sum(session.sizes.get(kind, 0) for kind in sizes)
+            session.frames.update(compacted)
+            session.sizes.update(sizes)
+            session.versions.update(dict.fromkeys(compacted, next(self._generations)))
+            session.last_access = now
+            self._storage.move_to_end(session_id)
+            self._evict_expired(now)
+            self._evict_over_budget()
+
+    def get(self, session_id: str, columns: Optional[Sequence[str]] = None, kind: str = DEFAULT_KIND) -> pd.DataFrame:
+        """
+        The stored session as a DataFrame (empty if unknown or evicted).
+        Returns a shallow copy: no data is copied, and copy-on-write (always on since
+        pandas 3, hence the pin in requirements.txt) keeps changes by the caller out of
+        the stored frame.
+        """
+        df = self.lookup(session_id, columns, kind)
+        return pd.DataFrame() if df is None else df
+
+    def lookup(self, session_id: str, columns: Optional[Sequence[str]] = None,
+               kind: str = DEFAULT_KIND) -> Optional[pd.DataFrame]:
+        """Like get(), but None for a missing session."""
+        data = self._access(session_id, kind)
+        if data is None:
+            return None
+        if columns is not None:
+            return data[[col for col in columns if col in data.columns]]
+        return data.copy(deep=False)
+
+    def column_names(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[List[str]]:
+        """Column names of a stored frame without handing out its data; None for a missing session."""
+        data = self._access(session_id, kind)
+        return None if data is None else list(data.columns)
+
+    def version(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[int]:
+        """
+        Version of a stored frame, different after every save of it (and for a new session under
+        the same id); None for a missing session. Does not count as an access.
+        """
+        with self._lock:
+            self._evict_expired(self._clock())
+            session = self._storage.get(session_id)
+            return None if session is None or kind not in session.frames else session.versions[kind]
 
     def clear(self, session_id: str):
-        if session_id in self._storage:
-            del self._storage[session_id]
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current usage and eviction counters."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._storage),
+                "frames": sum(len(session.frames) for session in self._storage.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                **self._metrics,
+            }
+
+    def _access(self, session_id: str, kind: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+            session = self._storage.get(session_id)
+            data = None if session is None else session.frames.get(kind)
+            if data is None:
+                self._metrics["misses"] += 1
+                return None
+            session.last_access = now
+            self._storage.move_to_end(session_id)
+            self._metrics["hits"] += 1
+            return data
+
+    def _remove(self, session_id: str) -> Optional[_Session]:
+        session = self._storage.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.size
+        return session
+
+    def _evict_expired(self, now: float):
+        if self.ttl_seconds is None:
+            return
+        # Access order: expired sessions are always at the front
+        while self._storage:
+            session_id, session = next(iter(self._storage.items()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._evict(session_id, "evictions_ttl")
+
+    def _evict_over_budget(self):
+        if self.max_bytes is None:
+            return
+        # The most recently saved session is last and therefore never evicted here
+        while self._bytes > self.max_bytes and len(self._storage) > 1:
+            self._evict(next(iter(self._storage)), "evictions_lru")
+
+    def _evict(self, session_id: str, reason: str):
+        session = self._remove(session_id)
+        self._metrics[reason] += 1
+        self._metrics["evicted_bytes"] += session.size
+        logger.info("Session %s evicted (%s, %d frames, %d bytes)", session_id, reason, len(session.frames), session.size)
+
+STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory").lower()
+
+def create_store(backend: str = STORE_BACKEND):
+    """
+    Session store for the configured backend:
+    'memory' (process-local, default), 'disk' (Arrow files + in-memory hot tier, survives restarts)
+    or 'sqlite' (shared by all worker processes on the host, required for --workers > 1).
+    """
+    if backend == "memory":
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+            logger.warning("SESSION_STORE_BACKEND=memory with several workers: sessions are not shared between them")
+        return InMemoryStore()
+    if backend == "disk":
+        try:
+            from .disk_store import DiskSpillStore
+        except ImportError:
+            from disk_store import DiskSpillStore
+        return DiskSpillStore()
+    if backend == "sqlite":
+        try:
+            from .sqlite_store import SqliteStore
+        except ImportError:
+            from sqlite_store import SqliteStore
+        return SqliteStore()
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND: {backend}")
 
 # Globales Objekt für die gesamte Anwendung
-store = InMemoryStore()
+store = create_store()
@@ -0,0 +1,110 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """'a, b,,c' -> ['a', 'b', 'c'] (comma-separated query parameters)."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+def parse_sort(sort: Optional[str], available: Sequence[str]) -> List[Tuple[str, bool]]:
+    """'-Betrag,Buchungsdatum' -> [('Betrag', False), ('Buchungsdatum', True)]; '-' means descending."""
+    keys = []
+    for item in parse_list(sort):
+        column, ascending = (item[1:], False) if item.startswith("-") else (item.lstrip("+"), True)
+        if column not in available:
+            raise ValueError(f"Unknown sort column '{column}'")
+        keys.append((column, ascending))
+    return keys
+
+# Attempts to read a consistent page while the session is being saved concurrently
+PAGE_READ_ATTEMPTS = 3
+
+def encode_cursor(offset: int, sort: List[Tuple[str, bool]], version: int) -> str:
+    """
+    Opaque continuation token: position in the sorted order, the order it belongs to and the
+    version of the session's transactions when it was issued.
+    """
+    raw = json.dumps({"o": offset, "s": [[column, ascending] for column, ascending in sort], "v": version},
+                     separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: List[Tuple[str, bool]], version: int) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        offset, cursor_sort = int(state["o"]), [(column, bool(ascending)) for column, ascending in state["s"]]
+        cursor_version = int(state["v"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if offset < 0 or cursor_sort != sort:
+        raise ValueError("Cursor does not match the requested sort order")
+    if cursor_version != version:
+        # Saved since the cursor was issued: appended, replaced or edited in place
+        raise ValueError("Cursor is stale: the session changed, start again without a cursor")
+    return offset
+
+def sorted_positions(keys: pd.DataFrame, sort: List[Tuple[str, bool]]) -> np.ndarray:
+    """
+    Row positions in the requested order. Stable: ties (and the unsorted case) keep the
+    upload order, so pages of an unchanged session never overlap or skip rows. Missing values sort last.
+    """
+    if not sort:
+        return np.arange(len(keys))
+    ordered = keys.reset_index(drop=True).sort_values(
+        by=[column for column, _ in sort],
+        ascending=[ascending for _, ascending in sort],
+        kind="stable",
+        na_position="last",
+    )
+    return ordered.index.to_numpy()
+
+def transaction_page(store, session_id: str, columns: Optional[str] = None, sort: Optional[str] = None,
+                     cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+    """
+    One page of a stored session: the column names come from the store's schema, only the
+    sort columns are read to order the rows, then only the requested columns of the page rows.
+    Returns None for an unknown session. Cursors carry the store's version of the transactions:
+    a cursor issued before any later save (e.g. an append) is rejected instead of silently
+    shifting the pages, and a save between reading the order and the rows is read again.
+    """
+    for _ in range(PAGE_READ_ATTEMPTS):
+        version = store.version(session_id)
+        available = store.column_names(session_id)
+        if version is None or available is None:
+            return None
+
+        selected = parse_list(columns) or available
+        unknown = [column for column in selected if column not in available]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        sort_keys = parse_sort(sort, available)
+        offset = decode_cursor(cursor, sort_keys, version) if cursor else 0
+
+        if sort_keys:
+            positions = sorted_positions(store.get(session_id, columns=[column for column, _ in sort_keys]), sort_keys)
+        else:
+            positions = None
+        frame = store.get(session_id, columns=selected)
+        if store.version(session_id) == version:
+            break
+    else:
+        raise ValueError("The session is being updated, retry the request")
+
+    total = len(frame)
+    page_positions = positions[offset:offset + limit] if positions is not None else np.arange(offset, min(offset + limit, total))
+    page = frame.iloc[page_positions].reset_index(drop=True)
+    end = offset + len(page)
+    return {
+        "session_id": session_id,
+        "total": total,
+        "count": len(page),
+        "columns": selected,
+        "transactions": page,
+        "next_cursor": encode_cursor(end, sort_keys, version) if end < total else None,
+    }
@@ -1,9 +1,16 @@
 from abc import ABC, abstractmethod
+import io
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, TextIO
 from abc import ABC, abstractmethod
 
+try:
+    from ..tracing import current_trace
+except ImportError:
+    from tracing import current_trace
+
 class InternalTransaction(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     
@@ -19,6 +26,15 @@ class InternalTransaction(BaseModel):
     confidence: float = 1.0  # Unser Confidence Score
     balance_after: Optional[float] = Field(None, alias="Saldo_Danach")
 
+# Streaming: rows per pandas chunk
+STREAM_CHUNK_ROWS = 20_000
+
+# Column layout of InternalTransaction.model_dump(by_alias=True)
+TRANSACTION_COLUMNS = [field.alias or name for name, field in InternalTransaction.model_fields.items()]
+
+def transactions_to_frame(transactions: List[InternalTransaction]) -> pd.DataFrame:
+    return pd.DataFrame([t.model_dump(by_alias=True) for t in transactions], columns=TRANSACTION_COLUMNS)
+
 class BaseParser(ABC):
     @property
     @abstractmethod
@@ -27,4 +43,136 @@ class BaseParser(ABC):
 
     @abstractmethod
     def parse(self, content: str) -> tuple[List[InternalTransaction], Optional[dict]]:
+        """Strict path: one validated InternalTransaction per row."""
         pass
+
+    @abstractmethod
+    def _is_header(self, line: str) -> bool:
+        """True for the column header line of the bank export."""
+        pass
+
+    @abstractmethod
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Columnar conversion of raw CSV rows (all str) into TRANSACTION_COLUMNS, skipping like parse()."""
+        pass
+
+    # read_csv options of the export and the skiprows fallback if no header line is found
+    read_options: Dict[str, Any] = {"sep": ";"}
+    fallback_skiprows: Any = None
+
+    def _scan_metadata(self, line: str, metadata: dict) -> None:
+        """Hook for metadata lines above the header (e.g. account balance)."""
+        pass
+
+    def parse_frame(self, content: str) -> tuple[pd.DataFrame, Optional[dict]]:
+        """Columnar path: normalized transactions as DataFrame (TRANSACTION_COLUMNS), same rows as parse()."""
+        return self.parse_stream(io.StringIO(content))
+
+    def parse_stream(self, stream: TextIO, chunk_rows: int = STREAM_CHUNK_ROWS) -> tuple[pd.DataFrame, Optional[dict]]:
+        """
+        Columnar path over a seekable text stream. The header is searched line by line
+        (however long the metadata preamble is), then pandas reads the rows in chunks of
+        chunk_rows, so the raw text is never held in memory as a whole.
+        """
+        metadata: dict = {}
+        header_pos = None
+        while True:
+            pos = stream.tell()
+            line = stream.readline()
+            if not line:
+                break
+            self._scan_metadata(line, metadata)
+            if self._is_header(line):
+                header_pos = pos
+                break
+
+        stream.seek(0 if header_pos is None else header_pos)
+        skiprows = self.fallback_skiprows if header_pos is None else None
+        reader = pd.read_csv(stream, dtype=str, chunksize=chunk_rows, skiprows=skiprows, **self.read_options)
+
+        frames = [self._normalize(chunk) for chunk in reader]
+        if not frames:
+            return pd.DataFrame(columns=TRANSACTION_COLUMNS), metadata
+        return pd.concat(frames, ignore_index=True), metadata
+
+    def parse_dataframe(self, content: str, strict: bool = False) -> tuple[pd.DataFrame, Optional[dict]]:
+        """
+        Transactions as DataFrame. strict=True validates every row through the pydantic model
+        (slow, per row), the default normalizes whole columns at once.
+        """
+        if strict:
+            transactions, metadata = self.parse(content)
+            return transactions_to_frame(transactions), metadata
+        return self.parse_frame(content)
+
+    def _build_frame(self, columns: Dict[str, Any], keep: pd.Series) -> pd.DataFrame:
+        """Assembles the normalized columns in model order and drops skipped rows."""
+        frame = pd.DataFrame({
+            alias: columns.get(alias, _column_default(alias)) for alias in TRANSACTION_COLUMNS
+        }, index=keep.index)
+        return frame[keep].reset_index(drop=True)
+
+    def _count_skipped(self, reason: str, count: int) -> None:
+        trace = current_trace()
+        if trace is not None and count:
+            trace.count("parser_skipped_rows", f"{self.bank_name}: {reason}", count)
+
+def _column_default(alias: str) -> Any:
+    for name, field in InternalTransaction.model_fields.items():
+        if (field.alias or name) == alias:
+            return field.default
+    return None
+
+def text_column(df: pd.DataFrame, names: List[str], default: str = "") -> pd.Series:
+    """First existing column of names as text, mirroring str(row.get(...)) - missing values become 'nan'."""
+    for name in names:
+        if name in df.columns:
+            return df[name].astype(str).fillna("nan")
+    return pd.Series(default, index=df.index, dtype=object)
+
+def has_date(values: pd.Series) -> pd.Series:
+    """Rows the parsers consider at all: date present, not blank and not the literal 'none'."""
+    text = values.astype(str).fillna("")
+    return values.notna() & (text.str.strip() != "") & (text.str.lower() != "none")
+
+def iso_dates(values: pd.Series) -> pd.Series:
+    """
+    German dates (day first) to 'YYYY-MM-DD' for a whole column; unparsable values become NaN.
+    The common 'DD.MM.YYYY' layout is parsed vectorized, other layouts once per distinct value.
+    """
+    text = values.astype(str)
+    parsed = pd.to_datetime(text, format="%d.%m.%Y", errors="coerce")
+
+    open_rows = parsed.isna() & text.notna()
+    if open_rows.any():
+        leftovers = {value: _parse_date_or_nat(value) for value in text[open_rows].unique()}
+        parsed = parsed.fillna(text[open_rows].map(leftovers))
+    return parsed.dt.strftime("%Y-%m-%d")
+
+def _parse_date_or_nat(value: str):
+    try:
+        return pd.to_datetime(value, dayfirst=True)
+    except Exception:
+        return pd.NaT
+
+def german_amounts(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    '1.234,56' to 1234.56 for a whole column. Returns (amounts, valid).
+    Mirrors float(): 'nan' is a valid (NaN) amount, anything float() rejects is invalid.
+    """
+    text = values.astype(str).fillna("nan").str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    amounts = pd.to_numeric(text, errors="coerce").astype(float)
+    valid = pd.Series(True, index=values.index)
+
+    open_rows = amounts.isna()
+    if open_rows.any():
+        leftovers = {value: _float_or_none(value) for value in text[open_rows].unique()}
+        valid[open_rows] = text[open_rows].map(lambda v: leftovers[v] is not None)
+        amounts[open_rows] = text[open_rows].map(lambda v: leftovers[v] if leftovers[v] is not None else np.nan)
+    return amounts, valid
+
+def _float_or_none(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
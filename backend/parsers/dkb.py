@@ -1,46 +1,64 @@
 import pandas as pd
 import io
-from .base import BaseParser, InternalTransaction
+import logging
+import re
+from .base import BaseParser, InternalTransaction, german_amounts, has_date, iso_dates, text_column
 from typing import List, Optional
 
+logger = logging.getLogger(__name__)
+
 class DKBParser(BaseParser):
     @property
     def bank_name(self) -> str:
         return "DKB"
 
-    def parse(self, content: str) -> tuple[List[InternalTransaction], Optional[dict]]:
+    read_options = {"sep": ";"}
+    fallback_skiprows = range(0, 4)
+
+    def _is_header(self, line: str) -> bool:
+        return "Buchungsdatum" in line and "Zahlungsempfänger" in line
+
+    def _scan_metadata(self, line: str, metadata: dict) -> None:
+        # Try to extract balance metadata
+        line = line.rstrip("\r\n")
+        if "Kontostand" in line:
+            try:
+                # Sucht nach Beträgen wie 1.234,56 oder 1234,56 (optional mit Minus)
+                match = re.search(r'(-?\d+(?:\.\d+)*,\d+)', line)
+                if match:
+                    value_str = match.group(1)
+                    metadata["balance"] = float(value_str.replace('.', '').replace(',', '.'))
+                    
+                    # Label extrahieren: Alles vor dem ersten Semikolon oder dem Betrag
+                    label_part = line.split(';')[0].strip('"').replace(':', '').strip()
+                    metadata["balance_label"] = label_part
+            except Exception as e:
+                logger.debug("Could not parse balance: %s", e)
+
+    def _read(self, content: str) -> tuple[pd.DataFrame, dict]:
         # DKB nutzt oft Metadaten-Zeilen. Wir suchen dynamisch nach dem Header.
         lines = content.splitlines()
         header_idx = -1
         metadata = {}
         
         for i, line in enumerate(lines):
-            # Try to extract balance metadata
-            if "Kontostand" in line:
-                try:
-                    import re
-                    # Sucht nach Beträgen wie 1.234,56 oder 1234,56 (optional mit Minus)
-                    match = re.search(r'(-?\d+(?:\.\d+)*,\d+)', line)
-                    if match:
-                        value_str = match.group(1)
-                        metadata["balance"] = float(value_str.replace('.', '').replace(',', '.'))
-                        
-                        # Label extrahieren: Alles vor dem ersten Semikolon oder dem Betrag
-                        label_part = line.split(';')[0].strip('"').replace(':', '').strip()
-                        metadata["balance_label"] = label_part
-                except Exception as e:
-                    print(f"DEBUG: Could not parse balance: {e}")
-
-            if "Buchungsdatum" in line and "Zahlungsempfänger" in line:
+            self._scan_metadata(line, metadata)
+            if self._is_header(line):
                 header_idx = i
                 break
         
         if header_idx == -1:
             # Fallback: Versuche es trotzdem mit skiprows, falls der Header anders aussieht
-            df = pd.read_csv(io.StringIO(content), sep=';', skiprows=range(0, 4))
+            df = pd.read_csv(io.StringIO(content), sep=';', skiprows=range(0, 4), dtype=str)
         else:
-            df = pd.read_csv(io.StringIO("\n".join(lines[header_idx:])), sep=';')
-        
+            # dtype=str like parse_stream: amounts, IBANs and references are never inferred as numbers
+            df = pd.read_csv(io.StringIO("\n".join(lines[header_idx:])), sep=';', dtype=str)
+
+        return df, metadata
+
+    def parse(self, content: str) -> tuple[List[InternalTransaction], Optional[dict]]:
+        df, metadata = self._read(content)
+
         transactions = []
         for _, row in df.iterrows():
             # Skip empty rows or rows without a date
@@ -52,28 +70,78 @@ class DKBParser(BaseParser):
             amount_raw = row.get('Betrag (€)', '0')
             amount_str = str(amount_raw).replace('.', '').replace(',', '.')
             
+            # Skip reasons as counted by _normalize: date, value date, amount
+            reason = "invalid date"
             try:
                 # Datum in ISO Format konvertieren (YYYY-MM-DD)
                 iso_date = pd.to_datetime(str(date_val), dayfirst=True).strftime('%Y-%m-%d')
                 
+                reason = "invalid value date"
                 value_date_val = row.get('Wertstellung')
                 iso_value_date = None
                 if pd.notna(value_date_val) and str(value_date_val).strip():
                     iso_value_date = pd.to_datetime(str(value_date_val), dayfirst=True).strftime('%Y-%m-%d')
 
+                reason = "invalid amount"
+                amount = float(amount_str)
+
+                reason = "invalid row"
                 tx = InternalTransaction(
                     date=iso_date,
                     value_date=iso_value_date,
                     recipient=str(row.get('Zahlungsempfänger*in', row.get('Zahlungsempfänger', ''))),
                     sender=str(row.get('Zahlungspflichtige*r', row.get('Zahlungspflichtiger', ''))),
                     purpose=str(row.get('Verwendungszweck', '')),
-                    amount=float(amount_str),
+                    amount=amount,
                     iban=str(row.get('IBAN', '')),
                     confidence=1.0
                 )
                 transactions.append(tx)
-            except Exception as e:
-                print(f"DEBUG: Skipping row due to error: {e}")
+            except Exception:
+                self._count_skipped(reason, 1)
                 continue
                 
         return transactions, metadata
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        # Skip empty rows or rows without a date
+        if 'Buchungsdatum' in df.columns:
+            present = has_date(df['Buchungsdatum'])
+        else:
+            present = pd.Series(False, index=df.index)
+
+        # Datum in ISO Format konvertieren (YYYY-MM-DD)
+        iso_date = iso_dates(df['Buchungsdatum'].where(present)) if present.any() else pd.Series(None, index=df.index, dtype=object)
+
+        # Wertstellung is optional: only non-blank values are converted (and may fail)
+        if 'Wertstellung' in df.columns:
+            value_raw = df['Wertstellung']
+            has_value_date = present & value_raw.notna() & (value_raw.astype(str).str.strip() != "")
+        else:
+            has_value_date = pd.Series(False, index=df.index)
+        iso_value_date = iso_dates(value_raw.where(has_value_date)) if has_value_date.any() else None
+
+        # Betrag von "1.234,56" zu float 1234.56 konvertieren
+        amount_raw = df['Betrag (€)'] if 'Betrag (€)' in df.columns else pd.Series('0', index=df.index)
+        amounts, valid_amount = german_amounts(amount_raw)
+
+        # Same skip order as the row-wise path: date, value date, amount
+        bad_date = present & iso_date.isna()
+        bad_value_date = ~bad_date & has_value_date & (iso_value_date.isna() if iso_value_date is not None else False)
+        bad_amount = present & ~bad_date & ~bad_value_date & ~valid_amount
+        self._count_skipped("invalid date", int(bad_date.sum()))
+        self._count_skipped("invalid value date", int(bad_value_date.sum()))
+        self._count_skipped("invalid amount", int(bad_amount.sum()))
+
+        keep = present & ~bad_date & ~bad_value_date & ~bad_amount
+        frame = self._build_frame({
+            'Buchungsdatum': iso_date,
+            'Wertstellung': iso_value_date,
+            'Zahlungsempfänger': text_column(df, ['Zahlungsempfänger*in', 'Zahlungsempfänger']),
+            'Zahlungspflichtiger': text_column(df, ['Zahlungspflichtige*r', 'Zahlungspflichtiger']),
+            'Verwendungszweck': text_column(df, ['Verwendungszweck']),
+            'Betrag': amounts,
+            'IBAN': text_column(df, ['IBAN']),
+            'confidence': 1.0,
+        }, keep)
+        return frame
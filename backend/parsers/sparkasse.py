@@ -1,19 +1,24 @@
 import pandas as pd
 import io
 from typing import List, Optional
-from .base import BaseParser, InternalTransaction
+from .base import BaseParser, InternalTransaction, german_amounts, has_date, iso_dates, text_column
 
 class SparkasseParser(BaseParser):
     @property
     def bank_name(self) -> str:
         return "Sparkasse"
 
-    def parse(self, content: str) -> tuple[List[InternalTransaction], Optional[dict]]:
+    read_options = {"sep": ";", "quotechar": '"'}
+
+    def _is_header(self, line: str) -> bool:
+        return "Buchungstag" in line and ("Begünstigter" in line or "Zahlungspflichtiger" in line)
+
+    def _read(self, content: str) -> pd.DataFrame:
         lines = content.splitlines()
         header_idx = -1
         for i, line in enumerate(lines):
             # Suche nach der Header-Zeile
-            if "Buchungstag" in line and ("Begünstigter" in line or "Zahlungspflichtiger" in line):
+            if self._is_header(line):
                 header_idx = i
                 break
         
@@ -27,6 +32,10 @@ class SparkasseParser(BaseParser):
                 quotechar='"',
                 dtype=str
             )
+        return df
+
+    def parse(self, content: str) -> tuple[List[InternalTransaction], Optional[dict]]:
+        df = self._read(content)
 
         transactions = []
         for _, row in df.iterrows():
@@ -34,6 +43,8 @@ class SparkasseParser(BaseParser):
             if pd.isna(date_val) or str(date_val).strip() == "" or str(date_val).lower() == "none":
                 continue
             
+            # Skip reasons as counted by _normalize: date, amount
+            reason = "invalid date"
             try:
                 # Betrag von "1.234,56" zu float 1234.56 konvertieren
                 amount_raw = row.get('Betrag', '0')
@@ -41,18 +52,52 @@ class SparkasseParser(BaseParser):
                 
                 # Datum in ISO Format konvertieren (YYYY-MM-DD)
                 iso_date = pd.to_datetime(str(date_val), dayfirst=True).strftime('%Y-%m-%d')
-                    
+
+                reason = "invalid amount"
+                amount = float(amount_str)
+
+                reason = "invalid row"
                 tx = InternalTransaction(
                     date=iso_date,
                     recipient=str(row.get('Begünstigter/Zahlungspflichtiger', row.get('Begünstigter', "Unbekannt"))),
                     purpose=str(row.get('Verwendungszweck', "")),
-                    amount=float(amount_str),
+                    amount=amount,
                     iban=str(row.get('Kontonummer/IBAN', "")),
                     confidence=1.0
                 )
                 transactions.append(tx)
-            except Exception as e:
-                print(f"DEBUG: Skipping row due to error: {e}")
+            except Exception:
+                self._count_skipped(reason, 1)
                 continue
             
         return transactions, {}
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        if 'Buchungstag' in df.columns:
+            present = has_date(df['Buchungstag'])
+        else:
+            present = pd.Series(False, index=df.index)
+
+        # Datum in ISO Format konvertieren (YYYY-MM-DD)
+        iso_date = iso_dates(df['Buchungstag'].where(present)) if present.any() else pd.Series(None, index=df.index, dtype=object)
+
+        # Betrag von "1.234,56" zu float 1234.56 konvertieren
+        amount_raw = df['Betrag'] if 'Betrag' in df.columns else pd.Series('0', index=df.index)
+        amounts, valid_amount = german_amounts(amount_raw)
+
+        # Same skip order as the row-wise path: date, amount
+        bad_date = present & iso_date.isna()
+        bad_amount = present & ~bad_date & ~valid_amount
+        self._count_skipped("invalid date", int(bad_date.sum()))
+        self._count_skipped("invalid amount", int(bad_amount.sum()))
+
+        keep = present & ~bad_date & ~bad_amount
+        frame = self._build_frame({
+            'Buchungsdatum': iso_date,
+            'Zahlungsempfänger': text_column(df, ['Begünstigter/Zahlungspflichtiger', 'Begünstigter'], "Unbekannt"),
+            'Verwendungszweck': text_column(df, ['Verwendungszweck']),
+            'Betrag': amounts,
+            'IBAN': text_column(df, ['Kontonummer/IBAN']),
+            'confidence': 1.0,
+        }, keep)
+        return frame
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "256"))
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", str(60 * 60)))
+
+def category_entry(cat: Dict[str, Any]) -> List[Any]:
+    """The prompt fields of a category summary, normalized; also their sort order in key and prompt."""
+    return [str(cat['name']), round(float(cat['amount']), 2), int(cat['count'])]
+
+def analysis_cache_key(category_summaries: List[Dict[str, Any]], top_transactions: List[Dict[str, Any]],
+                       user_prompt: Optional[str]) -> str:
+    """
+    sha256 over the normalized analysis input: only the fields that end up in the prompt,
+    amounts rounded to cents, categories independent of their order
+    (build_ai_messages lists them in the same sorted order).
+    """
+    normalized = {
+        "categories": sorted(category_entry(cat) for cat in category_summaries),
+        "transactions": [
+            [str(tx['Buchungsdatum']), str(tx['Zahlungsempfänger']), round(float(tx['Betrag']), 2), str(tx['Verwendungszweck'])]
+            for tx in top_transactions
+        ],
+        "prompt": (user_prompt or "").strip(),
+    }
+    canonical = json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Content-addressed cache for AI answers: entries expire after ttl_seconds, and beyond
+    max_entries the least recently used entry is dropped.
+    """
+
+    def __init__(self, max_entries: int = AI_CACHE_MAX_ENTRIES, ttl_seconds: Optional[float] = AI_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        # Struktur: { key: (stored_at, value) } in access order (oldest first)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "evictions_lru": 0, "evictions_ttl": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                self._metrics["evictions_ttl"] += 1
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock(), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions_lru"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self._metrics,
+            }
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds
+
+# Globales Objekt für die gesamte Anwendung
+ai_response_cache = ResponseCache()
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Uploads processed at the same time, and uploads allowed to wait for a free slot
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", str(min(4, os.cpu_count() or 1))))
+UPLOAD_MAX_QUEUE = int(os.getenv("UPLOAD_MAX_QUEUE", str(2 * UPLOAD_MAX_CONCURRENCY)))
+# Suggested client back-off (Retry-After header) when the pool is saturated
+UPLOAD_RETRY_AFTER_SECONDS = 5
+
+class PoolSaturated(Exception):
+    """All processing slots and queue places are taken."""
+
+class BoundedPool:
+    """
+    Thread pool for the CPU-heavy upload pipeline with admission control.
+    At most max_workers jobs run, at most max_queue more wait; further submissions are
+    rejected immediately (PoolSaturated) instead of piling up behind the event loop.
+    Threads instead of processes: read_csv and most vectorized pandas/numpy work release
+    the GIL, and the resulting DataFrames would otherwise have to be pickled back.
+    """
+
+    def __init__(self, max_workers: int = UPLOAD_MAX_CONCURRENCY, max_queue: int = UPLOAD_MAX_QUEUE,
+                 name: str = "upload"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {"completed": 0, "failed": 0, "rejected": 0, "max_in_flight": 0}
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._metrics["rejected"] += 1
+                raise PoolSaturated()
+            self._in_flight += 1
+            self._metrics["max_in_flight"] = max(self._metrics["max_in_flight"], self._in_flight)
+
+        # Run inside a copy of the current context so request-scoped ContextVars (trace) carry over
+        future = self._executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        # Released when the job really ends, even if the awaiting request was cancelled meanwhile
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            failed = future.cancelled() or future.exception() is not None
+            self._metrics["failed" if failed else "completed"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                **self._metrics,
+            }
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness: a task sleeps for `interval` and records how much
+    later than requested it woke up. Blocking work on the loop shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record(time.perf_counter() - start - self.interval)
+
+    def record(self, lag: float):
+        lag = max(0.0, lag)
+        self._samples.append(lag)
+        self._max_lag = max(self._max_lag, lag)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+
+        def percentile(q: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 2)
+
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "samples": len(samples),
+            "lag_p50_ms": percentile(0.5),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(self._max_lag * 1000, 2),
+        }
+
+# Globale Objekte für die gesamte Anwendung
+upload_pool = BoundedPool()
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,155 @@
+import gzip
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+import orjson
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    from .memory_store import MAX_CATEGORY_RATIO
+except ImportError:
+    from memory_store import MAX_CATEGORY_RATIO
+
+try:
+    import brotli
+except ImportError:
+    # Optional: without it responses are gzip-compressed only
+    brotli = None
+
+# NaN/inf become null (like pandas), numpy arrays and scalars are encoded natively
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Opt-in column-oriented layout for DataFrames, selected via the Accept header
+COLUMNAR_MEDIA_TYPE = "application/vnd.finance-analyzer.columnar+json"
+
+# Bodies below this size are sent uncompressed (header overhead and CPU are not worth it)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+# Quality 11 compresses slightly better but is an order of magnitude slower
+BROTLI_QUALITY = 5
+
+def frame_records_json(df: pd.DataFrame) -> bytes:
+    """
+    DataFrame -> JSON array of row objects, encoded column-wise by pandas without building
+    a list of dicts first. NaN/None -> null, bools -> true/false, timestamps as ISO strings.
+    """
+    if df.empty:
+        return b"[]"
+    # double_precision=15 is the maximum; amounts with cents round-trip unchanged
+    return df.to_json(orient='records', force_ascii=False, double_precision=15, date_format='iso').encode("utf-8")
+
+def frame_columnar_json(df: pd.DataFrame) -> bytes:
+    """
+    DataFrame -> {"length": n, "columns": {name: [values...] | {"dictionary": [...], "codes": [...]}}}.
+    Repeating text columns are dictionary-encoded: each distinct value once, rows as indices
+    into the dictionary (-1 = null).
+    """
+    parts: List[bytes] = []
+    for name in df.columns:
+        column = df[name]
+        if _dictionary_encoded(column):
+            codes, uniques = pd.factorize(column)
+            encoded = orjson.dumps({"dictionary": list(uniques), "codes": codes}, default=_fallback, option=ORJSON_OPTIONS)
+        else:
+            encoded = column.to_json(orient='records', force_ascii=False, double_precision=15, date_format='iso').encode("utf-8")
+        parts.append(orjson.dumps(str(name)) + b":" + encoded)
+    return b'{"length":' + str(len(df)).encode("ascii") + b',"columns":{' + b",".join(parts) + b"}}"
+
+def _dictionary_encoded(column: pd.Series) -> bool:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return True
+    if not (pd.api.types.is_string_dtype(column.dtype) or column.dtype == object):
+        return False
+    # Same rule as the session store: mostly unique text stays a plain array
+    return column.nunique(dropna=False) <= len(column) * MAX_CATEGORY_RATIO
+
+def dumps(content: Any, layout: str = "records") -> bytes:
+    """
+    JSON bytes for a response payload. Top-level DataFrame values are serialized with
+    frame_records_json (or frame_columnar_json) and spliced into the orjson-encoded envelope.
+    """
+    encode_frame = frame_columnar_json if layout == "columnar" else frame_records_json
+    frames: Dict[bytes, pd.DataFrame] = {}
+    if isinstance(content, dict):
+        envelope = {}
+        for key, value in content.items():
+            if isinstance(value, pd.DataFrame):
+                placeholder = f"__frame_{uuid.uuid4().hex}__"
+                frames[orjson.dumps(placeholder)] = value
+                value = placeholder
+            envelope[key] = value
+        content = envelope
+
+    body = orjson.dumps(content, default=_fallback, option=ORJSON_OPTIONS)
+    for placeholder, df in frames.items():
+        body = body.replace(placeholder, encode_frame(df), 1)
+    return body
+
+def _fallback(value: Any) -> Any:
+    # Everything orjson does not know natively (pydantic models, sets, Decimal, ...)
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, pd.DataFrame):
+        # Nested frames take the slow path; only top-level frames are spliced
+        return value.to_dict(orient='records')
+    return jsonable_encoder(value)
+
+def negotiate_layout(accept: Optional[str]) -> str:
+    """'columnar' if the client lists COLUMNAR_MEDIA_TYPE in its Accept header, else 'records'."""
+    offered = {media_type for media_type, quality in _parse_header(accept) if quality > 0}
+    return "columnar" if COLUMNAR_MEDIA_TYPE in offered else "records"
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred supported Content-Encoding: br (if available), then gzip, else None."""
+    offered = {coding: quality for coding, quality in _parse_header(accept_encoding)}
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if offered.get(coding, offered.get("*", 0)) > 0:
+            return coding
+    return None
+
+def _parse_header(value: Optional[str]) -> List[tuple]:
+    """'gzip;q=0.5, br' -> [('gzip', 0.5), ('br', 1.0)]"""
+    result = []
+    for item in (value or "").split(","):
+        token, _, params = item.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        result.append((token.strip().lower(), quality))
+    return result
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+def negotiated_response(content: Any, accept: Optional[str] = None, accept_encoding: Optional[str] = None) -> Response:
+    """
+    Fully rendered JSON response in the layout and compression the client asked for.
+    Runs wherever it is called, so callers in the upload pool compress off the event loop.
+    """
+    layout = negotiate_layout(accept)
+    body = dumps(content, layout=layout)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESSION_MIN_BYTES else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    media_type = COLUMNAR_MEDIA_TYPE if layout == "columnar" else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -1,8 +1,8 @@
 import os
+import numpy as np
 import pandas as pd
-import requests
 from fastapi import HTTPException
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Sequence, Tuple, Union
 
 CATEGORIES = {
     "Wohnen": ["Miete", "Nebenkosten", "Strom", "Gas", "Vermieter", "Hausverwaltung", "Grundsteuer", "Rundfunkbeitrag", "GEZ"],
@@ -19,41 +19,49 @@ CATEGORIES = {
 
 try:
     from .logic.detector import FixedCostDetector, FixedCostCategory
+    from .logic.matcher import KeywordMatcher
+    from .tracing import current_trace
+    from .ai_client import OpenRouterClient, AIRequestError, AIUnavailable
+    from .response_cache import ResponseCache, analysis_cache_key, category_entry
 except ImportError:
     from logic.detector import FixedCostDetector, FixedCostCategory
+    from logic.matcher import KeywordMatcher
+    from tracing import current_trace
+    from ai_client import OpenRouterClient, AIRequestError, AIUnavailable
+    from response_cache import ResponseCache, analysis_cache_key, category_entry
+
+CATEGORY_TABLE = "categories"
+
+# One shared keyword automaton for the detector tables and CATEGORIES, compiled once at startup
+keyword_matcher = KeywordMatcher()
 
 # Global instance for consistent detection
-detector = FixedCostDetector()
+detector = FixedCostDetector(matcher=keyword_matcher)
+
+keyword_matcher.add_table(CATEGORY_TABLE, CATEGORIES)
+keyword_matcher.build()
 
 def detect_recurring_patterns(df: pd.DataFrame) -> pd.DataFrame:
     """Detect recurring transactions based on frequency and amount."""
     if df.empty:
         return df
 
-    # Ensure Buchungsdatum is datetime
-    df['temp_date'] = pd.to_datetime(df['Buchungsdatum'], errors='coerce')
+    # Ensure Buchungsdatum is datetime (on a copy, the caller's frame stays untouched)
+    df = df.assign(temp_date=pd.to_datetime(df['Buchungsdatum'], errors='coerce'))
     
     # Sort by date
     df = df.sort_values(['Zahlungsempfänger', 'Betrag', 'temp_date'])
     
-    # Initialize column
-    df['Wiederkehrend'] = False
-    
-    # Group by Payee and Amount to find potential patterns
-    groups = df.groupby(['Zahlungsempfänger', 'Betrag'])
-    
-    for (payee, amount), group in groups:
-        if len(group) < 2:
-            continue
-            
-        # Calculate diffs between dates in days
-        diffs = group['temp_date'].diff().dt.days
-        
-        # Check if any diff is in the typical monthly range (27-34 days)
-        is_monthly = diffs.apply(lambda x: 27 <= x <= 34 if pd.notna(x) else False).any()
-        
-        if is_monthly:
-            df.loc[group.index, 'Wiederkehrend'] = True
+    # After sorting, every (Zahlungsempfänger, Betrag) group is a contiguous run of rows
+    payee, amount = df['Zahlungsempfänger'], df['Betrag']
+    same_group = ((payee == payee.shift()) & (amount == amount.shift())).to_numpy()
+    group_ids = np.cumsum(~same_group)
+
+    # Check if any diff inside a group is in the typical monthly range (27-34 days)
+    diffs = df['temp_date'].diff().dt.days
+    is_monthly = (diffs.between(27, 34).to_numpy() & same_group).astype(np.int64)
+    monthly_groups = np.bincount(group_ids, weights=is_monthly) > 0
+    df['Wiederkehrend'] = monthly_groups[group_ids]
             
     # Cleanup
     df = df.drop(columns=['temp_date'])
@@ -84,14 +92,46 @@ def categorize_transaction(row: pd.Series) -> str:
 
     # Fallback to legacy categorization for non-fixed costs
     text = f"{str(row['Zahlungsempfänger']).lower()} {str(row['Verwendungszweck']).lower()}"
-    for category, keywords in CATEGORIES.items():
-        if any(keyword.lower() in text for keyword in keywords):
-            return category
+    match = keyword_matcher.first_match(text, CATEGORY_TABLE)
+    if match:
+        return match[0]
             
-    # DEBUG: Log uncategorized items to help refine categories
-    print(f"UNCATEGORIZED (Sonstiges): {row.get('Zahlungsempfänger', 'Unknown')} | {row.get('Verwendungszweck', 'Unknown')} | {row.get('Betrag', 0)}")
+    # Count uncategorized payees to help refine categories (only when tracing is enabled)
+    trace = current_trace()
+    if trace is not None:
+        trace.count("uncategorized_payees", row.get('Zahlungsempfänger', 'Unknown'))
     return "Sonstiges"
 
+def classify_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combined classification stage: fixed-cost detection and categorization in one pass.
+    Adds the Fixkosten_* columns, the legacy 'Fixkosten' flag and 'Kategorie', so every
+    transaction is analyzed exactly once (same results as process_dataframe + categorize_transaction).
+    """
+    df = detector.process_dataframe(df)
+    df['Fixkosten'] = df['Fixkosten_Status']
+
+    # Confident fixed-cost hits keep their detector category
+    confident = (df['Fixkosten_Kategorie'] != FixedCostCategory.NONE.value) & (df['Fixkosten_Confidence'] >= 0.4)
+    categories = df['Fixkosten_Kategorie'].where(confident, "Sonstiges").to_numpy(dtype=object)
+
+    # Fallback to legacy CATEGORIES only for the remaining rows
+    open_rows = ~confident.to_numpy()
+    if open_rows.any():
+        text = detector.transaction_text(df)
+        ranks = keyword_matcher.match_series(text, CATEGORY_TABLE, mask=open_rows)
+        entries = keyword_matcher.entries(CATEGORY_TABLE)
+        hit_rows = ranks >= 0
+        categories[hit_rows] = [entries[rank][0] for rank in ranks[hit_rows]]
+
+        trace = current_trace()
+        if trace is not None:
+            uncategorized = df.loc[open_rows & ~hit_rows, 'Zahlungsempfänger']
+            trace.update("uncategorized_payees", uncategorized.value_counts(dropna=False))
+
+    df['Kategorie'] = categories
+    return df
+
 def calculate_50_30_20_metrics(df: pd.DataFrame) -> Dict[str, Any]:
     """
     Calculates 50-30-20 metrics:
@@ -140,17 +180,115 @@ def calculate_50_30_20_metrics(df: pd.DataFrame) -> Dict[str, Any]:
         }
     }
 
-async def analyze_with_ai(category_summaries: List[Dict[str, Any]], top_transactions: List[Dict[str, Any]], user_prompt: str = None) -> str:
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not found in .env")
-    
-    models_to_try = [
-        "google/gemini-2.0-flash-exp:free",
-        "google/gemma-3-27b-it:free",
-        "meta-llama/llama-3.3-70b-instruct:free"
+# Dimensions of the per-session aggregate cube (month x category x fixed/variable x income/expense)
+CUBE_DIMENSIONS = ['month', 'Kategorie', 'Fixkosten_Kategorie', 'Fixkosten', 'direction']
+
+def build_aggregate_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pre-aggregates the classified transactions once per upload: Betrag sum and count per
+    CUBE_DIMENSIONS cell. Dashboard endpoints read this instead of the transactions,
+    so they scale with the number of categories and months, not with the rows.
+    Because income and expense cells are kept apart, calculate_50_30_20_metrics works on the cube unchanged.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + ['Betrag', 'count'])
+
+    # Parse each distinct date once (a statement has far fewer days than rows)
+    codes, uniques = pd.factorize(df['Buchungsdatum'], use_na_sentinel=False)
+    months = pd.to_datetime(pd.Series(uniques, dtype=object), format='%Y-%m-%d', errors='coerce').dt.strftime('%Y-%m')
+    months = months.fillna("unbekannt").to_numpy(dtype=object)
+
+    betrag = df['Betrag'].to_numpy(dtype=float)
+    keys = pd.DataFrame({
+        'month': months[codes],
+        'Kategorie': df['Kategorie'].to_numpy(dtype=object),
+        'Fixkosten_Kategorie': df['Fixkosten_Kategorie'].to_numpy(dtype=object),
+        'Fixkosten': df['Fixkosten'].to_numpy(dtype=bool),
+        'direction': np.select([betrag > 0, betrag < 0], ["income", "expense"], default="zero"),
+        'Betrag': betrag,
+    })
+    cube = keys.groupby(CUBE_DIMENSIONS, dropna=False, observed=True, sort=True)['Betrag'].agg(['sum', 'count'])
+    return cube.rename(columns={'sum': 'Betrag'}).reset_index()
+
+# Rolling windows (in months) reported next to the monthly series
+METRIC_WINDOWS = (3, 6, 12)
+
+def calculate_monthly_metrics(cube: pd.DataFrame, windows: Sequence[int] = METRIC_WINDOWS,
+                              start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """
+    50-30-20 series from the aggregate cube: one entry per calendar month plus trailing
+    rolling windows (sum over the last n months, only where n months of history exist).
+    start/end ('YYYY-MM', inclusive) filter the output; windows at the start of the range
+    still include the months before it. Months without transactions count as zero.
+    """
+    dated = cube[cube['month'] != "unbekannt"]
+    months = pd.PeriodIndex(dated['month'].astype(str), freq='M')
+    amount = dated['Betrag'].to_numpy(dtype=float)
+    expense = np.where(amount < 0, -amount, 0.0)
+    fixed = dated['Fixkosten'].to_numpy(dtype=bool)
+
+    totals = pd.DataFrame({
+        'income': np.where(amount > 0, amount, 0.0),
+        'needs': np.where(fixed, expense, 0.0),
+        'wants': np.where(fixed, 0.0, expense),
+    }, index=months).groupby(level=0).sum()
+
+    result: Dict[str, Any] = {"months": [], "monthly": [], "rolling": {}}
+    if totals.empty:
+        result["rolling"] = {str(window): [] for window in windows}
+        return result
+
+    # Calendar-complete month index so rolling windows span months, not rows
+    totals = totals.reindex(pd.period_range(totals.index.min(), totals.index.max(), freq='M'), fill_value=0.0)
+    series = {"monthly": totals}
+    for window in windows:
+        series[str(window)] = totals.rolling(window, min_periods=window).sum()
+
+    visible = np.ones(len(totals), dtype=bool)
+    if start:
+        visible &= totals.index >= pd.Period(start, freq='M')
+    if end:
+        visible &= totals.index <= pd.Period(end, freq='M')
+
+    result["months"] = totals.index[visible].strftime('%Y-%m').tolist()
+    for name, frame in series.items():
+        entries = _metric_entries(frame[visible], result["months"])
+        if name == "monthly":
+            result["monthly"] = entries
+        else:
+            result["rolling"][name] = entries
+    return result
+
+def _metric_entries(totals: pd.DataFrame, months: List[str]) -> List[Dict[str, Any]]:
+    income = totals['income']
+    savings = (income - totals['needs'] - totals['wants']).clip(lower=0)
+    # Same shape of numbers as calculate_50_30_20_metrics; percentages are undefined without income
+    share = income.where(income > 0)
+    table = pd.DataFrame({
+        'month': months,
+        'income': income.round(2).to_numpy(),
+        'needs': totals['needs'].round(2).to_numpy(),
+        'wants': totals['wants'].round(2).to_numpy(),
+        'savings': savings.round(2).to_numpy(),
+        'needs_percentage': (totals['needs'] / share * 100).round(1).to_numpy(),
+        'wants_percentage': (totals['wants'] / share * 100).round(1).to_numpy(),
+        'savings_percentage': (savings / share * 100).round(1).to_numpy(),
+    })
+    table = table.astype(object).where(table.notna(), None)
+    return table.to_dict(orient='records')
+
+def fixed_cost_breakdown(cube: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Fixed costs per Fixkosten_Kategorie (absolute amount and transaction count), read from the cube."""
+    fixed = cube[cube['Fixkosten'] == True]
+    if fixed.empty:
+        return []
+    totals = fixed.groupby('Fixkosten_Kategorie', observed=True, sort=True).agg(amount=('Betrag', 'sum'), count=('count', 'sum'))
+    return [
+        {"name": str(name), "amount": round(abs(amount), 2), "count": int(count)}
+        for name, amount, count in zip(totals.index, totals['amount'].tolist(), totals['count'].tolist())
     ]
-    
+
+def build_ai_messages(category_summaries: List[Dict[str, Any]], top_transactions: List[Dict[str, Any]], user_prompt: str = None) -> List[Dict[str, str]]:
     context = "Du bist ein persönlicher Finanzassistent namens 'Finance Analyzer AI'.\n"
     context += "Analysiere die Finanzdaten des Nutzers und gib eine kurze, knackige Analyse (max. 150-200 Wörter).\n"
     context += "Antworte IMMER auf DEUTSCH und verwende exakt diese Struktur:\n\n"
@@ -162,91 +300,185 @@ async def analyze_with_ai(category_summaries: List[Dict[str, Any]], top_transact
     context += "Nutze Markdown (Fett, Listen) für eine gute Lesbarkeit.\n\n"
     
     context += "### Kategorien-Zusammenfassung:\n"
-    for cat in category_summaries:
+    # Sorted like in analysis_cache_key: the order of the request does not change the prompt
+    for cat in sorted(category_summaries, key=category_entry):
         context += f"- {cat['name']}: {cat['amount']:.2f} € ({cat['count']} Transaktionen)\n"
     
     context += "\n### Top 10 Einzeltransaktionen (potenzielle Ausreißer):\n"
     for tx in top_transactions:
         context += f"- {tx['Buchungsdatum']}: {tx['Zahlungsempfänger']} | {tx['Betrag']:.2f} € | {tx['Verwendungszweck']}\n"
     
+    # Stripped like in analysis_cache_key: equal keys always mean equal messages
+    user_prompt = (user_prompt or "").strip()
     prompt = user_prompt if user_prompt else "Analysiere diese Daten. Wo gibt es Sparpotential? Gibt es ungewöhnliche hohe Ausgaben? Gib eine kurze, motivierende Zusammenfassung."
-    
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "HTTP-Referer": "http://localhost:3000",
-        "Content-Type": "application/json"
-    }
-    
-    messages = [
+
+    return [
         {"role": "system", "content": context},
         {"role": "user", "content": prompt}
     ]
-    
-    for model_id in models_to_try:
-        payload = {
-            "model": model_id,
-            "messages": messages,
-            "max_tokens": 1000,
-            "top_p": 1,
-            "temperature": 0.7
-        }
-        
-        try:
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content']
-            
-            if response.status_code == 429 or response.status_code >= 500:
-                continue
-            else:
-                raise HTTPException(status_code=response.status_code, detail=f"KI-Anfrage fehlgeschlagen ({model_id}): {response.text}")
-                
-        except requests.exceptions.RequestException:
-            continue
-    
-    raise HTTPException(status_code=503, detail="KI-Server aktuell ausgelastet, bitte kurz warten.")
 
-def calculate_balance_history(transactions: List[Dict[str, Any]], current_balance: float = 0.0) -> List[Dict[str, Any]]:
+async def analyze_with_ai(category_summaries: List[Dict[str, Any]], top_transactions: List[Dict[str, Any]], user_prompt: str = None,
+                          client: Optional[OpenRouterClient] = None, cache: Optional[ResponseCache] = None) -> str:
+    """
+    Sends the financial context to OpenRouter (non-blocking, with model fallback).
+    `client` is the app-wide pooled client; without one a temporary client is used.
+    With `cache`, an unchanged context + prompt is answered without a network round trip.
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not found in .env")
+
+    cache_key = None
+    if cache is not None:
+        cache_key = analysis_cache_key(category_summaries, top_transactions, user_prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    messages = build_ai_messages(category_summaries, top_transactions, user_prompt)
+
+    try:
+        if client is None:
+            async with OpenRouterClient() as temporary_client:
+                content = await temporary_client.complete(messages)
+        else:
+            content = await client.complete(messages)
+    except AIRequestError as e:
+        raise HTTPException(status_code=e.status_code, detail=f"KI-Anfrage fehlgeschlagen ({e.model}): {e.detail}")
+    except AIUnavailable:
+        raise HTTPException(status_code=503, detail="KI-Server aktuell ausgelastet, bitte kurz warten.")
+
+    if cache is not None:
+        cache.put(cache_key, content)
+    return content
+
+async def stream_analysis(category_summaries: List[Dict[str, Any]], top_transactions: List[Dict[str, Any]], user_prompt: str = None,
+                          client: Optional[OpenRouterClient] = None, cache: Optional[ResponseCache] = None) -> AsyncIterator[str]:
+    """
+    Streaming variant of analyze_with_ai. Waits for the first token (model fallback happens
+    up to here, errors are raised as HTTPException) and returns an iterator over all tokens.
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENROUTER_API_KEY not found in .env")
+
+    cache_key = None
+    if cache is not None:
+        cache_key = analysis_cache_key(category_summaries, top_transactions, user_prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return _relay_tokens(cached, None, None, None, None)
+
+    messages = build_ai_messages(category_summaries, top_transactions, user_prompt)
+    owned_client = OpenRouterClient() if client is None else None
+    tokens = (owned_client or client).stream(messages)
+
+    try:
+        first = await tokens.__anext__()
+    except BaseException as e:
+        await tokens.aclose()
+        if owned_client is not None:
+            await owned_client.aclose()
+        if isinstance(e, AIRequestError):
+            raise HTTPException(status_code=e.status_code, detail=f"KI-Anfrage fehlgeschlagen ({e.model}): {e.detail}")
+        if isinstance(e, (AIUnavailable, StopAsyncIteration)):
+            raise HTTPException(status_code=503, detail="KI-Server aktuell ausgelastet, bitte kurz warten.")
+        raise
+
+    return _relay_tokens(first, tokens, owned_client, cache, cache_key)
+
+async def _relay_tokens(first: str, tokens: Optional[AsyncIterator[str]], owned_client: Optional[OpenRouterClient],
+                        cache: Optional[ResponseCache], cache_key: Optional[str]) -> AsyncIterator[str]:
+    parts = [first]
+    try:
+        yield first
+        if tokens is None:
+            return
+        async for token in tokens:
+            parts.append(token)
+            yield token
+        # Only complete answers are cached
+        if cache is not None:
+            cache.put(cache_key, "".join(parts))
+    finally:
+        if tokens is not None:
+            await tokens.aclose()
+        if owned_client is not None:
+            await owned_client.aclose()
+
+# Resolutions of the balance history: one point per transaction, or end-of-day points for charts
+BALANCE_RESOLUTIONS = ("transaction", "daily")
+
+def _balance_order(transactions: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Berechnet den historischen Kontostandverlauf stabil.
+    Integer date keys (ISO strings sort chronologically; missing dates sort first) and the
+    backwards walk: newest date first, within a date the higher original position first.
     """
-    if not transactions:
+    dates = transactions['Buchungsdatum'].astype(object).where(transactions['Buchungsdatum'].notna(), "")
+    date_codes, _ = pd.factorize(dates.astype(str), sort=True)
+    position = np.arange(len(transactions))
+    return date_codes, np.lexsort((position, date_codes))[::-1]
+
+def calculate_balances(transactions: pd.DataFrame, current_balance: float = 0.0) -> np.ndarray:
+    """
+    Kontostand nach jeder Buchung (Saldo_Danach), in der Reihenfolge von `transactions`.
+    Reverse cumulative sum from the current balance; accumulating current - a1 - a2 - ...
+    in walk order gives bit-identical floats to the former per-row loop.
+    """
+    _, walk = _balance_order(transactions)
+    return _walk_balances(transactions['Betrag'].to_numpy(dtype=float), walk, current_balance)
+
+def _walk_balances(amounts: np.ndarray, walk: np.ndarray, current_balance: float) -> np.ndarray:
+    steps = np.concatenate(([float(current_balance)], -amounts[walk]))
+    balances = np.empty(len(amounts))
+    balances[walk] = np.cumsum(steps)[:-1]
+    return _round_cents(balances)
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Same result as Python's round(value, 2) per element. np.round scales by 100 first and can
+    land on the other side of a half-cent; only those near-ties are redone with round().
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 1e-9 * np.maximum(1.0, np.abs(scaled))
+    for i in np.flatnonzero(near_tie).tolist():
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+def calculate_balance_history(transactions: Union[pd.DataFrame, List[Dict[str, Any]]], current_balance: float = 0.0,
+                              resolution: str = "transaction") -> List[Dict[str, Any]]:
+    """
+    Berechnet den historischen Kontostandverlauf stabil, sortiert nach Datum.
+    The input is not modified; use calculate_balances for a Saldo_Danach column.
+    resolution="daily" keeps one end-of-day point per date (amount = net change of the day).
+    """
+    if resolution not in BALANCE_RESOLUTIONS:
+        raise ValueError(f"Unknown balance resolution '{resolution}', expected one of {BALANCE_RESOLUTIONS}")
+    if len(transactions) == 0:
         return []
+    if not isinstance(transactions, pd.DataFrame):
+        transactions = pd.DataFrame(transactions, columns=['Buchungsdatum', 'Betrag'])
 
-    # 1. Wir fügen einen temporären Index hinzu für STABILE Sortierung bei gleichem Datum
-    for idx, tx in enumerate(transactions):
-        tx['_original_idx'] = idx
+    date_codes, walk = _balance_order(transactions)
+    amounts = transactions['Betrag'].to_numpy(dtype=float)
+    balances = _walk_balances(amounts, walk, current_balance)
+    # Ascending dates; within a date the walk order (latest booking first) is kept
+    order = np.lexsort((-np.arange(len(transactions)), date_codes))
+    dates = transactions['Buchungsdatum'].to_numpy(dtype=object)[order]
+    balances = balances[order]
 
-    # 2. Sortieren nach Datum (absteigend) und dann nach originalem Index (absteigend)
-    # So rekonstruieren wir die Reihenfolge innerhalb eines Tages rückwärts
-    sorted_tx = sorted(
-        transactions, 
-        key=lambda x: (x['Buchungsdatum'], x['_original_idx']), 
-        reverse=True
-    )
-    
-    history = []
-    temp_balance = current_balance
-    
-    for tx in sorted_tx:
-        tx['Saldo_Danach'] = round(temp_balance, 2)
-        history.append({
-            "date": tx['Buchungsdatum'],
-            "amount": tx['Betrag'],
-            "balance": round(temp_balance, 2)
-        })
-        temp_balance -= tx['Betrag']
-        
-    # Cleanup: Temporären Index entfernen
-    for tx in transactions:
-        if '_original_idx' in tx:
-            del tx['_original_idx']
-
-    return sorted(history, key=lambda x: x['date'])
+    if resolution == "daily":
+        sorted_codes = date_codes[order]
+        # First entry of each date is the latest booking, i.e. the end-of-day balance
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        net = np.add.reduceat(amounts[order], starts)
+        return [
+            {"date": date, "amount": round(amount, 2), "balance": balance}
+            for date, amount, balance in zip(dates[starts].tolist(), net.tolist(), balances[starts].tolist())
+        ]
+
+    return [
+        {"date": date, "amount": amount, "balance": balance}
+        for date, amount, balance in zip(dates.tolist(), amounts[order].tolist(), balances.tolist())
+    ]
@@ -0,0 +1,291 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from .memory_store import InMemoryStore, compact_frame, DEFAULT_KIND, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS
+    from .disk_store import DEFAULT_STORE_DIR, schema_columns, table_to_frame
+except ImportError:
+    from memory_store import InMemoryStore, compact_frame, DEFAULT_KIND, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS
+    from disk_store import DEFAULT_STORE_DIR, schema_columns, table_to_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.getenv("SESSION_STORE_DB", os.path.join(DEFAULT_STORE_DIR, "sessions.sqlite3"))
+# Per-worker cache of decoded sessions (validated against the row version on every read)
+DEFAULT_CACHE_BYTES = int(float(os.getenv("SESSION_CACHE_MAX_MB", "64")) * 1024 * 1024)
+BUSY_TIMEOUT_SECONDS = 10.0
+# last_access is only rewritten when older than this, so reads rarely take the write lock
+TOUCH_INTERVAL_SECONDS = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_frames (
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (session_id, kind)
+)
+"""
+# One counter for all saves: a frame's version is never reused, not even after the session was
+# deleted and saved again (worker caches and pagination cursors compare versions)
+GENERATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+)
+"""
+
+class SqliteStore:
+    """
+    Session store shared by all worker processes on one host.
+    Sessions are Arrow IPC blobs in a SQLite database (WAL mode: readers never block
+    the writer). Byte budget and idle TTL are enforced across all workers inside the
+    write transaction. Each worker keeps decoded frames in a small cache that is
+    reused only while the row version is unchanged, so an upload handled by another
+    worker is visible on the next read.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS, cache_bytes: Optional[int] = DEFAULT_CACHE_BYTES,
+                 clock: Callable[[], float] = time.time):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._cache = InMemoryStore(max_bytes=cache_bytes, ttl_seconds=None)
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "cache_hits": 0, "evictions_lru": 0, "evictions_ttl": 0}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(SCHEMA)
+            conn.execute(GENERATION_SCHEMA)
+            # Databases from before the counter continue above their highest row version
+            conn.execute("INSERT OR IGNORE INTO session_generation (id, value) "
+                         "SELECT 0, COALESCE(MAX(version), 0) FROM session_frames")
+
+    def save(self, session_id: str, transactions: Union[pd.DataFrame, List[Dict[str, Any]]], kind: str = DEFAULT_KIND):
+        self.save_many(session_id, {kind: transactions})
+
+    def save_many(self, session_id: str, frames: Dict[str, Union[pd.DataFrame, List[Dict[str, Any]]]]):
+        """
+        Saves several frames of one session ({kind: frame}) in a single write transaction,
+        so readers on other workers never see e.g. new transactions next to the old cube.
+        """
+        compacted = {kind: compact_frame(data) for kind, data in frames.items()}
+        blobs = {kind: _serialize(df) for kind, df in compacted.items()}
+        now = self._clock()
+
+        with self._transaction() as conn:
+            self._evict_expired(conn, now)
+            conn.execute("UPDATE session_generation SET value = value + 1 WHERE id = 0")
+            version = conn.execute("SELECT value FROM session_generation WHERE id = 0").fetchone()[0]
+            for kind, blob in blobs.items():
+                conn.execute(
+                    "INSERT INTO session_frames (session_id, kind, data, size, version, last_access) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(session_id, kind) DO UPDATE SET data = excluded.data, size = excluded.size, "
+                    "version = excluded.version, last_access = excluded.last_access",
+                    (session_id, kind, blob, len(blob), version, now),
+                )
+            # The other frames of the session share its last access (they are evicted together)
+            conn.execute("UPDATE session_frames SET last_access = ? WHERE session_id = ?", (now, session_id))
+            self._evict_over_budget(conn, session_id)
+
+        for kind, df in compacted.items():
+            self._remember(session_id, kind, version, df)
+
+    def get(self, session_id: str, columns: Optional[Sequence[str]] = None, kind: str = DEFAULT_KIND) -> pd.DataFrame:
+        now = self._clock()
+        conn = self._connection()
+        row = conn.execute("SELECT version, last_access FROM session_frames WHERE session_id = ? AND kind = ?",
+                           (session_id, kind)).fetchone()
+        if row is not None and self._expired(row[1], now):
+            with self._transaction() as tx:
+                self._evict_expired(tx, now)
+            row = None
+        if row is None:
+            self._forget(session_id, kind)
+            self._count("misses")
+            return pd.DataFrame()
+
+        version, last_access = row
+        if now - last_access > TOUCH_INTERVAL_SECONDS:
+            with self._transaction() as tx:
+                tx.execute("UPDATE session_frames SET last_access = ? WHERE session_id = ?", (now, session_id))
+        self._count("hits")
+
+        with self._lock:
+            cached_version = self._versions.get((session_id, kind))
+        if cached_version == version:
+            df = self._cache.lookup(session_id, columns, kind)
+            if df is not None:
+                self._count("cache_hits")
+                return df
+
+        row = conn.execute("SELECT data, version FROM session_frames WHERE session_id = ? AND kind = ?",
+                           (session_id, kind)).fetchone()
+        if row is None:
+            # Removed by another worker in between
+            self._count("misses")
+            return pd.DataFrame()
+        df = _deserialize(row[0])
+        self._remember(session_id, kind, row[1], df)
+        if columns is not None:
+            return df[[col for col in columns if col in df.columns]]
+        return df.copy(deep=False)
+
+    def column_names(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[List[str]]:
+        """
+        Column names of a stored frame: from the worker cache if current, otherwise from the
+        blob's Arrow schema message without decoding any columns. None for a missing session.
+        """
+        row = self._connection().execute("SELECT version, last_access FROM session_frames WHERE session_id = ? AND kind = ?",
+                                         (session_id, kind)).fetchone()
+        if row is None or self._expired(row[1], self._clock()):
+            return None
+        with self._lock:
+            cached_version = self._versions.get((session_id, kind))
+        if cached_version == row[0]:
+            names = self._cache.column_names(session_id, kind)
+            if names is not None:
+                return names
+        row = self._connection().execute("SELECT data FROM session_frames WHERE session_id = ? AND kind = ?",
+                                         (session_id, kind)).fetchone()
+        if row is None:
+            return None
+        return schema_columns(pa.ipc.open_stream(pa.py_buffer(row[0])).schema)
+
+    def version(self, session_id: str, kind: str = DEFAULT_KIND) -> Optional[int]:
+        """Row version of a stored frame, changed by every save on any worker; None for a missing session."""
+        row = self._connection().execute("SELECT version, last_access FROM session_frames WHERE session_id = ? AND kind = ?",
+                                         (session_id, kind)).fetchone()
+        if row is None or self._expired(row[1], self._clock()):
+            return None
+        return row[0]
+
+    def clear(self, session_id: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM session_frames WHERE session_id = ?", (session_id,))
+        self._cache.clear(session_id)
+        with self._lock:
+            for key in [key for key in self._versions if key[0] == session_id]:
+                del self._versions[key]
+
+    def stats(self) -> Dict[str, Any]:
+        sessions, frames, total = self._connection().execute(
+            "SELECT COUNT(DISTINCT session_id), COUNT(*), COALESCE(SUM(size), 0) FROM session_frames"
+        ).fetchone()
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {
+            "backend": "sqlite",
+            "db_path": self.db_path,
+            "sessions": sessions,
+            "frames": frames,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            # Counters are per worker process
+            **metrics,
+            "cache": self._cache.stats(),
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections must not cross a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - last_access > self.ttl_seconds
+
+    def _evict_expired(self, conn: sqlite3.Connection, now: float):
+        if self.ttl_seconds is None:
+            return
+        # Whole sessions: every frame of a session carries the session's last access
+        cutoff = now - self.ttl_seconds
+        sessions = conn.execute("SELECT COUNT(DISTINCT session_id) FROM session_frames WHERE last_access < ?",
+                                (cutoff,)).fetchone()[0]
+        if sessions:
+            conn.execute("DELETE FROM session_frames WHERE last_access < ?", (cutoff,))
+            self._count("evictions_ttl", sessions)
+            logger.info("%d idle sessions evicted", sessions)
+
+    def _evict_over_budget(self, conn: sqlite3.Connection, keep_session_id: str):
+        if self.max_bytes is None:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM session_frames").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used sessions first, with all their frames; the session just saved is never evicted here
+        candidates = conn.execute(
+            "SELECT session_id, SUM(size) FROM session_frames WHERE session_id != ? "
+            "GROUP BY session_id ORDER BY MAX(last_access)",
+            (keep_session_id,),
+        ).fetchall()
+        for session_id, size in candidates:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM session_frames WHERE session_id = ?", (session_id,))
+            total -= size
+            self._count("evictions_lru")
+            logger.info("Session %s evicted (evictions_lru, %d bytes)", session_id, size)
+
+    def _remember(self, session_id: str, kind: str, version: int, df: pd.DataFrame):
+        self._cache.save(session_id, df, kind)
+        with self._lock:
+            self._versions[(session_id, kind)] = version
+
+    def _forget(self, session_id: str, kind: str):
+        with self._lock:
+            self._versions.pop((session_id, kind), None)
+
+    def _count(self, metric: str, amount: int = 1):
+        with self._lock:
+            self._metrics[metric] += amount
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: takes the write lock up front instead of upgrading later."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+def _serialize(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _deserialize(blob: bytes) -> pd.DataFrame:
+    # py_buffer wraps the bytes without copying; numeric columns stay views into the blob
+    return table_to_frame(pa.ipc.open_stream(pa.py_buffer(blob)).read_all())
@@ -0,0 +1,52 @@
+import tempfile
+import time
+
+from bench_common import build_frame
+
+import backend.main as main
+from backend.incremental import FINGERPRINT_KIND, fingerprint_index
+from backend.memory_store import DEFAULT_KIND, InMemoryStore
+from backend.services import build_aggregate_cube
+from backend.sqlite_store import SqliteStore
+
+PARSED_COLUMNS = ['Buchungsdatum', 'Wertstellung', 'Zahlungsempfänger', 'Zahlungspflichtiger', 'Verwendungszweck',
+                  'Betrag', 'Währung', 'IBAN']
+
+class TimedStore:
+    """Wraps a session store and adds up the time spent in save_many (the persist step)."""
+
+    def __init__(self, store):
+        self.store = store
+        self.save_time = 0.0
+
+    def save_many(self, session_id, frames):
+        start = time.perf_counter()
+        self.store.save_many(session_id, frames)
+        self.save_time += time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+def bench(name: str, store, history_rows: int, export_rows: int = 500) -> None:
+    history = build_frame(history_rows, start="2015-01-01", days=3000)
+    # One new month of bookings after the stored history
+    export = build_frame(export_rows, seed=7, start="2023-04-01", days=30)[PARSED_COLUMNS]
+    store.save_many("bench", {DEFAULT_KIND: history, "cube": build_aggregate_cube(history),
+                              FINGERPRINT_KIND: fingerprint_index(history)})
+
+    timed_store = TimedStore(store)
+    main.store = timed_store
+    existing = store.get("bench")
+    start = time.perf_counter()
+    result = main.process_append("bench", existing, export, {"balance": 1000.0})
+    total = time.perf_counter() - start
+    assert result["appended"] == export_rows
+
+    print(f"{name:>6s} {history_rows:>8d} stored + {export_rows} new rows | compute: {total - timed_store.save_time:6.3f}s"
+          f" | persist (full frames): {timed_store.save_time:6.3f}s")
+
+if __name__ == "__main__":
+    print("--- process_append: compute vs. persist by history size ---")
+    for rows in (10_000, 100_000, 500_000):
+        bench("memory", InMemoryStore(max_bytes=None, ttl_seconds=None), rows)
+        bench("sqlite", SqliteStore(tempfile.mktemp(suffix=".sqlite3"), max_bytes=None, ttl_seconds=None), rows)
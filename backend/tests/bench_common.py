@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Allow running the bench_*.py scripts from the repository root or the backend folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Payees with the purposes the keyword matcher and the fixed-cost detector react to
+PAYEES = [
+    ("Vermieter GmbH", "Miete"), ("Netflix", "Abo"), ("HUK Coburg", "Kfz Versicherung"),
+    ("Stadtwerke", "Abschlag Strom"), ("REWE", "Einkauf"), ("Amazon.de", "Bestellung"),
+    ("Arbeitgeber GmbH", "Gehalt"), ("BMW Bank", "Leasing Rate"), ("Café Central", "Frühstück"),
+]
+
+def build_frame(num_rows: int, num_payees: int = 2000, seed: int = 42, start: str = "2020-01-01",
+                days: int = 1500) -> pd.DataFrame:
+    """
+    Shape of a processed upload (17 columns of text, floats and flags), shared by all benchmarks.
+    Payees with an even number book a fixed amount, so recurring groups exist; the other
+    payees vary their amounts.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days).strftime("%Y-%m-%d")
+    payee_ids = rng.integers(0, num_payees, num_rows)
+    names = np.array([f"{PAYEES[i % len(PAYEES)][0]} {i}" for i in range(num_payees)], dtype=object)
+    purposes = np.array([PAYEES[i % len(PAYEES)][1] for i in range(num_payees)], dtype=object)
+    amounts = np.where(payee_ids % 2 == 0, -(payee_ids % 50 + 10.0), rng.normal(0, 100, num_rows).round(2))
+    return pd.DataFrame({
+        'Buchungsdatum': dates[rng.integers(0, len(dates), num_rows)],
+        'Wertstellung': dates[rng.integers(0, len(dates), num_rows)],
+        'Zahlungsempfänger': names[payee_ids],
+        'Zahlungspflichtiger': "Max Mustermann",
+        'Verwendungszweck': [f"{purpose} Referenz {i}" for i, purpose in enumerate(purposes[payee_ids])],
+        'Betrag': amounts,
+        'Währung': "EUR",
+        'IBAN': "DE02120300000000202051",
+        'Kategorie': rng.choice(["Wohnen", "Lebensmittel", "Sonstiges"], num_rows),
+        'confidence': rng.random(num_rows).round(2),
+        'Saldo_Danach': rng.normal(1000, 500, num_rows).round(2),
+        'Wiederkehrend': rng.random(num_rows) < 0.2,
+        'Fixkosten_Kategorie': rng.choice(["Keine", "Wohnen", "Medien"], num_rows),
+        'Fixkosten_Confidence': rng.random(num_rows).round(2),
+        'Fixkosten_Grund': rng.choice(["Miete erkannt", "Kein Muster"], num_rows),
+        'Fixkosten_Status': rng.random(num_rows) < 0.3,
+        'Fixkosten': rng.random(num_rows) < 0.3,
+    })
+
+def timed(func, *args, repeat: int = 1) -> float:
+    """Best wall time of `repeat` runs in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,32 @@
+import contextlib
+import io
+import sys
+import time
+
+import pandas as pd
+
+from bench_common import build_frame
+
+from backend.logic.detector import FixedCostDetector
+
+def bench(num_rows: int) -> None:
+    detector = FixedCostDetector()
+    df = build_frame(num_rows)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows_result = detector.process_dataframe(df, vectorized=False)
+    rows_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vec_result = detector.process_dataframe(df)
+    vec_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(vec_result, rows_result)
+    print(f"{num_rows:>7d} rows | per-row: {rows_time:8.3f}s | vectorized: {vec_time:8.3f}s | speedup: {rows_time / vec_time:6.1f}x")
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    print("--- FixedCostDetector.process_dataframe ---")
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,46 @@
+import io
+
+from bench_common import timed
+
+from backend.ingest import SAMPLE_BYTES, detect_encoding, parse_upload
+
+HEADER = (
+    '"Kontostand vom 29.12.2025:";"4.321,50 EUR"\n""\n'
+    "Buchungsdatum;Wertstellung;Zahlungsempfänger*in;Zahlungspflichtige*r;Verwendungszweck;Betrag (€);IBAN;Gläubiger-ID\n"
+)
+ROW = "01.01.2025;01.01.2025;Bäckerei Müller;Alex;Brötchen und Kaffee für die Woche;-12,50;DE123456789;\n"
+
+def legacy_decode(contents: bytes) -> str:
+    """The previous trial decoding of the whole payload."""
+    for enc in ['utf-8', 'cp1252', 'iso-8859-1', 'latin1']:
+        try:
+            return contents.decode(enc)
+        except UnicodeDecodeError:
+            continue
+
+def sampled_decode(contents: bytes) -> str:
+    """Encoding chosen from a bounded sample, then one decode."""
+    return contents.decode(detect_encoding(contents[:SAMPLE_BYTES]))
+
+def bench(encoding: str, megabytes: int) -> None:
+    rows = megabytes * 1024 * 1024 // len(ROW.encode(encoding))
+    contents = (HEADER + ROW * rows).encode(encoding)
+
+    legacy = timed(legacy_decode, contents, repeat=5)
+    sampled = timed(sampled_decode, contents, repeat=5)
+    detect_only = timed(detect_encoding, contents[:SAMPLE_BYTES], repeat=5)
+    print(f"{encoding:>7s} {len(contents) / 1e6:6.1f} MB | trial decode: {legacy * 1000:8.1f}ms | "
+          f"sample + one decode: {sampled * 1000:8.1f}ms | detection only (streaming): {detect_only * 1000:6.2f}ms")
+
+def bench_stream(encoding: str, megabytes: int) -> None:
+    rows = megabytes * 1024 * 1024 // len(ROW.encode(encoding))
+    contents = (HEADER + ROW * rows).encode(encoding)
+    elapsed = timed(lambda: parse_upload(io.BytesIO(contents)))
+    print(f"{encoding:>7s} {len(contents) / 1e6:6.1f} MB | full parse_upload: {elapsed:6.2f}s")
+
+if __name__ == "__main__":
+    print("--- Encoding detection vs. trial decoding ---")
+    for enc in ("utf-8", "cp1252"):
+        for size in (5, 20):
+            bench(enc, size)
+    bench_stream("cp1252", 5)
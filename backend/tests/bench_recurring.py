@@ -0,0 +1,27 @@
+import time
+
+import pandas as pd
+
+from bench_common import build_frame
+
+from backend.services import detect_recurring_patterns
+from backend.tests.legacy_reference import legacy_detect_recurring_patterns
+
+def bench(num_rows: int, num_payees: int) -> None:
+    df = build_frame(num_rows, num_payees)
+
+    start = time.perf_counter()
+    legacy = legacy_detect_recurring_patterns(df.copy())
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = detect_recurring_patterns(df.copy())
+    vec_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result, legacy)
+    print(f"{num_rows:>7d} rows / {num_payees:>6d} payees | loop: {legacy_time:8.3f}s | vectorized: {vec_time:8.3f}s | speedup: {legacy_time / vec_time:6.1f}x")
+
+if __name__ == "__main__":
+    print("--- detect_recurring_patterns ---")
+    bench(10_000, 1_000)
+    bench(100_000, 10_000)
@@ -0,0 +1,41 @@
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from bench_common import build_frame
+
+from backend.disk_store import DiskSpillStore
+from backend.memory_store import estimate_size
+from backend.services import calculate_50_30_20_metrics
+
+HEALTH_COLUMNS = ['Betrag', 'Fixkosten', 'Fixkosten_Kategorie']
+
+def bench(num_rows: int) -> None:
+    df = build_frame(num_rows)
+    directory = tempfile.mkdtemp()
+    DiskSpillStore(directory).save("bench", df)
+
+    # A fresh store simulates a restart: the session exists only on disk
+    cold = DiskSpillStore(directory)
+    arrow_before = pa.total_allocated_bytes()
+    start = time.perf_counter()
+    subset = cold.get("bench", columns=HEALTH_COLUMNS)
+    calculate_50_30_20_metrics(subset)
+    cold_time = time.perf_counter() - start
+    arrow_allocated = pa.total_allocated_bytes() - arrow_before
+
+    records = df.to_dict(orient='records')
+    start = time.perf_counter()
+    calculate_50_30_20_metrics(pd.DataFrame(records))
+    records_time = time.perf_counter() - start
+
+    print(f"{num_rows:>8d} rows | records: {estimate_size(records) / 1e6:7.1f} MB, rebuild+metrics {records_time:6.3f}s"
+          f" | disk: {cold.stats()['disk_bytes'] / 1e6:6.1f} MB file, cold read+metrics {cold_time:6.3f}s,"
+          f" {arrow_allocated / 1e6:5.1f} MB allocated")
+
+if __name__ == "__main__":
+    print("--- session store: /api/financial-health read path ---")
+    bench(100_000)
+    bench(1_000_000)
@@ -0,0 +1,57 @@
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from bench_common import build_frame
+
+from backend.serialization import brotli, compress, dumps
+
+def envelope(num_rows: int, transactions) -> dict:
+    return {
+        "count": num_rows,
+        "transactions": transactions,
+        "bank": "DKB",
+        "metadata": {"balance": 4321.5},
+        "balance_history": [{"date": "2024-01-01", "amount": -1.5, "balance": 10.0}] * 1000,
+        "financial_metrics": {"income": 1.0},
+    }
+
+def bench(num_rows: int) -> None:
+    df = build_frame(num_rows)
+
+    start = time.perf_counter()
+    before = JSONResponse(jsonable_encoder(envelope(num_rows, df.to_dict(orient='records')))).body
+    before_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = dumps(envelope(num_rows, df))
+    after_time = time.perf_counter() - start
+
+    assert json.loads(before) == json.loads(after)
+    print(f"{num_rows:>7d} rows | to_dict+jsonable_encoder+json: {before_time:6.3f}s"
+          f" | DataFrame.to_json+orjson: {after_time:6.3f}s ({before_time / after_time:4.1f}x),"
+          f" {len(after) / 1e6:5.1f} MB")
+
+def bench_sizes(num_rows: int) -> None:
+    """Wire size per layout and Content-Encoding."""
+    df = build_frame(num_rows)
+    print(f"{num_rows:>7d} rows |", end="")
+    for layout in ("records", "columnar"):
+        body = dumps({"transactions": df}, layout=layout)
+        sizes = []
+        for encoding in (None, "gzip") + (("br",) if brotli is not None else ()):
+            start = time.perf_counter()
+            size = len(compress(body, encoding))
+            sizes.append(f"{encoding or 'identity'} {size / 1e6:5.2f} MB ({(time.perf_counter() - start) * 1000:4.0f} ms)")
+        print(f" {layout}: " + ", ".join(sizes) + " |", end="")
+    print()
+
+if __name__ == "__main__":
+    print("--- /upload response encoding ---")
+    bench(10_000)
+    bench(50_000)
+    bench(200_000)
+    print("--- /upload payload size by layout and compression ---")
+    bench_sizes(30_000)
@@ -0,0 +1,14 @@
+import pandas as pd
+
+def legacy_detect_recurring_patterns(df: pd.DataFrame) -> pd.DataFrame:
+    """Reference: the original per-group loop of detect_recurring_patterns (tests and bench_recurring)."""
+    df['temp_date'] = pd.to_datetime(df['Buchungsdatum'], errors='coerce')
+    df = df.sort_values(['Zahlungsempfänger', 'Betrag', 'temp_date'])
+    df['Wiederkehrend'] = False
+    for _, group in df.groupby(['Zahlungsempfänger', 'Betrag']):
+        if len(group) < 2:
+            continue
+        diffs = group['temp_date'].diff().dt.days
+        if diffs.apply(lambda x: 27 <= x <= 34 if pd.notna(x) else False).any():
+            df.loc[group.index, 'Wiederkehrend'] = True
+    return df.drop(columns=['temp_date'])
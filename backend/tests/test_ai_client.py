@@ -0,0 +1,327 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from backend.ai_client import AIRequestError, AIUnavailable, OpenRouterClient
+from backend.response_cache import ResponseCache
+from backend.services import analyze_with_ai
+
+class StubOpenRouter(BaseHTTPRequestHandler):
+    """Local stand-in for the OpenRouter API; the behaviour is chosen by the model name."""
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    client_ports = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body["model"]
+        type(self).requests_seen.append(model)
+        type(self).client_ports.add(self.client_address[1])
+
+        if model.startswith("slow:"):
+            time.sleep(float(model.split(":")[1]))
+        if model == "busy":
+            return self._send(429, {"error": "rate limited"})
+        if model == "flaky" and type(self).requests_seen.count("flaky") == 2:
+            # One transient error on the second request, answers again afterwards
+            return self._send(502, {"error": "bad gateway"})
+        if model == "broken":
+            return self._send(502, {"error": "bad gateway"})
+        if model == "invalid":
+            return self._send(400, {"error": "invalid model"})
+        if body.get("stream"):
+            return self._stream(model)
+        self._send(200, {"choices": [{"message": {"content": f"Antwort von {model}"}}]})
+
+    def _stream(self, model):
+        """SSE like OpenRouter: a keep-alive comment, content deltas, [DONE]."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(line):
+            self.wfile.write(f"{line}\n\n".encode())
+            self.wfile.flush()
+
+        event(": OPENROUTER PROCESSING")
+        for index, token in enumerate(["Antwort ", "von ", model]):
+            event("data: " + json.dumps({"choices": [{"delta": {"content": token}}]}))
+            if index == 0 and model.startswith("slowtokens"):
+                time.sleep(float(model.split(":")[1]))
+            if index == 0 and model == "midfail":
+                return event("data: " + json.dumps({"error": {"message": "upstream died"}}))
+        event("data: [DONE]")
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_url():
+    StubOpenRouter.requests_seen = []
+    StubOpenRouter.client_ports = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenRouter)
+    server.daemon_threads = True
+    server.block_on_close = False
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+MESSAGES = [{"role": "user", "content": "Hallo"}]
+
+def run_with_client(stub_url, coro_factory, **kwargs):
+    async def scenario():
+        async with OpenRouterClient(api_key="test", base_url=stub_url, **kwargs) as client:
+            return await coro_factory(client)
+    return asyncio.run(scenario())
+
+def test_falls_back_on_rate_limit_and_server_errors(stub_url):
+    """Verify that 429 and 5xx move on to the next model."""
+    result = run_with_client(stub_url, lambda c: c.complete(MESSAGES), models=["busy", "broken", "ok"])
+    assert result == "Antwort von ok"
+    assert StubOpenRouter.requests_seen == ["busy", "broken", "ok"]
+
+def test_per_model_timeout_falls_back(stub_url):
+    """Verify that a model exceeding its own timeout is abandoned for the next one."""
+    start = time.perf_counter()
+    result = run_with_client(stub_url, lambda c: c.complete(MESSAGES),
+                             models=["slow:2", "ok"], timeouts={"slow:2": 0.2})
+    assert result == "Antwort von ok"
+    assert time.perf_counter() - start < 1.5
+
+def test_client_errors_are_not_retried(stub_url):
+    """Verify that a 4xx other than 429 stops the fallback."""
+    with pytest.raises(AIRequestError) as info:
+        run_with_client(stub_url, lambda c: c.complete(MESSAGES), models=["invalid", "ok"])
+    assert info.value.status_code == 400
+    assert StubOpenRouter.requests_seen == ["invalid"]
+
+def test_all_models_failing_raises_unavailable(stub_url):
+    with pytest.raises(AIUnavailable):
+        run_with_client(stub_url, lambda c: c.complete(MESSAGES), models=["busy", "broken"])
+
+def test_connections_are_reused(stub_url):
+    """Verify keep-alive: sequential requests share one pooled connection."""
+    async def three_requests(client):
+        return [await client.complete(MESSAGES, models=["ok"]) for _ in range(3)]
+
+    assert run_with_client(stub_url, three_requests) == ["Antwort von ok"] * 3
+    assert len(StubOpenRouter.client_ports) == 1
+
+def test_event_loop_stays_free_while_waiting(stub_url):
+    """Verify that a slow model does not block other coroutines."""
+    async def scenario(client):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        await client.complete(MESSAGES, models=["slow:0.3"])
+        task.cancel()
+        return ticks
+
+    assert run_with_client(stub_url, scenario) >= 15
+
+def test_analyze_with_ai_maps_errors_to_http(stub_url, monkeypatch):
+    """Verify that analyze_with_ai keeps its HTTP error contract."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    summaries = [{"name": "Wohnen", "amount": 900.0, "count": 1}]
+    top = [{"Buchungsdatum": "2023-10-01", "Zahlungsempfänger": "Vermieter", "Betrag": -900.0, "Verwendungszweck": "Miete"}]
+
+    async def scenario(models):
+        async with OpenRouterClient(base_url=stub_url, models=models) as client:
+            return await analyze_with_ai(summaries, top, None, client=client)
+
+    assert asyncio.run(scenario(["ok"])) == "Antwort von ok"
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(scenario(["busy"]))
+    assert info.value.status_code == 503
+
+def test_hedged_mode_takes_first_success(stub_url):
+    """Verify that a slow model is hedged after the delay and cancelled once another model answers."""
+    start = time.perf_counter()
+    result, client = run_with_client(stub_url, lambda c: _complete_and_return(c),
+                                     models=["slow:1", "ok"], hedge_delay=0.1, adaptive=False)
+    assert result == "Antwort von ok"
+    assert time.perf_counter() - start < 0.9
+    assert StubOpenRouter.requests_seen == ["slow:1", "ok"]
+    assert client.stats["slow:1"].cancelled == 1
+    assert client.stats["ok"].successes == 1
+
+def test_hedged_mode_moves_on_immediately_after_failure(stub_url):
+    """Verify that a failing model does not wait for the hedge delay."""
+    start = time.perf_counter()
+    result, _ = run_with_client(stub_url, lambda c: _complete_and_return(c),
+                                models=["busy", "ok"], hedge_delay=5, adaptive=False)
+    assert result == "Antwort von ok"
+    assert time.perf_counter() - start < 1
+
+def test_hedged_mode_raises_when_all_fail(stub_url):
+    with pytest.raises(AIUnavailable):
+        run_with_client(stub_url, lambda c: c.complete(MESSAGES), models=["busy", "broken"], hedge_delay=0.05)
+
+def test_adaptive_order_demotes_failing_models(stub_url):
+    """Verify that the order follows observed errors and latency, starting from the configured order."""
+    async def scenario(client):
+        assert client.ordered_models() == ["busy", "ok", "slow:0.2"]
+        for _ in range(3):
+            await client.complete(MESSAGES)
+        await client.complete(MESSAGES, models=["slow:0.2"])
+        return client.ordered_models()
+
+    order = run_with_client(stub_url, scenario, models=["busy", "ok", "slow:0.2"])
+    assert order == ["ok", "slow:0.2", "busy"]
+    # Only the first call hit the rate-limited model; afterwards 'ok' was tried first
+    assert StubOpenRouter.requests_seen.count("busy") == 1
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_adaptive_order_retries_recovered_primary(stub_url):
+    """Verify that a transient error demotes the primary only until its error rate has decayed."""
+    clock = FakeClock()
+
+    async def scenario(client):
+        await client.complete(MESSAGES)
+        await client.complete(MESSAGES)  # flaky fails once, slow answers
+        assert client.ordered_models() == ["slow:0.2", "flaky"]
+        await client.complete(MESSAGES)
+        assert StubOpenRouter.requests_seen.count("flaky") == 2
+
+        clock.now += 10 * 60
+        assert client.ordered_models() == ["flaky", "slow:0.2"]
+        return await client.complete(MESSAGES)
+
+    answer = run_with_client(stub_url, scenario, models=["flaky", "slow:0.2"], clock=clock)
+    assert answer == "Antwort von flaky"
+    assert StubOpenRouter.requests_seen.count("flaky") == 3
+
+async def _complete_and_return(client):
+    return await client.complete(MESSAGES), client
+
+def test_analyze_with_ai_answers_repeats_from_cache(stub_url, monkeypatch):
+    """Verify that an unchanged context is answered from the cache and failures are not cached."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    cache = ResponseCache()
+    summaries = [{"name": "Wohnen", "amount": 900.0, "count": 1}]
+    top = [{"Buchungsdatum": "2023-10-01", "Zahlungsempfänger": "Vermieter", "Betrag": -900.0, "Verwendungszweck": "Miete"}]
+
+    async def scenario(models, prompt=None):
+        async with OpenRouterClient(base_url=stub_url, models=models) as client:
+            return await analyze_with_ai(summaries, top, prompt, client=client, cache=cache)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(scenario(["busy"]))
+    assert asyncio.run(scenario(["ok"])) == "Antwort von ok"
+    assert asyncio.run(scenario(["ok"])) == "Antwort von ok"
+    assert StubOpenRouter.requests_seen == ["busy", "ok"]
+
+    asyncio.run(scenario(["ok"], prompt="Andere Frage"))
+    assert StubOpenRouter.requests_seen == ["busy", "ok", "ok"]
+    assert cache.stats()["hits"] == 1
+
+def collect_stream(client, **kwargs):
+    async def consume():
+        return [token async for token in client.stream(MESSAGES, **kwargs)]
+    return consume()
+
+def test_stream_falls_back_before_first_token(stub_url):
+    """Verify that streaming tries the next model until one produces a token."""
+    tokens = run_with_client(stub_url, collect_stream, models=["busy", "broken", "ok"])
+    assert tokens == ["Antwort ", "von ", "ok"]
+    assert StubOpenRouter.requests_seen == ["busy", "broken", "ok"]
+
+def test_stream_relays_first_token_early(stub_url):
+    """Verify time-to-first-token: the first token arrives before the rest of the answer exists."""
+    async def timed(client):
+        start = time.perf_counter()
+        arrivals = [time.perf_counter() - start async for _ in client.stream(MESSAGES, models=["slowtokens:0.5"])]
+        return arrivals
+
+    arrivals = run_with_client(stub_url, timed)
+    assert len(arrivals) == 3
+    assert arrivals[0] < 0.3
+    assert arrivals[-1] >= 0.5
+
+def test_stream_error_after_first_token_is_not_retried(stub_url):
+    async def consume(client):
+        seen = []
+        with pytest.raises(AIUnavailable):
+            async for token in client.stream(MESSAGES, models=["midfail", "ok"]):
+                seen.append(token)
+        return seen
+
+    assert run_with_client(stub_url, consume) == ["Antwort "]
+    assert StubOpenRouter.requests_seen == ["midfail"]
+
+@pytest.fixture
+def stream_app(stub_url, monkeypatch):
+    import backend.main as main
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(main, "ai_response_cache", ResponseCache())
+
+    def use_models(models):
+        monkeypatch.setattr(main.app.state, "ai_client", OpenRouterClient(base_url=stub_url, models=models), raising=False)
+    return TestClient(main.app), use_models
+
+CHAT_BODY = {
+    "category_summaries": [{"name": "Wohnen", "amount": 900.0, "count": 1}],
+    "top_transactions": [{"Buchungsdatum": "2023-10-01", "Zahlungsempfänger": "Vermieter", "Betrag": -900.0, "Verwendungszweck": "Miete"}],
+}
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+def test_chat_stream_endpoint_relays_tokens_and_caches(stream_app):
+    """Verify the SSE framing, the done event and that a repeat is served from the cache."""
+    client, use_models = stream_app
+    use_models(["busy", "ok"])
+
+    response = client.post("/api/chat/stream", json=CHAT_BODY)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert sse_events(response.text) == [
+        ("message", {"token": "Antwort "}), ("message", {"token": "von "}), ("message", {"token": "ok"}), ("done", {}),
+    ]
+
+    repeat = sse_events(client.post("/api/chat/stream", json=CHAT_BODY).text)
+    assert repeat == [("message", {"token": "Antwort von ok"}), ("done", {})]
+    assert StubOpenRouter.requests_seen == ["busy", "ok"]
+
+def test_chat_stream_endpoint_errors(stream_app):
+    """Verify plain HTTP errors before the first token and an error event after it."""
+    client, use_models = stream_app
+    use_models(["busy", "broken"])
+    assert client.post("/api/chat/stream", json=CHAT_BODY).status_code == 503
+
+    use_models(["midfail"])
+    events = sse_events(client.post("/api/chat/stream", json=CHAT_BODY).text)
+    assert events[0] == ("message", {"token": "Antwort "})
+    assert events[-1][0] == "error"
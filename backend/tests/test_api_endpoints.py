@@ -38,3 +38,10 @@ def test_upload_invalid_file():
     response = client.post("/upload", files=files)
     # The current logic might throw for "no parser found" or "no transactions"
     assert response.status_code in [400, 500] 
+
+def test_monthly_financial_health_validation():
+    """Verify month format validation and the 404 for unknown sessions."""
+    response = client.get("/api/financial-health/monthly?x_session_id=nobody&start=2024-13")
+    assert response.status_code == 400
+    response = client.get("/api/financial-health/monthly?x_session_id=nobody")
+    assert response.status_code == 404
@@ -0,0 +1,70 @@
+import copy
+import numpy as np
+import pandas as pd
+from backend.services import calculate_balance_history, calculate_balances
+
+def legacy_balance_history(transactions, current_balance=0.0):
+    """The former per-row implementation, kept as reference."""
+    for idx, tx in enumerate(transactions):
+        tx['_original_idx'] = idx
+    sorted_tx = sorted(transactions, key=lambda x: (x['Buchungsdatum'], x['_original_idx']), reverse=True)
+    history = []
+    temp_balance = current_balance
+    for tx in sorted_tx:
+        tx['Saldo_Danach'] = round(temp_balance, 2)
+        history.append({"date": tx['Buchungsdatum'], "amount": tx['Betrag'], "balance": round(temp_balance, 2)})
+        temp_balance -= tx['Betrag']
+    for tx in transactions:
+        del tx['_original_idx']
+    return sorted(history, key=lambda x: x['date'])
+
+def random_transactions(count=5000, seed=7):
+    rng = np.random.default_rng(seed)
+    # Few distinct dates, so many bookings share a day
+    dates = pd.date_range("2024-01-01", periods=60).strftime("%Y-%m-%d").to_numpy()
+    return pd.DataFrame({
+        'Buchungsdatum': rng.choice(dates, count),
+        'Betrag': rng.normal(0, 250, count).round(2),
+        'Verwendungszweck': [f"Buchung {i}" for i in range(count)],
+    })
+
+def test_balance_history_matches_legacy_implementation():
+    """Verify identical balances, order and Saldo_Danach values, including ties within a day."""
+    df = random_transactions()
+    records = df.to_dict(orient='records')
+    legacy_records = copy.deepcopy(records)
+    expected = legacy_balance_history(legacy_records, 1234.56)
+    expected_saldo = [tx['Saldo_Danach'] for tx in legacy_records]
+
+    assert calculate_balance_history(df, 1234.56) == expected
+    assert calculate_balance_history(records, 1234.56) == expected
+    assert calculate_balances(df, 1234.56).tolist() == expected_saldo
+
+def test_balance_history_does_not_mutate_input():
+    """Verify that neither records nor DataFrames are modified."""
+    df = random_transactions(100)
+    before = df.copy()
+    records = df.to_dict(orient='records')
+    snapshot = copy.deepcopy(records)
+
+    calculate_balance_history(df, 10.0)
+    calculate_balance_history(records, 10.0)
+
+    pd.testing.assert_frame_equal(df, before)
+    assert records == snapshot
+
+def test_daily_balance_history_keeps_end_of_day_points():
+    """Verify one point per date with the day's net amount and the balance after its latest booking."""
+    df = pd.DataFrame({
+        'Buchungsdatum': ['2024-01-02', '2024-01-01', '2024-01-02', '2024-01-01'],
+        'Betrag': [-10.0, 100.0, -5.0, 50.0],
+    })
+    full = calculate_balance_history(df, 135.0)
+    daily = calculate_balance_history(df, 135.0, resolution="daily")
+
+    assert daily == [
+        {"date": "2024-01-01", "amount": 150.0, "balance": 150.0},
+        {"date": "2024-01-02", "amount": -15.0, "balance": 135.0},
+    ]
+    assert [point["balance"] for point in daily] == [full[0]["balance"], full[2]["balance"]]
+    assert calculate_balance_history(df.iloc[:0], 0.0, resolution="daily") == []
@@ -0,0 +1,34 @@
+import pandas as pd
+from backend.services import categorize_transaction, classify_transactions, detector
+
+def sample_frame():
+    return pd.DataFrame({
+        'Zahlungsempfänger': ["Vermieter GmbH", "REWE", "Netflix", "Arbeitgeber", "Media Markt",
+                              "Unbekannt", "Shell", "Stadtwerke", "Kino", "Leasing Bank"],
+        'Verwendungszweck': ["Miete", "Einkauf", "Abo", "Gehalt", "Fernseher",
+                             "Regelmäßig", "Tanken", "Abschlag", "Tickets", "Rate"],
+        'Betrag': [-1200.0, -45.3, -13.99, 2850.0, -899.0, -50.0, -60.0, -85.0, -24.0, -2500.0],
+        'Wiederkehrend': [True, False, True, True, False, True, False, True, False, True],
+    })
+
+def test_classify_transactions_matches_two_pass_pipeline():
+    """Verify that the single-pass stage yields the same columns as process_dataframe + categorize_transaction."""
+    df = sample_frame()
+
+    expected = detector.process_dataframe(df.copy(), vectorized=False)
+    expected['Fixkosten'] = expected['Fixkosten_Status']
+    expected['Kategorie'] = expected.apply(categorize_transaction, axis=1)
+
+    result = classify_transactions(df.copy())
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def test_classify_transactions_falls_back_to_categories():
+    """Verify that rows without a confident fixed-cost hit use CATEGORIES or 'Sonstiges'."""
+    result = classify_transactions(sample_frame())
+    by_payee = dict(zip(result['Zahlungsempfänger'], result['Kategorie']))
+
+    assert by_payee["Vermieter GmbH"] == "Wohnen"
+    assert by_payee["REWE"] == "Essen"
+    assert by_payee["Arbeitgeber"] == "Gehalt"
+    assert by_payee["Unbekannt"] == "Sonstiges"
@@ -0,0 +1,129 @@
+import os
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import backend.main as main
+from backend.disk_store import DiskSpillStore
+from backend.memory_store import InMemoryStore, compact_frame, create_store
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def session_frame(count=30):
+    return pd.DataFrame({
+        'Buchungsdatum': [f"2023-{i % 12 + 1:02d}-01" for i in range(count)],
+        'Zahlungsempfänger': [f"Payee {i % 4}" for i in range(count)],
+        'Betrag': [-1.5 * i for i in range(count)],
+        'Fixkosten': [i % 3 == 0 for i in range(count)],
+        'Fixkosten_Kategorie': ["Wohnen", "Keine", "Medien"] * (count // 3),
+        'Saldo_Danach': [None] * count,
+    })
+
+def test_disk_store_survives_restart(tmp_path):
+    """Verify that a new store instance on the same directory serves the saved session unchanged."""
+    DiskSpillStore(str(tmp_path)).save("a", session_frame())
+
+    restarted = DiskSpillStore(str(tmp_path))
+    result = restarted.get("a")
+
+    pd.testing.assert_frame_equal(result, compact_frame(session_frame()))
+    assert restarted.stats()["disk_reads"] == 1
+    assert restarted.stats()["hot"]["sessions"] == 1
+
+def test_disk_store_reads_column_subsets_without_promoting(tmp_path):
+    """Verify that a column read touches only those columns and keeps the hot tier empty."""
+    DiskSpillStore(str(tmp_path)).save("a", session_frame())
+    restarted = DiskSpillStore(str(tmp_path))
+
+    subset = restarted.get("a", columns=['Betrag', 'Fixkosten', 'Unbekannt'])
+
+    assert list(subset.columns) == ['Betrag', 'Fixkosten']
+    pd.testing.assert_series_equal(subset['Betrag'], session_frame()['Betrag'])
+    assert restarted.stats()["hot"]["sessions"] == 0
+
+def test_disk_store_clear_and_unknown_session(tmp_path):
+    """Verify clear() deletes the file and that session ids never become raw file names."""
+    store = DiskSpillStore(str(tmp_path))
+    store.save("../../etc/passwd", session_frame())
+    assert [name for name in os.listdir(tmp_path) if ".." in name or "passwd" in name] == []
+
+    store.clear("../../etc/passwd")
+    assert store.get("../../etc/passwd").empty
+    assert store.stats()["disk_sessions"] == 0
+    assert store.get("unknown").empty
+
+def test_disk_store_expires_idle_files(tmp_path):
+    """Verify that session files idle longer than the disk TTL are removed."""
+    clock = FakeClock()
+    store = DiskSpillStore(str(tmp_path), disk_ttl_seconds=60, clock=clock)
+    store.save("idle", session_frame())
+    store.save("active", session_frame())
+
+    clock.now += 50
+    store.get("active")
+    clock.now += 50
+
+    restarted = DiskSpillStore(str(tmp_path), disk_ttl_seconds=60, clock=clock)
+    assert restarted.get("idle").empty
+    assert not restarted.get("active").empty
+    assert restarted.stats()["disk_expired"] == 1
+
+def test_disk_store_keeps_session_files_together(tmp_path):
+    """Verify that reading only the cube also keeps the transactions file from expiring."""
+    clock = FakeClock()
+    store = DiskSpillStore(str(tmp_path), disk_ttl_seconds=60, clock=clock)
+    store.save_many("a", {"transactions": session_frame(), "cube": session_frame(3)})
+
+    clock.now += 50
+    store.get("a", kind="cube")
+    clock.now += 50
+
+    restarted = DiskSpillStore(str(tmp_path), disk_ttl_seconds=60, clock=clock)
+    assert len(restarted.get("a")) == 30
+    assert restarted.stats()["disk_expired"] == 0
+
+def test_create_store_backends(tmp_path, monkeypatch):
+    """Verify the backend switch of the factory."""
+    assert isinstance(create_store("memory"), InMemoryStore)
+    monkeypatch.setattr("backend.disk_store.DEFAULT_STORE_DIR", str(tmp_path))
+    disk = create_store("disk")
+    assert isinstance(disk, DiskSpillStore)
+    assert disk.directory == str(tmp_path)
+    with pytest.raises(ValueError):
+        create_store("redis")
+
+def test_financial_health_from_cold_disk_session(tmp_path, monkeypatch):
+    """Verify that the health endpoint serves a session that only exists on disk."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        assert client.post("/upload?x_session_id=disk", files={"file": ("mock.csv", f, "text/csv")}).status_code == 200
+    expected = client.get("/api/financial-health?x_session_id=disk").json()
+
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+    response = client.get("/api/financial-health?x_session_id=disk")
+
+    assert response.status_code == 200
+    assert response.json() == expected
+
+def test_financial_health_builds_cube_for_sessions_without_one(tmp_path, monkeypatch):
+    """Verify that a session stored before the aggregate cube existed is answered identically."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        assert client.post("/upload?x_session_id=legacy", files={"file": ("mock.csv", f, "text/csv")}).status_code == 200
+    expected = client.get("/api/financial-health?x_session_id=legacy").json()
+    assert expected["metrics"]["income"] == 34200.0
+    assert expected["metrics"]["needs"]["amount"] == 17202.67
+    assert expected["breakdown"][0] == {"name": "Medien", "amount": 545.67, "count": 33}
+
+    # Legacy layout: only the transactions file
+    for kind in ("cube", "fingerprints"):
+        os.remove(main.store._path("legacy", kind))
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+    assert client.get("/api/financial-health?x_session_id=legacy").json() == expected
+    assert main.store.stats()["disk_files"] == 2
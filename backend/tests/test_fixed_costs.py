@@ -1,4 +1,5 @@
 import pytest
+import pandas as pd
 from backend.logic.detector import FixedCostDetector, FixedCostCategory
 
 @pytest.fixture
@@ -34,3 +35,34 @@ def test_fixed_cost_income_exclusion(detector):
     cat, conf, _ = detector.detect("Miete Rückzahlung", "", 100.0)
     assert cat == FixedCostCategory.NONE
     assert conf == 0.0
+
+def test_process_dataframe_vectorized_matches_row_path(detector):
+    """Verify that the columnar engine yields exactly the same result columns as detect() per row."""
+    df = pd.DataFrame({
+        'Zahlungsempfänger': ["Miete GmbH", "NETFLIX", "HUK Coburg", "Stadtwerke", "Arbeitgeber", "Aldi",
+                              "Leasing Bank", "Unbekannt", "Telekom", None, "Netflix", "Vermieter"],
+        'Verwendungszweck': ["Wohnung", "Abo", "Kfz", "Abschlag Strom", "Gehalt", "Einkauf",
+                             "Rate 12", "Regelmäßig", "", "Kredit", "Bonus", "Miete"],
+        'Betrag': [-1200.0, -500.0, -89.0, -120.0, 2500.0, -45.0,
+                   -2500.0, -50.0, -39.9, -300.0, -13.99, 150.0],
+        'Wiederkehrend': [True, False, True, True, True, False,
+                          True, True, False, True, False, True],
+    })
+
+    expected = detector.process_dataframe(df, vectorized=False)
+    result = detector.process_dataframe(df)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_process_dataframe_vectorized_keeps_keyword_priority(detector):
+    """Verify that the first category in priority order wins when several keywords match."""
+    df = pd.DataFrame({
+        'Zahlungsempfänger': ["Miete", "Stadtwerke"],
+        'Verwendungszweck': ["Versicherung", "Kredit Rate"],
+        'Betrag': [-800.0, -60.0],
+        'Wiederkehrend': [False, False],
+    })
+    result = detector.process_dataframe(df)
+
+    assert result['Fixkosten_Kategorie'].tolist() == [FixedCostCategory.WOHNEN.value, FixedCostCategory.NEBENKOSTEN.value]
+    assert "'miete'" in result.loc[0, 'Fixkosten_Grund']
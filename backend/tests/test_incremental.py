@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+import backend.main as main
+from backend.incremental import (
+    append_transactions, duplicate_mask, extend_fingerprint_index, fingerprint_index, rebalance,
+    transaction_fingerprints, update_aggregate_cube,
+)
+from backend.memory_store import InMemoryStore, compact_frame
+from backend.services import (
+    build_aggregate_cube, calculate_50_30_20_metrics, calculate_balances, classify_transactions,
+    detect_recurring_patterns,
+)
+
+COMPARED = ['Buchungsdatum', 'Betrag', 'Zahlungsempfänger', 'Verwendungszweck', 'Wiederkehrend', 'Fixkosten',
+            'Kategorie', 'Fixkosten_Kategorie', 'Saldo_Danach']
+
+def statement(days=400, seed=3):
+    """
+    Parsed export shape: card payments plus monthly rent, streaming and salary, one booking per
+    day (the order of different bookings on one day is arbitrary, which would blur Saldo_Danach).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=days)
+    rows = []
+    for day in dates:
+        iso = day.strftime("%Y-%m-%d")
+        if day.day == 1:
+            rows.append((iso, "Hausverwaltung", "Miete Wohnung", -950.0))
+        elif day.day == 15:
+            rows.append((iso, "Netflix", "Abo", -12.99))
+        elif day.day == 28:
+            rows.append((iso, "Arbeitgeber GmbH", "Gehalt", 2800.0))
+        elif iso != "2023-03-03":
+            rows.append((iso, f"Laden {rng.integers(0, 30)}", "Kartenzahlung", -float(rng.integers(100, 9000)) / 100))
+    # Two identical bookings on one day must both survive
+    rows.append(("2023-03-03", "Café Central", "Kaffee", -3.2))
+    rows.append(("2023-03-03", "Café Central", "Kaffee", -3.2))
+    df = pd.DataFrame(rows, columns=['Buchungsdatum', 'Zahlungsempfänger', 'Verwendungszweck', 'Betrag'])
+    return df.assign(Wertstellung=df['Buchungsdatum'], Währung="EUR", Kategorie="Sonstiges", Saldo_Danach=None)
+
+def process(df, balance):
+    df = classify_transactions(detect_recurring_patterns(df))
+    df['Saldo_Danach'] = calculate_balances(df, balance)
+    return df
+
+def canonical(df):
+    return sorted(df[COMPARED].astype(object).itertuples(index=False, name=None), key=repr)
+
+def test_append_matches_full_reprocessing():
+    """Verify that old export + overlapping new export equals processing the union in one go."""
+    full_raw = statement()
+    old_raw = full_raw[full_raw['Buchungsdatum'] < "2024-01-10"]
+    new_raw = full_raw[full_raw['Buchungsdatum'] >= "2023-12-01"]  # overlaps December and early January
+    balance = 5000.0
+    old_balance = balance - full_raw.loc[full_raw['Buchungsdatum'] >= "2024-01-10", 'Betrag'].sum()
+
+    expected = process(full_raw.reset_index(drop=True), balance)
+    stored = compact_frame(process(old_raw.reset_index(drop=True), old_balance))
+
+    result = append_transactions(stored, new_raw.reset_index(drop=True))
+    frame = result["frame"]
+    rebalance(frame, new_raw, balance)
+
+    overlap = ((new_raw['Buchungsdatum'] >= "2023-12-01") & (new_raw['Buchungsdatum'] < "2024-01-10")).sum()
+    assert result["duplicates"] == overlap
+    assert len(result["added"]) == len(full_raw) - len(old_raw)
+    # Only the recurring groups of the new rows were reprocessed, not the whole history
+    assert 0 < len(result["before"]) < len(stored) / 2
+    assert canonical(frame) == canonical(expected)
+
+    cube = update_aggregate_cube(build_aggregate_cube(stored), result["after"], result["before"])
+    assert calculate_50_30_20_metrics(cube) == calculate_50_30_20_metrics(build_aggregate_cube(expected))
+    assert cube['count'].sum() == len(full_raw)
+
+def test_backfill_keeps_newer_balances():
+    """Verify that an older export appended to a newer session only rebalances its own date range."""
+    full_raw = statement()
+    balance = 5000.0
+    stored_raw = full_raw[full_raw['Buchungsdatum'] >= "2023-06-01"]
+    old_raw = full_raw[full_raw['Buchungsdatum'] <= "2023-06-10"]  # Jan-May plus an overlap into June
+    old_balance = balance - full_raw.loc[full_raw['Buchungsdatum'] > "2023-06-10", 'Betrag'].sum()
+
+    expected = process(full_raw.reset_index(drop=True), balance)
+    stored = compact_frame(process(stored_raw.reset_index(drop=True), balance))
+
+    result = append_transactions(stored, old_raw.reset_index(drop=True))
+    frame = result["frame"]
+    window = rebalance(frame, old_raw, old_balance)
+
+    assert result["duplicates"] == (old_raw['Buchungsdatum'] >= "2023-06-01").sum()
+    newer = (frame['Buchungsdatum'].astype(str) > "2023-06-10").to_numpy()
+    assert not window[newer].any()
+    np.testing.assert_array_equal(frame.loc[newer, 'Saldo_Danach'].to_numpy(), stored.loc[
+        stored['Buchungsdatum'].astype(str) > "2023-06-10", 'Saldo_Danach'].to_numpy())
+    latest = frame['Buchungsdatum'].astype(str).idxmax()
+    assert frame.loc[latest, 'Saldo_Danach'] == balance
+    assert canonical(frame) == canonical(expected)
+
+def test_append_of_known_export_changes_nothing():
+    """Verify that re-sending an export drops every row and keeps the session as is."""
+    stored = compact_frame(process(statement(60).reset_index(drop=True), 100.0))
+    result = append_transactions(stored, statement(60))
+    assert result["duplicates"] == len(stored)
+    assert result["added"].empty
+    assert len(result["frame"]) == len(stored)
+
+def test_equal_rows_within_one_export_are_kept_and_reported():
+    """Verify that identical bookings inside the appended export both stay and are counted, not dropped."""
+    raw = statement(90)
+    stored = compact_frame(process(raw[raw['Buchungsdatum'] < "2023-03-01"].reset_index(drop=True), 0.0))
+    incoming = raw[raw['Buchungsdatum'] >= "2023-03-01"].reset_index(drop=True)
+    result = append_transactions(stored, incoming, index=fingerprint_index(stored))
+
+    assert (result["duplicates"], result["repeated"]) == (0, 1)
+    assert (result["added"]['Zahlungsempfänger'] == "Café Central").sum() == 2
+    # Sending the same export again drops both, as the session now holds both
+    again = append_transactions(result["frame"], incoming, index=result["index"])
+    assert (again["duplicates"], again["repeated"]) == (len(incoming), 0)
+
+def test_upload_append_mode(monkeypatch):
+    """Verify the endpoint: second upload of the same file appends nothing and keeps the metrics."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        raw = f.read()
+    first = client.post("/upload?x_session_id=append&mode=append", files={"file": ("mock.csv", raw, "text/csv")}).json()
+    second = client.post("/upload?x_session_id=append&mode=append", files={"file": ("mock.csv", raw, "text/csv")}).json()
+
+    assert second["mode"] == "append"
+    assert (second["count"], second["appended"], second["duplicates_dropped"]) == (first["count"], 0, first["count"])
+    assert second["repeated_in_export"] == 0
+    assert second["financial_metrics"] == first["financial_metrics"]
+    assert len(main.store.get("append", kind="fingerprints")) == first["count"]
+    assert client.get("/api/financial-health?x_session_id=append").json()["metrics"] == first["financial_metrics"]
+    assert client.post("/upload?mode=merge", files={"file": ("mock.csv", raw, "text/csv")}).status_code == 400
+
+def test_append_without_stored_transactions_is_rejected(monkeypatch):
+    """Verify that an append to a session with only its derived frames left is refused instead of replacing it."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        raw = f.read()
+    stored = compact_frame(process(statement(60), 100.0))
+    main.store.save_many("partial", {"cube": build_aggregate_cube(stored), "fingerprints": fingerprint_index(stored)})
+
+    response = client.post("/upload?x_session_id=partial&mode=append", files={"file": ("mock.csv", raw, "text/csv")})
+    assert response.status_code == 410
+    assert main.store.get("partial").empty
+    # A new session (nothing stored at all) still starts from the first append
+    assert client.post("/upload?x_session_id=fresh&mode=append", files={"file": ("mock.csv", raw, "text/csv")}).status_code == 200
+
+def test_fingerprints_ignore_export_formatting():
+    """Verify that case, whitespace and IBAN spacing do not change the fingerprint, real differences do."""
+    dkb = pd.DataFrame({
+        'Buchungsdatum': ["2024-01-02", "2024-01-02", "2024-01-03"],
+        'Betrag': [-12.99, -12.99, -12.99],
+        'IBAN': ["DE02 1203 0000 0000 2020 51", "DE02 1203 0000 0000 2020 51", None],
+        'Zahlungsempfänger': ["NETFLIX  International", "NETFLIX  International", "Netflix"],
+        'Verwendungszweck': ["Abo ", "Abo ", "Abo"],
+    })
+    sparkasse = pd.DataFrame({
+        'Buchungsdatum': ["2024-01-02", "2024-01-02", "2024-01-03"],
+        'Betrag': [-12.990000001, -12.99, -12.98],
+        'IBAN': ["de02120300000000202051", "DE02120300000000202051", None],
+        'Zahlungsempfänger': pd.Categorical(["Netflix International", "netflix international", "Netflix"]),
+        'Verwendungszweck': ["Abo", "abo", "Abo"],
+    })
+    dkb_fp, sparkasse_fp = transaction_fingerprints(dkb), transaction_fingerprints(sparkasse)
+    assert dkb_fp.dtype == np.uint64
+    assert list(dkb_fp[:2]) == list(sparkasse_fp[:2])
+    assert dkb_fp[2] != sparkasse_fp[2]
+
+    # Both equal bookings of 2024-01-02 are known, the changed amount of 2024-01-03 is not
+    assert duplicate_mask(fingerprint_index(dkb), sparkasse).tolist() == [True, True, False]
+    # A session with only one of the two equal bookings keeps the second one
+    assert duplicate_mask(fingerprint_index(dkb.iloc[[0, 2]]), sparkasse).tolist() == [True, False, False]
+
+def test_extended_index_equals_rebuilt_index():
+    """Verify that appending keeps occurrence numbering identical to a rebuild over the merged rows."""
+    raw = statement(90)
+    stored = compact_frame(process(raw.iloc[:60].reset_index(drop=True), 0.0))
+    incoming = raw.iloc[50:].reset_index(drop=True)
+    result = append_transactions(stored, incoming, index=fingerprint_index(stored))
+
+    assert result["duplicates"] == 10
+    pd.testing.assert_frame_equal(result["index"], fingerprint_index(result["frame"]))
+    assert extend_fingerprint_index(fingerprint_index(stored), stored)['key'].is_unique
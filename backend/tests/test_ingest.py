@@ -0,0 +1,91 @@
+import io
+import pandas as pd
+import pytest
+from backend import ingest
+from backend.ingest import parse_upload
+from backend.tracing import trace_scope
+
+HEADER = "Buchungsdatum;Wertstellung;Zahlungsempfänger*in;Zahlungspflichtige*r;Verwendungszweck;Betrag (€);IBAN;Gläubiger-ID\n"
+
+def dkb_export(rows):
+    lines = ['"Kontostand vom 29.12.2025:";"4.321,50 EUR"\n', '""\n', HEADER]
+    lines += [f"{day:02d}.01.2025;{day:02d}.01.2025;{payee};Alex;{purpose};-{day},50;DE11;\n" for day, payee, purpose in rows]
+    return "".join(lines)
+
+def test_parse_upload_reads_utf8_stream():
+    """Verify bank detection, balance metadata and rows from a binary upload."""
+    content = dkb_export([(1, "Vermieter", "Miete"), (2, "Bäckerei Müller", "Brötchen")])
+    parser, df, metadata = parse_upload(io.BytesIO(content.encode("utf-8")))
+
+    assert parser.bank_name == "DKB"
+    assert metadata["balance"] == pytest.approx(4321.5)
+    assert df['Zahlungsempfänger'].tolist() == ["Vermieter", "Bäckerei Müller"]
+    assert df['Betrag'].tolist() == [-1.5, -2.5]
+
+def test_parse_upload_reads_cp1252_in_chunks(monkeypatch):
+    """Verify that a cp1252 export is detected from a small sample and parsed completely."""
+    monkeypatch.setattr(ingest, "SAMPLE_BYTES", 300)
+    rows = [(day, "Netflix", "Abo") for day in range(1, 20)] + [(25, "Bäckerei Müller", "Brötchen")]
+    content = dkb_export(rows)
+
+    parser, df, _ = parse_upload(io.BytesIO(content.encode("cp1252")))
+
+    assert df['Zahlungsempfänger'].iloc[-1] == "Bäckerei Müller"
+    pd.testing.assert_frame_equal(df, parser.parse_frame(content)[0])
+
+def test_parse_upload_strict_matches_streaming():
+    """Verify that the strict (pydantic) mode parses the same rows from the upload."""
+    content = dkb_export([(1, "Vermieter", "Miete"), (3, "REWE", "Einkauf")])
+    _, strict_df, _ = parse_upload(io.BytesIO(content.encode("utf-8")), strict=True)
+    _, df, _ = parse_upload(io.BytesIO(content.encode("utf-8")))
+
+    pd.testing.assert_frame_equal(df, strict_df)
+
+def test_parse_upload_finds_header_after_long_preamble():
+    """Verify that a metadata preamble longer than the sample still yields bank, balance and rows."""
+    preamble = "".join(f'"Hinweis {i}:";"Dieser Auszug wurde elektronisch erstellt"\n' for i in range(3000))
+    content = preamble + dkb_export([(1, "Vermieter", "Miete"), (2, "REWE", "Einkauf")])
+    assert len(content.encode("utf-8")) > 2 * ingest.SAMPLE_BYTES
+
+    parser, df, metadata = parse_upload(io.BytesIO(content.encode("utf-8")))
+
+    assert parser.bank_name == "DKB"
+    assert metadata["balance"] == pytest.approx(4321.5)
+    assert df['Zahlungsempfänger'].tolist() == ["Vermieter", "REWE"]
+
+def test_parse_upload_retry_does_not_count_rows_twice():
+    """Verify that trace counters of an encoding attempt that failed late are rolled back."""
+    # ASCII up to a cp1252 'ä' after the first pandas chunk: UTF-8 is detected and fails mid-file
+    header = '"Auftragskonto";"Buchungstag";"Valutadatum";"Verwendungszweck";"Beguenstigter/Zahlungspflichtiger";"Betrag"\n'
+    rows = ['"DE11";"02.01.2025";"02.01.2025";"Kartenzahlung";"Laden";"-1,50"\n'] * 45_000
+    rows[:3] = ['"DE11";"02.01.2025";"02.01.2025";"Kartenzahlung";"Laden";"-1,5x"\n'] * 3
+    content = header + "".join(rows) + '"DE11";"03.01.2025";"03.01.2025";"Brötchen";"Bäckerei";"-2,00"\n'
+
+    with trace_scope("upload", enabled=True) as trace:
+        parser, df, _ = parse_upload(io.BytesIO(content.encode("cp1252")))
+
+    assert parser.bank_name == "Sparkasse"
+    assert df['Verwendungszweck'].iloc[-1] == "Brötchen"
+    assert trace.counters["parser_skipped_rows"]["Sparkasse: invalid amount"] == 3
+
+def test_parse_upload_unknown_format():
+    """Verify that unknown exports are rejected with a ValueError (HTTP 400 in /upload)."""
+    with pytest.raises(ValueError):
+        parse_upload(io.BytesIO(b"not a csv"))
+
+@pytest.mark.parametrize("raw,expected", [
+    ("Zahlungsempfänger;Betrag".encode("utf-8"), "utf-8"),
+    (b"\xef\xbb\xbf" + "Buchungstag;Begünstigter".encode("utf-8"), "utf-8-sig"),
+    ("Zahlungsempfänger;Betrag".encode("cp1252"), "cp1252"),
+    ("Straße;€".encode("cp1252"), "cp1252"),
+    (b"Zahlungsempf\xe4nger;\x81", "iso-8859-1"),
+    (b"plain ascii", "utf-8"),
+])
+def test_detect_encoding_from_sample(raw, expected):
+    """Verify BOM handling, the UTF-8 probe and the cp1252/latin-1 distinction."""
+    assert ingest.detect_encoding(raw) == expected
+
+def test_detect_encoding_ignores_cut_multibyte_character():
+    """Verify that a UTF-8 character split at the sample boundary does not count as invalid."""
+    raw = "Müller".encode("utf-8")
+    assert ingest.detect_encoding(raw[:2]) == "utf-8"
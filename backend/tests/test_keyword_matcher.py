@@ -0,0 +1,57 @@
+import random
+import pandas as pd
+import pytest
+from backend.logic.matcher import KeywordMatcher
+from backend.services import CATEGORIES, CATEGORY_TABLE, keyword_matcher
+
+def naive_first_match(text, table):
+    """Reference: the original nested loop over categories and keywords."""
+    for category, keywords in table.items():
+        for kw in keywords:
+            if kw.lower() in text:
+                return category, kw.lower()
+    return None
+
+@pytest.fixture
+def matcher():
+    m = KeywordMatcher()
+    m.add_table("a", {"Wohnen": ["miete", "weg"], "Finanzierung": ["rate", "zins", "zinsen"]})
+    m.add_table("b", {"Kurz": ["he"], "Lang": ["she", "his", "hers"]})
+    m.build()
+    return m
+
+def test_matcher_respects_category_priority(matcher):
+    """Verify that the first category in table order wins, not the first position in the text."""
+    assert matcher.first_match("rate für die miete", "a") == ("Wohnen", "miete")
+    assert matcher.first_match("zinsen", "a") == ("Finanzierung", "zins")
+
+def test_matcher_finds_overlapping_keywords(matcher):
+    """Verify that suffix matches via failure links are reported for every table in one scan."""
+    hits = matcher.scan("ushers")
+    assert hits["b"] == ("Kurz", "he")
+    assert "a" not in hits
+
+def test_matcher_lowercases_keywords():
+    """Verify that mixed-case keywords (as in CATEGORIES) match lowercased text."""
+    m = KeywordMatcher()
+    m.add_table("t", {"Shopping": ["H&M", "Media Markt"]})
+    assert m.first_match("media markt berlin", "t") == ("Shopping", "media markt")
+
+def test_shared_matcher_matches_naive_categories():
+    """Verify that the shared automaton yields the same CATEGORIES result as the nested loop."""
+    rng = random.Random(7)
+    keywords = [kw.lower() for kws in CATEGORIES.values() for kw in kws]
+    noise = ["", "x", "berlin", "gmbh", "sepa", "123", "ü", "ab"]
+    for _ in range(500):
+        parts = rng.choices(keywords + noise, k=rng.randint(1, 4))
+        text = rng.choice(["", " ", "-"]).join(parts)
+        assert keyword_matcher.first_match(text, CATEGORY_TABLE) == naive_first_match(text, CATEGORIES)
+
+def test_match_series_matches_scan(matcher):
+    """Verify that the columnar match returns the same priority ranks as scan()."""
+    texts = pd.Series(["miete", "zinsen rate", "nichts", "weg mit der rate", ""])
+    ranks = matcher.match_series(texts, "a")
+    entries = matcher.entries("a")
+    for text, rank in zip(texts, ranks):
+        expected = matcher.first_match(text, "a")
+        assert (entries[rank] if rank >= 0 else None) == expected
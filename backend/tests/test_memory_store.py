@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.memory_store import InMemoryStore, compact_frame, estimate_size
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def records(count, text="x"):
+    return [{"Zahlungsempfänger": f"{text} {i}", "Betrag": -1.0 * i} for i in range(count)]
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_store_keeps_interface():
+    """Verify save/get/clear semantics including the empty default."""
+    store = InMemoryStore()
+    store.save("a", records(3))
+    assert len(store.get("a")) == 3
+    store.clear("a")
+    assert store.get("a").empty
+    store.clear("unknown")
+
+def test_store_keeps_frames_of_one_session_apart_by_kind():
+    """Verify that derived frames (kind) live next to the transactions and are cleared with them."""
+    store = InMemoryStore()
+    store.save("a", records(3))
+    store.save("a", records(1), kind="cube")
+    assert len(store.get("a")) == 3
+    assert len(store.get("a", kind="cube")) == 1
+    assert store.stats()["sessions"] == 1
+    assert store.stats()["frames"] == 2
+    store.clear("a")
+    assert store.get("a", kind="cube").empty
+
+def test_store_evicts_least_recently_used_over_budget():
+    """Verify LRU eviction once the byte budget is exceeded."""
+    size = estimate_size(compact_frame(records(50)))
+    store = InMemoryStore(max_bytes=int(size * 2.5), ttl_seconds=None)
+    store.save("a", records(50))
+    store.save("b", records(50))
+    store.get("a")  # 'b' is now the least recently used session
+    store.save("c", records(50))
+
+    assert store.get("b").empty
+    assert not store.get("a").empty and not store.get("c").empty
+    stats = store.stats()
+    assert stats["evictions_lru"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+def test_store_evicts_idle_sessions_after_ttl(clock):
+    """Verify idle-TTL eviction and that reads refresh the idle timer."""
+    store = InMemoryStore(max_bytes=None, ttl_seconds=60, clock=clock)
+    store.save("idle", records(2))
+    store.save("active", records(2))
+
+    clock.now = 50
+    store.get("active")
+    clock.now = 100
+
+    assert store.get("idle").empty
+    assert len(store.get("active")) == 2
+    assert store.stats()["evictions_ttl"] == 1
+
+def test_store_evicts_sessions_with_all_their_frames(clock):
+    """Verify that reading only the cube keeps the transactions alive and eviction drops both."""
+    store = InMemoryStore(max_bytes=None, ttl_seconds=60, clock=clock)
+    store.save_many("a", {"transactions": records(5), "cube": records(1)})
+    store.save("idle", records(2))
+
+    clock.now = 50
+    store.get("a", kind="cube")
+    clock.now = 100
+
+    assert len(store.get("a")) == 5
+    assert store.get("idle").empty
+    clock.now = 200
+    assert store.get("a", kind="cube").empty
+    stats = store.stats()
+    assert (stats["sessions"], stats["frames"], stats["bytes"], stats["evictions_ttl"]) == (0, 0, 0, 2)
+
+def test_store_keeps_single_oversized_session():
+    """Verify that a session larger than the budget replaces the others instead of being dropped."""
+    store = InMemoryStore(max_bytes=estimate_size(compact_frame(records(10))), ttl_seconds=None)
+    store.save("small", records(5))
+    store.save("big", records(500))
+
+    assert store.get("small").empty
+    assert len(store.get("big")) == 500
+    assert store.stats()["sessions"] == 1
+
+def test_store_accounts_bytes_on_replace_and_clear():
+    """Verify that the byte counter follows overwrites and clears."""
+    store = InMemoryStore(max_bytes=None, ttl_seconds=None)
+    store.save("a", records(10))
+    store.save("a", records(20))
+    assert store.stats()["bytes"] == estimate_size(compact_frame(records(20)))
+    store.clear("a")
+    assert store.stats()["bytes"] == 0
+
+def test_estimate_size_dataframe_and_records():
+    """Verify that estimates grow with the payload for both supported layouts."""
+    assert estimate_size(records(200)) > estimate_size(records(20)) > 0
+    assert estimate_size(pd.DataFrame(records(200))) > estimate_size(pd.DataFrame(records(20)))
+
+def session_frame(count):
+    return pd.DataFrame({
+        'Buchungsdatum': [f"2023-{i % 12 + 1:02d}-01" for i in range(count)],
+        'Zahlungsempfänger': [f"Payee {i % 40}" for i in range(count)],
+        'Verwendungszweck': [f"Referenz {i}" for i in range(count)],
+        'Betrag': [-1.0 * i for i in range(count)],
+        'Kategorie': ["Wohnen", "Essen", "Sonstiges"] * (count // 3) + ["Sonstiges"] * (count % 3),
+    })
+
+def test_compact_frame_uses_categoricals_for_repeated_text():
+    """Verify the columnar layout: repeated text becomes categorical, unique text stays plain."""
+    df = session_frame(3000)
+    compact = compact_frame(df)
+
+    assert isinstance(compact['Zahlungsempfänger'].dtype, pd.CategoricalDtype)
+    assert isinstance(compact['Kategorie'].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact['Verwendungszweck'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(compact.astype(df.dtypes.to_dict()), df)
+    assert estimate_size(compact) * 3 < estimate_size(df.to_dict(orient='records'))
+
+def test_store_returns_views_isolated_from_caller_changes():
+    """Verify that reads share the stored data but changes by the caller do not leak back."""
+    store = InMemoryStore(max_bytes=None, ttl_seconds=None)
+    store.save("a", session_frame(30))
+
+    first = store.get("a")
+    assert np.shares_memory(first['Betrag'].to_numpy(), store.get("a")['Betrag'].to_numpy())
+    first.loc[0, 'Betrag'] = 999.0
+    first['Neu'] = 1
+
+    again = store.get("a")
+    assert again.loc[0, 'Betrag'] == 0.0
+    assert 'Neu' not in again.columns
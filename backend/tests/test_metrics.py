@@ -1,6 +1,6 @@
 import pandas as pd
 import pytest
-from backend.services import calculate_50_30_20_metrics
+from backend.services import calculate_50_30_20_metrics, calculate_monthly_metrics, build_aggregate_cube, fixed_cost_breakdown
 
 def test_metrics_calculation_standard():
     """Verify standard 50-30-20 calculation with exact matches."""
@@ -53,3 +53,50 @@ def test_metrics_rounding_precision():
     
     # percentage is rounded to 1 decimal in service
     assert metrics['needs']['percentage'] == pytest.approx(round(expected_perc, 1))
+
+def test_aggregate_cube_matches_transaction_level_results():
+    """Verify that metrics and fixed-cost breakdown read from the cube equal the per-transaction computation."""
+    df = pd.DataFrame({
+        'Buchungsdatum': ['2024-01-03', '2024-01-15', '2024-01-20', '2024-02-01', '2024-02-03', None, '2024-02-10'],
+        'Kategorie': ['Gehalt', 'Wohnen', 'Lebensmittel', 'Gehalt', 'Wohnen', 'Medien', 'Lebensmittel'],
+        'Fixkosten_Kategorie': ['Keine', 'Wohnen', 'Keine', 'Keine', 'Wohnen', 'Medien', 'Keine'],
+        'Fixkosten': [False, True, False, False, True, True, False],
+        'Betrag': [2500.0, -900.0, -45.31, 2500.0, -900.0, -12.99, 0.0],
+    })
+    cube = build_aggregate_cube(df)
+
+    assert calculate_50_30_20_metrics(cube) == calculate_50_30_20_metrics(df)
+    assert fixed_cost_breakdown(cube) == [
+        {"name": "Medien", "amount": 12.99, "count": 1},
+        {"name": "Wohnen", "amount": 1800.0, "count": 2},
+    ]
+    assert sorted(cube['month'].unique()) == ['2024-01', '2024-02', 'unbekannt']
+    assert cube['count'].sum() == len(df)
+
+def test_monthly_metrics_with_rolling_windows_and_range_filter():
+    """Verify monthly series, calendar-based rolling sums across empty months and the month filter."""
+    df = pd.DataFrame({
+        'Buchungsdatum': ['2024-01-02', '2024-01-10', '2024-01-20', '2024-03-01', '2024-03-05', '2024-04-01', 'kaputt'],
+        'Kategorie': ['Gehalt', 'Wohnen', 'Freizeit', 'Gehalt', 'Wohnen', 'Freizeit', 'Freizeit'],
+        'Fixkosten_Kategorie': ['Keine', 'Wohnen', 'Keine', 'Keine', 'Wohnen', 'Keine', 'Keine'],
+        'Fixkosten': [False, True, False, False, True, False, False],
+        'Betrag': [1000.0, -500.0, -200.0, 1000.0, -500.0, -50.0, -999.0],
+    })
+    result = calculate_monthly_metrics(build_aggregate_cube(df), windows=[3])
+
+    assert result["months"] == ['2024-01', '2024-02', '2024-03', '2024-04']
+    january, february = result["monthly"][0], result["monthly"][1]
+    assert (january["income"], january["needs"], january["wants"], january["savings"]) == (1000.0, 500.0, 200.0, 300.0)
+    assert january["needs_percentage"] == 50.0
+    assert february["income"] == 0.0
+    assert february["needs_percentage"] is None
+
+    rolling = result["rolling"]["3"]
+    assert rolling[1]["income"] is None
+    assert (rolling[2]["income"], rolling[2]["needs"], rolling[2]["wants"]) == (2000.0, 1000.0, 200.0)
+    assert (rolling[3]["income"], rolling[3]["wants"]) == (1000.0, 50.0)
+
+    filtered = calculate_monthly_metrics(build_aggregate_cube(df), windows=[3], start='2024-03', end='2024-03')
+    assert filtered["months"] == ['2024-03']
+    # The window still covers the months before the filtered range
+    assert filtered["rolling"]["3"] == [rolling[2]]
@@ -0,0 +1,130 @@
+import os
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+import backend.main as main
+from backend.disk_store import DiskSpillStore
+from backend.memory_store import InMemoryStore
+from backend.sqlite_store import SqliteStore
+
+client = TestClient(main.app)
+
+def upload_mock(session_id, summary_only=True):
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        response = client.post(f"/upload?x_session_id={session_id}&summary_only={str(summary_only).lower()}",
+                               files={"file": ("mock.csv", f, "text/csv")})
+    assert response.status_code == 200
+    return response.json()
+
+def fetch_all(session_id, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, x_session_id=session_id, **({"cursor": cursor} if cursor else {}))
+        page = client.get("/api/transactions", params=query).json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+def test_summary_only_upload_and_paged_transactions(monkeypatch):
+    """Verify that pages cover every transaction exactly once, in upload order by default."""
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    full = upload_mock("pages", summary_only=False)
+    summary = upload_mock("pages")
+    assert "transactions" not in summary
+    assert summary["session_id"] == "pages"
+    assert summary["count"] == full["count"]
+
+    pages = fetch_all("pages", limit=40)
+    assert [page["count"] for page in pages[:-1]] == [40] * (len(pages) - 1)
+    assert [tx for page in pages for tx in page["transactions"]] == full["transactions"]
+    assert pages[0]["total"] == full["count"]
+
+def test_transactions_sorted_and_projected(monkeypatch):
+    """Verify column projection and a stable descending sort across pages."""
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    full = upload_mock("sorted", summary_only=False)
+
+    pages = fetch_all("sorted", limit=25, columns="Buchungsdatum,Betrag", sort="-Betrag")
+    rows = [tx for page in pages for tx in page["transactions"]]
+    expected = sorted(({"Buchungsdatum": tx["Buchungsdatum"], "Betrag": tx["Betrag"]} for tx in full["transactions"]),
+                      key=lambda tx: -tx["Betrag"])
+    assert rows == expected
+    assert pages[0]["columns"] == ["Buchungsdatum", "Betrag"]
+
+def test_transactions_rejects_bad_input(monkeypatch):
+    """Verify 400 for unknown columns and foreign cursors, 404 for unknown sessions."""
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    upload_mock("bad")
+    assert client.get("/api/transactions?x_session_id=bad&columns=Nope").status_code == 400
+    assert client.get("/api/transactions?x_session_id=bad&sort=-Nope").status_code == 400
+    cursor = client.get("/api/transactions?x_session_id=bad&limit=5&sort=Betrag").json()["next_cursor"]
+    assert client.get(f"/api/transactions?x_session_id=bad&cursor={cursor}").status_code == 400
+    assert client.get("/api/transactions?x_session_id=bad&cursor=%%%").status_code == 400
+    assert client.get("/api/transactions?x_session_id=nobody").status_code == 404
+
+def test_projected_page_of_cold_disk_session(tmp_path, monkeypatch):
+    """Verify that a projected page of a disk-only session reads the schema and those columns, nothing more."""
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+    full = upload_mock("cold", summary_only=False)
+    monkeypatch.setattr(main, "store", DiskSpillStore(str(tmp_path)))
+
+    page = client.get("/api/transactions?x_session_id=cold&columns=Betrag&limit=10").json()
+    assert page["transactions"] == [{"Betrag": tx["Betrag"]} for tx in full["transactions"][:10]]
+    stats = main.store.stats()
+    assert stats["disk_reads"] == 1
+    assert stats["hot"]["frames"] == 0
+
+def test_cursor_rejected_after_append(monkeypatch):
+    """Verify that a cursor issued before an append is refused instead of shifting the pages."""
+    monkeypatch.setattr(main, "store", InMemoryStore())
+    upload_mock("grown")
+    cursor = client.get("/api/transactions?x_session_id=grown&limit=5").json()["next_cursor"]
+    stored = main.store.get("grown")
+    main.store.save("grown", pd.concat([stored, stored.iloc[:3]], ignore_index=True))
+
+    response = client.get(f"/api/transactions?x_session_id=grown&cursor={cursor}")
+    assert response.status_code == 400
+    assert "stale" in response.json()["detail"]
+
+@pytest.mark.parametrize("backend", ["memory", "disk", "sqlite"])
+def test_cursor_rejected_after_save_of_same_length(tmp_path, monkeypatch, backend):
+    """Verify that cursors follow the session's version, not its row count, on every backend."""
+    stores = {
+        "memory": lambda: InMemoryStore(),
+        "disk": lambda: DiskSpillStore(str(tmp_path)),
+        "sqlite": lambda: SqliteStore(str(tmp_path / "sessions.sqlite3")),
+    }
+    monkeypatch.setattr(main, "store", stores[backend]())
+    upload_mock("edited")
+    cursor = client.get("/api/transactions?x_session_id=edited&limit=5").json()["next_cursor"]
+    if backend != "memory":
+        # Versions are persisted: a restarted store (or another worker) accepts the cursor
+        monkeypatch.setattr(main, "store", stores[backend]())
+    assert client.get(f"/api/transactions?x_session_id=edited&cursor={cursor}").status_code == 200
+
+    stored = main.store.get("edited")
+    main.store.save("edited", stored.iloc[::-1].reset_index(drop=True))
+    response = client.get(f"/api/transactions?x_session_id=edited&cursor={cursor}")
+    assert response.status_code == 400
+    assert "stale" in response.json()["detail"]
+
+class SavingStore(InMemoryStore):
+    """Replaces the session once, right after the first read of the sort columns."""
+
+    def get(self, session_id, columns=None, kind="transactions"):
+        df = super().get(session_id, columns, kind)
+        if columns == ['Betrag'] and not getattr(self, "saved", False):
+            self.saved = True
+            full = super().get(session_id)
+            self.save(session_id, full.iloc[:4])
+        return df
+
+def test_page_read_again_when_saved_in_between(monkeypatch):
+    """Verify that the order and the rows of a page always come from the same save."""
+    monkeypatch.setattr(main, "store", SavingStore())
+    upload_mock("moving")
+
+    page = client.get("/api/transactions?x_session_id=moving&sort=-Betrag&limit=10").json()
+    assert page["total"] == page["count"] == 4
+    assert page["transactions"][0]["Betrag"] == max(tx["Betrag"] for tx in page["transactions"])
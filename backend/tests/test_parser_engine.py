@@ -1,4 +1,7 @@
+import io
+import pytest
 from backend.parsers.factory import ParserFactory
+from backend.tracing import trace_scope
 import pandas as pd
 
 def test_parser():
@@ -18,5 +21,84 @@ def test_parser():
     except Exception as e:
         print(f"Test fehlgeschlagen: {str(e)}")
 
+DKB_EDGE_CASES = (
+    '"Kontostand vom 29.12.2025:";"4.321,50 EUR"\n'
+    '""\n'
+    "Buchungsdatum;Wertstellung;Status;Zahlungspflichtige*r;Zahlungsempfänger*in;Verwendungszweck;Umsatztyp;IBAN;Betrag (€);Gläubiger-ID\n"
+    "01.01.2025;01.01.2025;Gebucht;Alex;Vermieter GmbH;Miete Januar;Dauerauftrag;DE123;-1.200,00;G1\n"
+    "02.01.2025;;Gebucht;Alex;REWE;;Kartenzahlung;;-45,30;\n"
+    ";02.01.2025;Gebucht;Alex;Leerzeile;;;;-1,00;\n"
+    "kein Datum;02.01.2025;Gebucht;Alex;Kaputt;;;;-1,00;\n"
+    "03.01.2025;irgendwann;Gebucht;Alex;Kaputt;;;;-1,00;\n"
+    "04.01.2025;04.01.2025;Gebucht;Alex;Kaputt;;;;abc;\n"
+    "05.01.25;05.01.2025;Gebucht;Arbeitgeber;Alex;Gehalt;Gutschrift;DE9;2.850,00;\n"
+)
+
+# Columns that look numeric as a whole: account numbers with leading zeros, amounts without cents
+DKB_NUMERIC_COLUMNS = (
+    '"Kontostand vom 29.12.2025:";"4.321,50 EUR"\n'
+    '""\n'
+    "Buchungsdatum;Wertstellung;Status;Zahlungspflichtige*r;Zahlungsempfänger*in;Verwendungszweck;Umsatztyp;IBAN;Betrag (€);Gläubiger-ID\n"
+    "01.01.2025;01.01.2025;Gebucht;Alex;Vermieter GmbH;4711;Dauerauftrag;0012345678;-1.200;\n"
+    ";;;;;;;;;\n"
+    "02.01.2025;02.01.2025;Gebucht;Alex;REWE;0815;Kartenzahlung;0098765432;-45;\n"
+)
+
+SPARKASSE_EDGE_CASES = (
+    '"Auftragskonto";"Buchungstag";"Valutadatum";"Buchungstext";"Verwendungszweck";"Begünstigter/Zahlungspflichtiger";"Kontonummer/IBAN";"Betrag";"Waehrung"\n'
+    '"DE1";"01.10.23";"01.10.23";"LASTSCHRIFT";"Strom";"Stadtwerke";"DE2";"-85,00";"EUR"\n'
+    '"DE1";"";"01.10.23";"LASTSCHRIFT";"Leer";"Niemand";"DE2";"-1,00";"EUR"\n'
+    '"DE1";"02.10.2023";"02.10.23";"GUTSCHRIFT";"Gehalt";"Arbeitgeber";"";"2.850,00";"EUR"\n'
+    '"DE1";"03.10.2023";"03.10.23";"KARTE";"";"";"DE3";"x";"EUR"\n'
+)
+
+@pytest.mark.parametrize("content,bank", [
+    (DKB_EDGE_CASES, "DKB"), (DKB_NUMERIC_COLUMNS, "DKB"), (SPARKASSE_EDGE_CASES, "Sparkasse"),
+])
+def test_columnar_parse_matches_strict_parse(content, bank):
+    """Verify that the columnar parser yields the same rows and values as the pydantic path."""
+    parser = ParserFactory.get_parser(content)
+    assert parser.bank_name == bank
+
+    strict_df, strict_meta = parser.parse_dataframe(content, strict=True)
+    df, meta = parser.parse_dataframe(content)
+
+    pd.testing.assert_frame_equal(df, strict_df)
+    assert meta == strict_meta
+
+def test_columnar_parse_counts_skipped_rows():
+    """Verify that skipped rows are counted like in the row-wise path (blank dates are not counted)."""
+    parser = ParserFactory.get_parser(DKB_EDGE_CASES)
+
+    with trace_scope("strict", enabled=True) as strict_trace:
+        parser.parse_dataframe(DKB_EDGE_CASES, strict=True)
+    with trace_scope("columnar", enabled=True) as trace:
+        df, _ = parser.parse_dataframe(DKB_EDGE_CASES)
+
+    assert len(df) == 3
+    assert trace.summary()["parser_skipped_rows"]["total"] == strict_trace.summary()["parser_skipped_rows"]["total"] == 3
+    # Same reason labels on both paths
+    assert trace.counters["parser_skipped_rows"] == strict_trace.counters["parser_skipped_rows"]
+
+def test_numeric_looking_columns_stay_text():
+    """Verify that leading zeros and amounts without cents survive both paths (read as text, not inferred)."""
+    parser = ParserFactory.get_parser(DKB_NUMERIC_COLUMNS)
+    for strict in (True, False):
+        df, _ = parser.parse_dataframe(DKB_NUMERIC_COLUMNS, strict=strict)
+        assert df['IBAN'].tolist() == ["0012345678", "0098765432"]
+        assert df['Verwendungszweck'].tolist() == ["4711", "0815"]
+        assert df['Betrag'].tolist() == [-1200.0, -45.0]
+
+@pytest.mark.parametrize("content", [DKB_EDGE_CASES, SPARKASSE_EDGE_CASES])
+def test_chunked_stream_parse_matches_single_chunk(content):
+    """Verify that reading in small chunks yields the same frame and metadata as one chunk."""
+    parser = ParserFactory.get_parser(content)
+
+    df, meta = parser.parse_frame(content)
+    chunked_df, chunked_meta = parser.parse_stream(io.StringIO(content), chunk_rows=2)
+
+    pd.testing.assert_frame_equal(chunked_df, df)
+    assert chunked_meta == meta
+
 if __name__ == "__main__":
     test_parser()
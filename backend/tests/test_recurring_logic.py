@@ -1,6 +1,8 @@
 import pandas as pd
+import numpy as np
 import pytest
 from backend.services import detect_recurring_patterns
+from backend.tests.legacy_reference import legacy_detect_recurring_patterns
 
 def test_recurring_pattern_standard_interval():
     """Test standard 30-day interval detection."""
@@ -54,3 +56,23 @@ def test_recurring_pattern_different_amounts():
     df = detect_recurring_patterns(df)
     
     assert not df['Wiederkehrend'].any(), "Amounts must match exactly in current implementation"
+
+def test_recurring_pattern_vectorized_matches_legacy_loop():
+    """Verify identical flags and row order compared to the per-group loop, including gaps and missing values."""
+    rng = np.random.default_rng(3)
+    size = 2000
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 720, size), unit="D")
+    data = {
+        'Buchungsdatum': dates.strftime("%Y-%m-%d").tolist(),
+        'Zahlungsempfänger': rng.choice(["A", "B", "C", "D", "E", None], size).tolist(),
+        'Betrag': rng.choice([-10.0, -20.0, -35.5, np.nan], size),
+        'Verwendungszweck': ["x"] * size,
+    }
+    data['Buchungsdatum'][-20:] = ["kein Datum"] * 20
+    df = pd.DataFrame(data)
+
+    expected = legacy_detect_recurring_patterns(df.copy())
+    result = detect_recurring_patterns(df.copy())
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert result['Wiederkehrend'].any()
@@ -0,0 +1,59 @@
+from backend.response_cache import ResponseCache, analysis_cache_key
+from backend.services import build_ai_messages
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+SUMMARIES = [{"name": "Wohnen", "amount": 900.0, "count": 1}, {"name": "Essen", "amount": 312.456, "count": 14}]
+TOP = [{"Buchungsdatum": "2023-10-01", "Zahlungsempfänger": "Vermieter", "Betrag": -900.0, "Verwendungszweck": "Miete",
+        "Kategorie": "Wohnen"}]
+
+def test_cache_key_normalizes_context():
+    """Verify that order of categories, float noise, unused fields and prompt whitespace do not change the key."""
+    key = analysis_cache_key(SUMMARIES, TOP, "Wo kann ich sparen?")
+
+    reordered = [dict(SUMMARIES[1], amount=312.4560000001), SUMMARIES[0]]
+    top_without_extra = [{k: v for k, v in TOP[0].items() if k != "Kategorie"}]
+    assert analysis_cache_key(reordered, top_without_extra, "  Wo kann ich sparen? ") == key
+
+    assert analysis_cache_key(SUMMARIES, TOP, "Andere Frage") != key
+    assert analysis_cache_key([dict(SUMMARIES[0], amount=901.0), SUMMARIES[1]], TOP, "Wo kann ich sparen?") != key
+    assert analysis_cache_key(SUMMARIES, TOP, None) == analysis_cache_key(SUMMARIES, TOP, "")
+
+def test_equal_cache_keys_send_equal_messages():
+    """Verify that inputs sharing a cache key (prompt whitespace, category order) also build the same messages."""
+    for first, second in [(None, "   "), ("Wo kann ich sparen?", "  Wo kann ich sparen? ")]:
+        assert analysis_cache_key(SUMMARIES, TOP, first) == analysis_cache_key(SUMMARIES, TOP, second)
+        assert build_ai_messages(SUMMARIES, TOP, first) == build_ai_messages(SUMMARIES, TOP, second)
+
+    reordered = SUMMARIES[::-1]
+    assert analysis_cache_key(reordered, TOP, None) == analysis_cache_key(SUMMARIES, TOP, None)
+    assert build_ai_messages(reordered, TOP, None) == build_ai_messages(SUMMARIES, TOP, None)
+
+def test_cache_expires_after_ttl():
+    """Verify that entries are dropped once they are older than the TTL."""
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, clock=clock)
+    cache.put("a", "Antwort")
+    clock.now = 59
+    assert cache.get("a") == "Antwort"
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.stats()["evictions_ttl"] == 1
+
+def test_cache_evicts_least_recently_used():
+    """Verify that beyond max_entries the least recently read or written entry is dropped."""
+    cache = ResponseCache(max_entries=2, ttl_seconds=None)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["evictions_lru"]) == (2, 3, 1, 1)
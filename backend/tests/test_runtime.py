@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+import backend.main as main
+from backend.runtime import BoundedPool, LoopLagMonitor, PoolSaturated
+from backend.tracing import current_trace, trace_scope
+
+def test_pool_rejects_when_saturated():
+    """Verify admission control: max_workers running plus max_queue waiting, the rest is rejected."""
+    pool = BoundedPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated):
+            await pool.run(lambda: "rejected")
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    stats = pool.stats()
+    assert (stats["completed"], stats["rejected"], stats["in_flight"]) == (2, 1, 0)
+
+def test_pool_keeps_event_loop_responsive():
+    """Verify that a blocking job does not delay other coroutines and keeps the trace context."""
+    pool = BoundedPool(max_workers=1, max_queue=0)
+    monitor = LoopLagMonitor(interval=0.01)
+
+    def blocking_job():
+        time.sleep(0.3)
+        return current_trace() is not None
+
+    async def scenario():
+        monitor.start()
+        with trace_scope("test", enabled=True):
+            result = await pool.run(blocking_job)
+        await monitor.stop()
+        return result
+
+    assert asyncio.run(scenario()) is True
+    stats = monitor.stats()
+    assert stats["samples"] >= 10
+    assert stats["lag_max_ms"] < 150
+
+def test_monitor_reports_blocked_loop():
+    """Verify that blocking the loop directly shows up as lag."""
+    monitor = LoopLagMonitor(interval=0.01)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    assert monitor.stats()["lag_max_ms"] >= 150
+
+def test_upload_returns_503_when_pool_is_saturated(monkeypatch):
+    """Verify back-pressure on the upload endpoint."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "upload_pool", BoundedPool(max_workers=1, max_queue=0))
+    main.upload_pool._in_flight = 1
+
+    files = {"file": ("dkb.csv", b"irrelevant", "text/csv")}
+    response = client.post("/upload", files=files)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert client.get("/api/runtime").json()["upload_pool"]["rejected"] == 1
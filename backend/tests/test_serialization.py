@@ -0,0 +1,114 @@
+import gzip
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+import backend.main as main
+from backend.serialization import (
+    COLUMNAR_MEDIA_TYPE, dumps, negotiate_encoding, negotiate_layout, negotiated_response,
+)
+
+def test_dumps_handles_nan_bool_and_numpy_types():
+    """Verify null for NaN/NA, native bools and numpy scalars, and frames spliced at the top level."""
+    df = pd.DataFrame({
+        'Betrag': [-12.34, np.nan],
+        'Fixkosten': [True, False],
+        'Zahlungsempfänger': ["Café Central", None],
+        'count': np.array([1, 2], dtype=np.int64),
+    })
+    body = dumps({"count": np.int64(2), "ratio": np.float64("nan"), "flag": np.bool_(True), "missing": pd.NA, "transactions": df})
+
+    assert json.loads(body) == {
+        "count": 2, "ratio": None, "flag": True, "missing": None,
+        "transactions": [
+            {'Betrag': -12.34, 'Fixkosten': True, 'Zahlungsempfänger': "Café Central", 'count': 1},
+            {'Betrag': None, 'Fixkosten': False, 'Zahlungsempfänger': None, 'count': 2},
+        ],
+    }
+    assert "Café".encode("utf-8") in body
+    assert json.loads(dumps({"transactions": df.iloc[:0]})) == {"transactions": []}
+
+def test_upload_response_matches_previous_encoding():
+    """Verify that the fast path produces the same document as to_dict + jsonable_encoder."""
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        response = main.process_upload(io.BytesIO(f.read()), "serialization")
+    expected = dict(response, transactions=response["transactions"].to_dict(orient='records'))
+
+    assert json.loads(dumps(response)) == json.loads(json.dumps(jsonable_encoder(expected)))
+
+def columnar_to_records(document):
+    """Reference decoder for the columnar layout."""
+    columns = {}
+    for name, values in document["columns"].items():
+        if isinstance(values, dict):
+            values = [values["dictionary"][code] if code >= 0 else None for code in values["codes"]]
+        columns[name] = values
+    return [{name: columns[name][i] for name in columns} for i in range(document["length"])]
+
+def test_columnar_layout_round_trips_to_records():
+    """Verify dictionary encoding of repeating text (including nulls) and plain arrays for the rest."""
+    df = pd.DataFrame({
+        'Kategorie': pd.Series(["Wohnen", "Medien", "Wohnen", None] * 5, dtype=object),
+        'Fixkosten_Kategorie': pd.Categorical(["Wohnen", "Keine"] * 10),
+        'Verwendungszweck': [f"Referenz {i}" for i in range(20)],
+        'Betrag': [-1.5 * i for i in range(20)],
+        'Fixkosten': [i % 2 == 0 for i in range(20)],
+    })
+    records = json.loads(dumps({"transactions": df}))["transactions"]
+    columnar = json.loads(dumps({"transactions": df}, layout="columnar"))["transactions"]
+
+    assert columnar["columns"]["Kategorie"]["dictionary"] == ["Wohnen", "Medien"]
+    assert columnar["columns"]["Kategorie"]["codes"][:4] == [0, 1, 0, -1]
+    assert isinstance(columnar["columns"]["Fixkosten_Kategorie"], dict)
+    assert isinstance(columnar["columns"]["Verwendungszweck"], list)
+    assert columnar_to_records(columnar) == records
+
+def test_content_negotiation():
+    """Verify Accept/Accept-Encoding parsing including q-values."""
+    assert negotiate_layout(f"{COLUMNAR_MEDIA_TYPE}, application/json;q=0.5") == "columnar"
+    assert negotiate_layout(f"{COLUMNAR_MEDIA_TYPE};q=0, application/json") == "records"
+    assert negotiate_layout(None) == "records"
+    assert negotiate_encoding("gzip;q=1.0, identity") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding(None) is None
+
+def test_large_responses_are_compressed_small_ones_not():
+    """Verify Content-Encoding only above the size threshold, with Vary for caches."""
+    df = pd.DataFrame({'Betrag': [float(i) for i in range(2000)]})
+    large = negotiated_response({"transactions": df}, accept_encoding="gzip")
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept, Accept-Encoding"
+    assert json.loads(gzip.decompress(large.body))["transactions"][1999] == {"Betrag": 1999.0}
+
+    small = negotiated_response({"status": "ok"}, accept_encoding="gzip")
+    assert "content-encoding" not in small.headers
+    assert json.loads(small.body) == {"status": "ok"}
+
+def test_upload_in_columnar_layout():
+    """Verify that /upload honours the columnar media type."""
+    client = TestClient(main.app)
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        raw = f.read()
+    records = client.post("/upload?x_session_id=columnar", files={"file": ("mock.csv", raw, "text/csv")}).json()
+    response = client.post("/upload?x_session_id=columnar", files={"file": ("mock.csv", raw, "text/csv")},
+                           headers={"Accept": COLUMNAR_MEDIA_TYPE})
+
+    assert response.headers["content-type"] == COLUMNAR_MEDIA_TYPE
+    assert response.headers["content-encoding"] in ("gzip", "br")
+    assert columnar_to_records(response.json()["transactions"]) == records["transactions"]
+
+def test_empty_upload_keeps_negotiated_layout():
+    """Verify that an export without rows returns an empty table in either layout."""
+    client = TestClient(main.app)
+    with open(os.path.join(os.path.dirname(main.__file__), "test_data_mock.csv"), "rb") as f:
+        header_only = b"".join(f.readlines()[:5])
+    records = client.post("/upload?x_session_id=empty", files={"file": ("empty.csv", header_only, "text/csv")})
+    columnar = client.post("/upload?x_session_id=empty", files={"file": ("empty.csv", header_only, "text/csv")},
+                           headers={"Accept": COLUMNAR_MEDIA_TYPE})
+
+    assert records.json()["count"] == 0
+    assert records.json()["transactions"] == []
+    assert columnar.json()["transactions"] == {"length": 0, "columns": {}}
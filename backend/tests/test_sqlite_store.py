@@ -0,0 +1,127 @@
+import multiprocessing
+import sqlite3
+import pandas as pd
+from backend.memory_store import compact_frame
+from backend.sqlite_store import SqliteStore
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def session_frame(count=30, amount=-1.5):
+    return pd.DataFrame({
+        'Zahlungsempfänger': [f"Payee {i % 4}" for i in range(count)],
+        'Betrag': [amount * i for i in range(count)],
+        'Fixkosten': [i % 3 == 0 for i in range(count)],
+    })
+
+def save_in_other_process(db_path, session_id, amount):
+    SqliteStore(db_path).save(session_id, session_frame(amount=amount))
+
+def test_sqlite_store_round_trip(tmp_path):
+    """Verify save/get/clear and column subsets."""
+    store = SqliteStore(str(tmp_path / "sessions.sqlite3"))
+    store.save("a", session_frame())
+
+    pd.testing.assert_frame_equal(SqliteStore(store.db_path).get("a"), compact_frame(session_frame()))
+    assert list(store.get("a", columns=['Betrag', 'Unbekannt']).columns) == ['Betrag']
+    assert SqliteStore(store.db_path).column_names("a") == ['Zahlungsempfänger', 'Betrag', 'Fixkosten']
+    assert store.column_names("unknown") is None
+    store.save("a", session_frame(count=3), kind="cube")
+    assert len(SqliteStore(store.db_path).get("a", kind="cube")) == 3
+    assert len(store.get("a")) == 30
+    assert store.stats()["frames"] == 2
+    store.clear("a")
+    assert store.get("a").empty
+    assert store.get("a", kind="cube").empty
+    assert store.stats()["sessions"] == 0
+
+def test_sqlite_store_saves_frames_together_and_keeps_foreign_tables(tmp_path):
+    """Verify save_many() versions every frame in one write and leaves other tables in the file alone."""
+    db_path = str(tmp_path / "sessions.sqlite3")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, data BLOB)")
+        conn.execute("INSERT INTO sessions VALUES ('old', x'00')")
+
+    store = SqliteStore(db_path)
+    store.save_many("a", {"transactions": session_frame(), "cube": session_frame(count=3)})
+    store.save_many("a", {"transactions": session_frame(count=6), "cube": session_frame(count=2)})
+
+    reader = SqliteStore(db_path)
+    assert (len(reader.get("a")), len(reader.get("a", kind="cube"))) == (6, 2)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT data FROM sessions WHERE session_id = 'old'").fetchone() == (b"\x00",)
+        assert conn.execute("SELECT kind, version FROM session_frames ORDER BY kind").fetchall() == [
+            ("cube", 2), ("transactions", 2)]
+
+def test_sqlite_store_sees_writes_from_other_workers(tmp_path):
+    """Verify that a session replaced by another process is not served from the local cache."""
+    db_path = str(tmp_path / "sessions.sqlite3")
+    store = SqliteStore(db_path)
+    store.save("a", session_frame(amount=-1.0))
+    assert store.get("a")['Betrag'].iloc[1] == -1.0
+
+    worker = multiprocessing.get_context("spawn").Process(target=save_in_other_process, args=(db_path, "a", -2.0))
+    worker.start()
+    worker.join(timeout=60)
+    assert worker.exitcode == 0
+
+    assert store.get("a")['Betrag'].iloc[1] == -2.0
+    assert store.get("a")['Betrag'].iloc[1] == -2.0
+    # Hit right after the own save, miss after the foreign write, hit again
+    assert store.stats()["cache_hits"] == 2
+
+def test_sqlite_store_never_reuses_versions(tmp_path):
+    """Verify that a session cleared and saved again by another worker gets a new version, not the cached one."""
+    db_path = str(tmp_path / "sessions.sqlite3")
+    reader, writer = SqliteStore(db_path), SqliteStore(db_path)
+    writer.save("a", session_frame(amount=-1.0))
+    first = reader.version("a")
+    assert reader.get("a")['Betrag'].iloc[1] == -1.0
+
+    writer.clear("a")
+    assert reader.version("a") is None
+    writer.save("a", session_frame(amount=-2.0))
+    assert reader.version("a") not in (None, first)
+    assert reader.get("a")['Betrag'].iloc[1] == -2.0
+
+def test_sqlite_store_evicts_over_budget_and_idle(tmp_path):
+    """Verify the shared byte budget (LRU) and the idle TTL."""
+    clock = FakeClock()
+    probe = SqliteStore(str(tmp_path / "probe.sqlite3"))
+    probe.save("x", session_frame())
+    size = probe.stats()["bytes"]
+
+    store = SqliteStore(str(tmp_path / "sessions.sqlite3"), max_bytes=int(size * 2.5), ttl_seconds=600, clock=clock)
+    store.save("a", session_frame())
+    clock.now += 60
+    store.save("b", session_frame())
+    clock.now += 60
+    store.get("a")  # 'b' is now the least recently used session
+    clock.now += 60
+    store.save("c", session_frame())
+
+    assert store.get("b").empty
+    assert not store.get("a").empty
+    assert store.stats()["evictions_lru"] == 1
+
+    clock.now += 601
+    assert store.get("c").empty
+    assert store.stats()["sessions"] == 0
+
+def test_sqlite_store_evicts_sessions_with_all_their_frames(tmp_path):
+    """Verify that reading only the cube keeps the transactions of the session alive."""
+    clock = FakeClock()
+    store = SqliteStore(str(tmp_path / "sessions.sqlite3"), ttl_seconds=600, clock=clock)
+    store.save_many("a", {"transactions": session_frame(), "cube": session_frame(count=3)})
+    clock.now += 500
+    store.get("a", kind="cube")
+    clock.now += 500
+
+    assert len(SqliteStore(store.db_path, ttl_seconds=600, clock=clock).get("a")) == 30
+    clock.now += 601
+    assert store.get("a", kind="cube").empty
+    assert store.stats()["frames"] == 0
@@ -0,0 +1,57 @@
+import io
+import pandas as pd
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.services import classify_transactions, detector
+from backend.tracing import current_trace, trace_scope
+
+client = TestClient(app)
+
+def sample_frame():
+    return pd.DataFrame({
+        'Zahlungsempfänger': ["Netflix", "Netflix", "Vermieter", "Kiosk am Eck"],
+        'Verwendungszweck': ["Abo", "Abo", "Miete", "Zeitung"],
+        'Betrag': [-13.99, -13.99, -900.0, -3.5],
+        'Wiederkehrend': [True, True, True, False],
+    })
+
+def test_hot_paths_do_not_print(capsys):
+    """Verify that detection and categorization no longer write per-row output."""
+    detector.detect("Netflix", "Abo", -13.99)
+    classify_transactions(sample_frame())
+    assert capsys.readouterr().out == ""
+
+def test_trace_disabled_by_default():
+    """Verify that without a scope no trace is active."""
+    with trace_scope("test") as trace:
+        assert trace is None
+        assert current_trace() is None
+
+def test_trace_aggregates_counters():
+    """Verify that an enabled trace counts keyword matches and uncategorized payees."""
+    with trace_scope("test", enabled=True) as trace:
+        classify_transactions(sample_frame())
+    assert current_trace() is None
+
+    summary = trace.summary()
+    assert summary["keyword_matches"]["top"]["Medien: netflix"] == 2
+    assert summary["keyword_matches"]["top"]["Wohnen: miete"] == 1
+    assert summary["uncategorized_payees"]["top"] == {"Kiosk am Eck": 1}
+
+def test_upload_returns_trace_when_requested():
+    """Verify that tracing can be switched on per request."""
+    csv_content = (
+        "Buchungsdatum;Wertstellung;Zahlungsempfänger*in;Zahlungspflichtige*r;Verwendungszweck;Betrag (€);IBAN;Gläubiger-ID\n"
+        "01.10.2023;01.10.2023;Netflix;;Abo;-13,99;DE11;\n"
+        "kaputt;01.10.2023;Netflix;;Abo;-13,99;DE11;\n"
+    )
+    files = {"file": ("dkb.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")}
+
+    response = client.post("/upload?x_trace=true", files=files)
+    assert response.status_code == 200
+    trace = response.json()["trace"]
+    assert trace["keyword_matches"]["top"]["Medien: netflix"] == 1
+    assert trace["parser_skipped_rows"]["total"] == 1
+
+    files = {"file": ("dkb.csv", io.BytesIO(csv_content.encode("utf-8")), "text/csv")}
+    assert "trace" not in client.post("/upload", files=files).json()
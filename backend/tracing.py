@@ -0,0 +1,70 @@
+import logging
+import os
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+logger = logging.getLogger("finance_analyzer.trace")
+
+# Global switch (e.g. for a debugging deployment); single requests can enable tracing via trace_scope()
+TRACE_ENABLED_BY_DEFAULT = os.getenv("FINANCE_TRACE", "").lower() in ("1", "true", "yes")
+
+class Trace:
+    """
+    Aggregated counters for one request (e.g. matches per keyword, uncategorized payees).
+    Replaces per-row debug prints: hot paths only count, the summary is logged once at the end.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.counters: Dict[str, Counter] = defaultdict(Counter)
+
+    def count(self, counter: str, key: Any, amount: int = 1) -> None:
+        self.counters[counter][str(key)] += amount
+
+    def update(self, counter: str, counts: Mapping[Any, int]) -> None:
+        target = self.counters[counter]
+        for key, amount in counts.items():
+            target[str(key)] += int(amount)
+
+    def snapshot(self) -> Dict[str, Counter]:
+        """Copy of the counters, to roll back work that is redone (see restore)."""
+        return {name: Counter(counts) for name, counts in self.counters.items()}
+
+    def restore(self, snapshot: Dict[str, Counter]) -> None:
+        self.counters = defaultdict(Counter, {name: Counter(counts) for name, counts in snapshot.items()})
+
+    def summary(self, top: int = 20) -> Dict[str, Any]:
+        return {
+            name: {
+                "total": sum(counts.values()),
+                "distinct": len(counts),
+                "top": dict(counts.most_common(top)),
+            }
+            for name, counts in self.counters.items()
+        }
+
+_active_trace: ContextVar[Optional[Trace]] = ContextVar("finance_analyzer_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    """The trace of the running request, or None when tracing is disabled (the hot-path check)."""
+    return _active_trace.get()
+
+@contextmanager
+def trace_scope(name: str, enabled: bool = False) -> Iterator[Optional[Trace]]:
+    """
+    Activates a Trace for the enclosed block if enabled (or FINANCE_TRACE is set).
+    The aggregated counters are logged once when the block exits.
+    """
+    if not (enabled or TRACE_ENABLED_BY_DEFAULT):
+        yield None
+        return
+
+    trace = Trace(name)
+    token = _active_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _active_trace.reset(token)
+        logger.info("Trace %s: %s", name, trace.summary())